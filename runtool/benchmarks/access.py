@@ -0,0 +1,84 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""
+Compares expanding every key of a config with expanding only the keys
+which are accessed using a `LazyConfig`. The config has `--algorithms`
+algorithm definitions with a sweep each, of which only one algorithm and
+the dataset are accessed.
+
+Usage:
+
+    PYTHONPATH=. python benchmarks/access.py --algorithms 500
+"""
+
+import argparse
+import time
+
+from runtool.runtool import LazyConfig, transform_config
+
+
+def synthetic(algorithms: int) -> dict:
+    # the algorithms do not refer to each other or to the dataset, thus
+    # each of them is expanded on its own
+    config = {
+        "dataset": {
+            "path": {"train": "s3://bucket/train", "test": "s3://bucket/test"},
+            "meta": {"freq": "H", "prediction_length": 24},
+        }
+    }
+    for index in range(algorithms):
+        config[f"algorithm_{index}"] = {
+            "image": f"image_{index}",
+            "instance": {"$each": ["ml.m5.large", "ml.c5.large"]},
+            "hyperparameters": {
+                "epochs": {"$each": [10, 100, 1000]},
+                "learning_rate": {"$eval": f"1 / {index + 1}"},
+                "context_length": {"$eval": "2 * 24"},
+            },
+        }
+    return config
+
+
+def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--algorithms", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    config = synthetic(args.algorithms)
+
+    def on_access():
+        lazy = LazyConfig(config)
+        return lazy.algorithm_0 * lazy.dataset
+
+    everything = measure(lambda: transform_config(config), args.repeat)
+    accessed = measure(on_access, args.repeat)
+    print(
+        f"{args.algorithms} algorithms: expand all keys "
+        f"{everything * 1000:8.2f}ms, expand accessed keys "
+        f"{accessed * 1000:8.2f}ms ({everything / accessed:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""
+Compares the time it takes to parse `examples/runnable_examples/large.yml`
+scaled up by copying its top level keys `--scale` times.
+
+Usage:
+
+    PYTHONPATH=. python benchmarks/ingestion.py --scale 1000
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from copy import deepcopy
+from pathlib import Path
+
+import yaml
+
+from runtool.ingestion import parse_json, read_config
+
+LARGE = (
+    Path(__file__).parents[1] / "examples" / "runnable_examples" / "large.yml"
+)
+
+
+def scale_config(config: dict, scale: int) -> dict:
+    return {
+        f"{key}_{index}": deepcopy(value)
+        for index in range(scale)
+        for key, value in config.items()
+    }
+
+
+def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    config = scale_config(yaml.safe_load(LARGE.read_text()), args.scale)
+    directory = Path(tempfile.mkdtemp())
+    yaml_path = directory / "large.yml"
+    json_path = directory / "large.json"
+    yaml_path.write_text(yaml.safe_dump(config))
+    json_path.write_text(json.dumps(config))
+    print(f"config size: {yaml_path.stat().st_size / 2 ** 20:.1f} MiB")
+
+    # create the snapshot before timing reuses of it
+    read_config(yaml_path, snapshot=True)
+
+    loaders = {
+        "yaml.SafeLoader": lambda: yaml.load(
+            yaml_path.read_text(), Loader=yaml.SafeLoader
+        ),
+        "yaml.CSafeLoader": lambda: yaml.load(
+            yaml_path.read_text(), Loader=yaml.CSafeLoader
+        ),
+        "json": lambda: json.loads(json_path.read_bytes()),
+        "parse_json": lambda: parse_json(json_path.read_bytes()),
+        "snapshot": lambda: read_config(yaml_path, snapshot=True),
+    }
+    if not hasattr(yaml, "CSafeLoader"):
+        del loaders["yaml.CSafeLoader"]
+
+    for name, loader in loaders.items():
+        print(f"{name:>20}: {measure(loader, args.repeat):8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
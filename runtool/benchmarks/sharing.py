@@ -0,0 +1,73 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""
+Measures the memory used by the versions of a wide sweep over an
+algorithm with many metric definitions.
+
+Usage:
+
+    PYTHONPATH=. python benchmarks/sharing.py --epochs 100
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from runtool.transformer import apply_transformations
+
+
+def sweep(epochs: int) -> dict:
+    return {
+        "algorithm": {
+            "image": "image",
+            "instance": "ml.m5.large",
+            "metrics": {
+                f"metric_{index}": f"metric_{index}: ([0-9.]+)"
+                for index in range(25)
+            },
+            "hyperparameters": {
+                "epochs": {"$each": list(range(epochs))},
+                "learning_rate": {"$each": [0.1, 0.01, 0.001]},
+                "name": {"$ref": "name"},
+            },
+        },
+        "name": "model",
+        "dataset": {
+            "path": {"train": {"$each": ["a", "b", "c"]}},
+            "meta": {f"key_{index}": list(range(10)) for index in range(20)},
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--epochs", type=int, default=100)
+    args = parser.parse_args()
+
+    config = sweep(args.epochs)
+    tracemalloc.start()
+    start = time.perf_counter()
+    versions = apply_transformations(config)
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"versions: {len(versions)}")
+    print(f"time: {elapsed:.2f}s")
+    print(f"retained: {retained / 2 ** 20:.1f} MiB")
+    print(f"peak: {peak / 2 ** 20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""
+Compares transforming configs in a single traversal with transforming them
+in separate passes for `$from`, `$eval`, `$each` and `$ref`. The shipped
+example configs, a synthetic config with `--keys` top level keys and a
+synthetic config expanding into `--versions` versions are measured. In the
+latter, references to nodes which differ between the versions have to be
+resolved in each version.
+
+Usage:
+
+    PYTHONPATH=. python benchmarks/transformations.py --keys 2000 \
+        --versions 10000
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import yaml
+
+from runtool.transformer import (
+    apply_expansions,
+    apply_substitutions,
+    apply_transformations,
+)
+
+EXAMPLES = Path(__file__).parents[1] / "examples" / "runnable_examples"
+
+
+def synthetic(keys: int) -> dict:
+    # the sweep is kept outside of the inherited node, otherwise every
+    # top level key would multiply the number of versions
+    config = {
+        "base": {
+            "instance": "ml.m5.large",
+            "hyperparameters": {"prediction_length": {"$eval": "2 * 12"}},
+        },
+        "sweep": {"epochs": {"$each": [10, 100]}},
+    }
+    for index in range(keys):
+        config[f"node_{index}"] = {
+            "$from": "base",
+            "name": f"node_{index}",
+            "instance": {"$ref": "base.instance"},
+            "values": list(range(10)),
+            "scale": {"$eval": f"{index} / 2"},
+        }
+    return config
+
+
+def synthetic_versions(versions: int) -> dict:
+    # two sweeps of `sqrt(versions)` values each, the references to the
+    # algorithm have to be resolved in every version of the config
+    steps = int(versions**0.5)
+    return {
+        "algorithm": {
+            "image": "image",
+            "hyperparameters": {
+                "epochs": {"$each": list(range(steps))},
+                "learning_rate": {
+                    "$each": [1 / (step + 1) for step in range(steps)]
+                },
+                "context_length": {"$eval": "2 * 12"},
+            },
+        },
+        "algorithms": [{"$ref": "algorithm"}],
+        "epochs": {"$ref": "algorithm.hyperparameters.epochs"},
+        "image": {"$ref": "algorithm.image"},
+    }
+
+
+def measure(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=2000)
+    parser.add_argument("--versions", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    configs = {
+        path.name: yaml.safe_load(path.read_text())
+        for path in sorted(EXAMPLES.glob("*.yml"))
+    }
+    configs[f"synthetic ({args.keys} keys)"] = synthetic(args.keys)
+    configs[f"synthetic ({args.versions} versions)"] = synthetic_versions(
+        args.versions
+    )
+
+    for name, config in configs.items():
+        separate = measure(
+            lambda: apply_expansions(apply_substitutions(config)),
+            args.repeat,
+        )
+        single = measure(lambda: apply_transformations(config), args.repeat)
+        print(
+            f"{name:>30}: separate passes {separate * 1000:8.2f}ms, "
+            f"single pass {single * 1000:8.2f}ms ({separate / single:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
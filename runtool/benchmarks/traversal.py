@@ -0,0 +1,171 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""
+Compares the iterative traversals of `recursive_apply`,
+`update_nested_dict` and `DotDict` with recursive implementations on a
+deep and on a wide synthetic tree.
+
+Usage:
+
+    PYTHONPATH=. python benchmarks/traversal.py --depth 5000 --width 200000
+"""
+
+import argparse
+import time
+from itertools import product
+
+from runtool.datatypes import DotDict
+from runtool.recurse_config import Versions, flatten_versions, recursive_apply
+from runtool.transformations import apply_each
+from runtool.utils import update_nested_dict
+
+
+def recursive_apply_recursive(node, fn):
+    if isinstance(node, list):
+        children = [recursive_apply_recursive(value, fn) for value in node]
+        versioned = [
+            index
+            for index, child in enumerate(children)
+            if isinstance(child, Versions)
+        ]
+        if not versioned:
+            return children
+
+        def combine(version):
+            new = children[:]
+            for index, value in zip(versioned, version):
+                new[index] = value
+            return new
+
+        return Versions(
+            list(map(combine, product(*(children[i] for i in versioned))))
+        )
+    if not isinstance(node, dict):
+        return node
+
+    children = {
+        key: recursive_apply_recursive(value, fn)
+        for key, value in node.items()
+    }
+    versioned = [
+        key for key, child in children.items() if isinstance(child, Versions)
+    ]
+    if not versioned:
+        return fn(children)
+    rest = {
+        key: child for key, child in children.items() if key not in versioned
+    }
+    return flatten_versions(
+        fn(dict(zip(versioned, version), **rest))
+        for version in product(*(children[key] for key in versioned))
+    )
+
+
+def update_nested_dict_recursive(data, to_update):
+    for key, value in to_update.items():
+        if isinstance(data, dict):
+            if isinstance(value, dict):
+                data[key] = update_nested_dict_recursive(
+                    data.get(key, {}), value
+                )
+            else:
+                data[key] = to_update[key]
+        else:
+            data = {key: to_update[key]}
+    return data
+
+
+def to_dotdict_recursive(data):
+    dotdict = DotDict()
+    for key, value in data.items():
+        if hasattr(value, "keys") and not isinstance(value, DotDict):
+            value = to_dotdict_recursive(value)
+        dict.__setitem__(dotdict, key, value)
+    return dotdict
+
+
+def as_dict_recursive(dotdict):
+    def convert(value):
+        if isinstance(value, DotDict):
+            return as_dict_recursive(value)
+        if isinstance(value, list):
+            return list(map(convert, value))
+        return value
+
+    return {key: convert(value) for key, value in dotdict.items()}
+
+
+def deep_tree(depth: int) -> dict:
+    tree = {"leaf": {"$each": [1, 2]}}
+    for index in range(depth):
+        tree = {f"level_{index}": tree, "values": [index]}
+    return tree
+
+
+def wide_tree(width: int) -> dict:
+    return {
+        "sweep": {"$each": [1, 2]},
+        **{
+            f"key_{index}": {"name": f"node_{index}", "values": [index]}
+            for index in range(width)
+        },
+    }
+
+
+def measure(fn, *args) -> str:
+    start = time.perf_counter()
+    try:
+        fn(*args)
+    except RecursionError:
+        return "RecursionError"
+    return f"{time.perf_counter() - start:.3f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depth", type=int, default=5000)
+    parser.add_argument("--width", type=int, default=200000)
+    args = parser.parse_args()
+
+    trees = {
+        f"deep ({args.depth})": deep_tree(args.depth),
+        f"wide ({args.width})": wide_tree(args.width),
+    }
+    for name, tree in trees.items():
+        dotdict = DotDict(tree)
+        cases = {
+            "recursive_apply": (
+                (recursive_apply, tree, apply_each),
+                (recursive_apply_recursive, tree, apply_each),
+            ),
+            "update_nested_dict": (
+                (update_nested_dict, {}, tree),
+                (update_nested_dict_recursive, {}, tree),
+            ),
+            "DotDict": ((DotDict, tree), (to_dotdict_recursive, tree)),
+            "DotDict.as_dict": (
+                (DotDict.as_dict, dotdict),
+                (as_dict_recursive, dotdict),
+            ),
+        }
+        print(name)
+        for case, (iterative, recursive) in cases.items():
+            print(
+                f"{case:>20}: iterative {measure(*iterative):>14}, "
+                f"recursive {measure(*recursive):>14}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,11 @@
 # express or implied. See the License for the specific language governing
 # permissions and limitations under the License.
 
+__version__ = "0.1.0"
+
 from runtool import transformer
-from runtool.runtool import load_config, Client
+from runtool.cache import ConfigCache
+from runtool.runtool import load_config, load_plan, open_config, Client
 
 
 def parse(data):
@@ -0,0 +1,186 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+from pathlib import Path
+from typing import Any, List, Union
+
+import runtool
+from runtool.transformations import NONDETERMINISTIC_PATTERN
+from runtool.utils import fold_tree, is_container
+
+# matches references to the trial which defer evaluating an expression
+TRIAL_PATTERN = re.compile(r"\$trial\b|\b__trial__\b")
+
+
+def is_deterministic(node: Any) -> bool:
+    """
+    Checks whether transforming a config always gives the same result.
+    This is not the case if any `$eval` in the config uses one of the
+    names in `runtool.transformations.NONDETERMINISTIC_NAMES`, such as
+    `uid` which is a new unique id every time the expression is evaluated.
+    These are the same names for which `runtool.transformations.evaluate`
+    does not reuse the results of an expression. Expressions which use
+    `$trial` are only evaluated when the jobs are generated and are thus
+    not part of the transformed config.
+
+    >>> is_deterministic({"a": {"$eval": "2 + 2"}})
+    True
+    >>> is_deterministic({"a": [{"$eval": "'job-' + uid"}]})
+    False
+    >>> is_deterministic({"a": {"$eval": "id([])"}})
+    False
+    >>> is_deterministic({"a": {"$eval": "$trial.algorithm.image + uid"}})
+    True
+    """
+
+    def children(node: Any) -> Any:
+        if isinstance(node, dict):
+            return [value for value in node.values() if is_container(value)]
+        if isinstance(node, list):
+            return [value for value in node if is_container(value)]
+        return None
+
+    def combine(node: Any, results: List[bool]) -> bool:
+        expression = node.get("$eval") if isinstance(node, dict) else None
+        if (
+            isinstance(expression, str)
+            and NONDETERMINISTIC_PATTERN.search(expression)
+            and not TRIAL_PATTERN.search(expression)
+        ):
+            return False
+        return all(results)
+
+    if not is_container(node):
+        return True
+    return fold_tree(node, children, combine)
+
+
+class ConfigCache:
+    """
+    A content addressed cache on disk for transformed configs.
+
+    Each entry is stored as a pickle in `directory` under a key derived
+    from the bytes of the config, the options used when loading it and the
+    version of the runtool, thus changing any of these invalidates the
+    entry. When the total size of the entries exceeds `max_size` bytes,
+    the least recently used entries are removed.
+
+    >>> cache = ConfigCache(tempfile.mkdtemp())
+    >>> key = cache.key(b"a: 1")
+    >>> cache.get(key) is None
+    True
+    >>> cache.put(key, {"a": 1})
+    >>> cache.get(key)
+    {'a': 1}
+    """
+
+    def __init__(
+        self, directory: Union[str, Path], max_size: int = 512 * 2**20
+    ):
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+    @classmethod
+    def default(cls) -> "ConfigCache":
+        """
+        Returns a cache stored in the directory set in the
+        `RUNTOOL_CACHE_DIR` environment variable or in `~/.cache/runtool`.
+        """
+        return cls(
+            os.environ.get(
+                "RUNTOOL_CACHE_DIR", Path.home() / ".cache" / "runtool"
+            )
+        )
+
+    def key(self, data: bytes, **options: Any) -> str:
+        """
+        Generates the key of a config from its content and the options
+        passed when it is loaded.
+        """
+        digest = hashlib.sha256(runtool.__version__.encode())
+        digest.update(repr(sorted(options.items())).encode())
+        digest.update(data)
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.pickle"
+
+    def get(self, key: str) -> Any:
+        """
+        Returns the cached value of `key` or None if it is not cached.
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as entry:
+                value = pickle.load(entry)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        # the modification time tracks when an entry was last used
+        path.touch()
+        return value
+
+    def put(self, key: str, value: Any):
+        """
+        Stores `value` under `key` and evicts old entries if the cache
+        exceeds its maximum size.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # write to a temporary file first so that concurrent readers
+        # never see a partially written entry
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(descriptor, "wb") as entry:
+            pickle.dump(value, entry, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, self.path(key))
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the total size of
+        the cache is at most `max_size` bytes.
+        """
+        entries = []
+        for path in self.directory.glob("*.pickle"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_size:
+                break
+            remove(path)
+            total -= size
+
+    def clear(self):
+        """Removes all entries from the cache."""
+        for path in self.directory.glob("*.pickle"):
+            remove(path)
+
+
+def remove(path: Path):
+    """
+    Removes the file at `path` unless another process already removed it.
+    """
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
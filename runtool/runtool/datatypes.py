@@ -11,10 +11,15 @@
 # express or implied. See the License for the specific language governing
 # permissions and limitations under the License.
 
+import logging
 from collections import UserDict, UserList
-from typing import Any, Iterable, Union
+from hashlib import blake2b
+from typing import Any, Dict, Iterable, Iterator, Sequence, Tuple, Union
 
-from toolz.dicttoolz import valmap
+from runtool.hashing import DIGEST_SIZE, canonical_hash, shallow_digest
+from runtool.utils import fold_tree
+
+logger = logging.getLogger(__name__)
 
 
 class DotDict(dict):
@@ -27,19 +32,32 @@ class DotDict(dict):
     'hello'
     """
 
-    __getattr__ = dict.__getitem__
     __setattr__ = dict.__setitem__
     __delattr__ = dict.__delitem__
 
     def __init__(self, init_data: dict = {}):
-        for key, value in init_data.items():
-            if hasattr(value, "keys"):
-                if isinstance(value, DotDict):
-                    self[key] = value
-                else:
-                    self[key] = DotDict(value)
-            else:
-                self[key] = value
+        def children(node: Any) -> Any:
+            if node is init_data or (
+                hasattr(node, "keys") and not isinstance(node, DotDict)
+            ):
+                return node.values()
+            return None
+
+        def combine(node: Any, values: list) -> "DotDict":
+            # the nested DotDicts are already converted
+            dotdict = DotDict.__new__(DotDict)
+            dict.update(dotdict, zip(node.keys(), values))
+            return dotdict
+
+        dict.update(self, fold_tree(init_data, children, combine))
+
+    def __getattr__(self, key: str) -> Any:
+        # missing keys raise an AttributeError so that `hasattr`, `copy`
+        # and `pickle` can look up optional attributes of the DotDict
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key) from None
 
     def as_dict(self) -> dict:
         """
@@ -57,15 +75,59 @@ class DotDict(dict):
         <class 'dict'>
         """
 
-        def convert(value: Any) -> Any:
-            if isinstance(value, DotDict):
-                return value.as_dict()
-            elif isinstance(value, list):
-                return list(map(convert, value))
-            else:
-                return value
+        def children(node: Any) -> Any:
+            if isinstance(node, DotDict):
+                return node.values()
+            if isinstance(node, list):
+                return node
+            return None
+
+        def combine(node: Any, values: list) -> Any:
+            if isinstance(node, DotDict):
+                return dict(zip(node.keys(), values))
+            return values
+
+        return fold_tree(self, children, combine)
 
-        return {key: convert(value) for key, value in self.items()}
+
+class LazyDotDict(DotDict):
+    """
+    A `DotDict` which converts nested dictionaries into `DotDict` objects
+    when they are accessed rather than when it is created. Creating a
+    `LazyDotDict` only copies the top level of the data.
+
+    >>> data = {"a": {"b": "hello"}, "c": [1, 2]}
+    >>> lazy = LazyDotDict(data)
+    >>> lazy.a.b
+    'hello'
+    >>> type(lazy["a"]).__name__
+    'LazyDotDict'
+    >>> lazy.get("a").b
+    'hello'
+    >>> type(data["a"])
+    <class 'dict'>
+    """
+
+    def __init__(self, init_data: dict = {}):
+        dict.__init__(self, init_data)
+
+    def __getitem__(self, key: Any) -> Any:
+        value = dict.__getitem__(self, key)
+        if hasattr(value, "keys") and not isinstance(value, DotDict):
+            value = LazyDotDict(value)
+            dict.__setitem__(self, key, value)
+        return value
+
+    __getattr__ = __getitem__
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def values(self) -> list:
+        return [self[key] for key in self]
+
+    def items(self) -> list:
+        return [(key, self[key]) for key in self]
 
 
 class ListNode(UserList):
@@ -149,6 +211,50 @@ class ListNode(UserList):
         child_names = ", ".join([str(child) for child in self])
         return f"{type(self).__name__}([{child_names}])"
 
+    def __iter__(self):
+        return iter(self.data)
+
+    @classmethod
+    def from_sequence(cls, sequence: Sequence) -> "ListNode":
+        """
+        Wraps a sequence without copying or verifying its items.
+        This allows a `ListNode` to be backed by a sequence which generates
+        its items lazily, such as `runtool.recurse_config.LazyProduct`.
+
+        >>> ListNode.from_sequence(range(3))
+        ListNode([0, 1, 2])
+        """
+        list_node = cls.__new__(cls)
+        list_node.data = sequence
+        return list_node
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        """
+        Slicing a `ListNode` backed by a lazy sequence returns a `ListNode`
+        backed by a lazy slice of it, only the items in the slice are
+        generated when they are accessed.
+        """
+        if isinstance(index, slice) and not isinstance(self.data, list):
+            return self.from_sequence(self.data[index])
+        return super().__getitem__(index)
+
+    def partition(self, parts: int, index: int) -> "ListNode":
+        """
+        Splits the items into `parts` contiguous chunks of nearly equal
+        size and returns the chunk at `index`. This can be used to split
+        the items across several workers where each worker only
+        accesses its own chunk.
+
+        >>> items = ListNode.from_sequence(range(10))
+        >>> [list(items.partition(3, index)) for index in range(3)]
+        [[0, 1, 2], [3, 4, 5], [6, 7, 8, 9]]
+        """
+        if not 0 <= index < parts:
+            raise IndexError(f"partition index {index} not in [0, {parts})")
+        start = len(self) * index // parts
+        stop = len(self) * (index + 1) // parts
+        return self[start:stop]
+
     def __add__(self, other: Union["Node", "ListNode"]) -> Any:
         """
         Returns a new `ListNode` (or any subclass) with `other` appended to `self`.
@@ -191,7 +297,9 @@ class Experiments(ListNode):
     wish to execute.
 
     Since `Experiments` inherits from ListNode, they can be added.
-    However, `Experiments` cannot be multiplied.
+    However, `Experiments` cannot be multiplied. Experiments which are
+    equal, i.e. which have the same canonical hash, are only kept once
+    when `Experiments` are added.
 
     >>> experiments = Experiments(
     ...     [
@@ -202,9 +310,28 @@ class Experiments(ListNode):
     ...     ]
     ... )
     >>> len(experiments + experiments)
-    2
+    1
     >>> type(experiments + experiments)
     <class 'runtool.datatypes.Experiments'>
+
+    `Experiments` support the set operations `union` (`|`), `intersection`
+    (`&`) and `difference` (`-`), these keep the order of the experiments.
+    The experiments are matched by their canonical hash, thus removing
+    the experiments which have already been run from a grid takes time
+    proportional to the number of experiments.
+
+    >>> other = Experiments(
+    ...     [
+    ...         Experiment.from_nodes(
+    ...             Algorithm({"instance": "1", "image": "1"}),
+    ...             Dataset({"path": {"2": "2"}}),
+    ...         )
+    ...     ]
+    ... )
+    >>> len(experiments | other), len(experiments & other)
+    (2, 0)
+    >>> (experiments | other) - experiments == other
+    True
     """
 
     def __init__(
@@ -227,9 +354,125 @@ class Experiments(ListNode):
         """
         return data and all(map(Experiment.verify, data))
 
+    def index(self, memo: Dict = None) -> Dict[bytes, "Experiment"]:
+        """
+        Maps the canonical digest of each experiment to the first
+        experiment with that digest, see `runtool.hashing.digest`. The
+        algorithms and datasets which the experiments share are only
+        hashed once.
+        """
+        memo = {} if memo is None else memo
+        index = {}
+        for experiment in self:
+            index.setdefault(shallow_digest(experiment, memo), experiment)
+        return index
+
+    def iter_unique(self) -> Iterator[Tuple[int, "Experiment"]]:
+        """
+        Yields the index and the experiment of each experiment which is
+        not equal to a previous one. Only the digests of the experiments
+        are kept, thus lazily generated experiments stay lazy. The number
+        of skipped experiments is logged once all are iterated.
+
+        >>> experiment = Experiment.from_nodes(
+        ...     Algorithm({"image": "1", "instance": "1"}),
+        ...     Dataset({"path": {"1": "1"}}),
+        ... )
+        >>> experiments = Experiments.from_sequence(
+        ...     [experiment, Experiment(dict(experiment))]
+        ... )
+        >>> [index for index, _ in experiments.iter_unique()]
+        [0]
+        """
+        memo, seen = {}, set()
+        duplicates = 0
+        for index, experiment in enumerate(self):
+            key = shallow_digest(experiment, memo)
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            yield index, experiment
+        log_duplicates(duplicates)
+
+    def unique(self) -> "Experiments":
+        """
+        Returns the experiments without duplicates, i.e. only the first of
+        several equal experiments is kept. The number of removed
+        experiments is logged.
+        """
+        unique = list(self.index().values())
+        log_duplicates(len(self) - len(unique))
+        return self.from_sequence(unique)
+
+    def union(self, other: "Experiments") -> "Experiments":
+        """
+        Returns the experiments in `self` or `other` without duplicates.
+        """
+        memo = {}
+        index = self.index(memo)
+        for key, experiment in other.index(memo).items():
+            index.setdefault(key, experiment)
+        return self.from_sequence(list(index.values()))
+
+    def intersection(self, other: "Experiments") -> "Experiments":
+        """
+        Returns the experiments in `self` which are in `other` as well.
+        """
+        memo = {}
+        keys = other.index(memo).keys()
+        return self.from_sequence(
+            [
+                experiment
+                for key, experiment in self.index(memo).items()
+                if key in keys
+            ]
+        )
+
+    def difference(self, other: "Experiments") -> "Experiments":
+        """
+        Returns the experiments in `self` which are not in `other`.
+        """
+        memo = {}
+        keys = other.index(memo).keys()
+        return self.from_sequence(
+            [
+                experiment
+                for key, experiment in self.index(memo).items()
+                if key not in keys
+            ]
+        )
+
+    def canonical_hash(self) -> str:
+        """
+        Returns a hash of the experiments which neither depends on their
+        order nor on duplicates, i.e. on the experiments as a set.
+        """
+        data = b"".join(sorted(self.index()))
+        return blake2b(data, digest_size=DIGEST_SIZE).hexdigest()
+
+    def __add__(self, other: Union["Node", "ListNode"]) -> "Experiments":
+        return super().__add__(other).unique()
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
     __mul__ = None  # Experiments cannot be multiplied
 
 
+def log_duplicates(duplicates: int) -> None:
+    """
+    Warns that `duplicates` experiments were dropped as they are equal to
+    other experiments, if any.
+    """
+    if duplicates:
+        logger.warning(
+            "dropped %d duplicate experiment%s",
+            duplicates,
+            "" if duplicates == 1 else "s",
+        )
+
+
 class Datasets(ListNode):
     """
     The Datasets class contains a set of `Dataset` objects.
@@ -460,6 +703,18 @@ class Node(UserDict):
 
         raise TypeError
 
+    def canonical_hash(self) -> str:
+        """
+        Returns a hash of the node which does not depend on the order of
+        the keys of the node or of any dicts within it.
+
+        >>> Node({"a": 1, "b": 2}).canonical_hash() == Node(
+        ...     {"b": 2, "a": 1}
+        ... ).canonical_hash()
+        True
+        """
+        return canonical_hash(self)
+
     def as_dict(self):
         def converter(value):
             if hasattr(value, "as_dict"):
@@ -468,7 +723,17 @@ class Node(UserDict):
                 return dict(value)
             return value
 
-        return valmap(converter, self)
+        # nested nodes are converted by the fold, other values which can be
+        # converted to a dict are converted by `converter`
+        return fold_tree(
+            self,
+            children=lambda node: (
+                node.values() if isinstance(node, Node) else None
+            ),
+            combine=lambda node, values: dict(
+                zip(node.keys(), map(converter, values))
+            ),
+        )
 
 
 class Algorithm(Node):
@@ -651,6 +916,9 @@ class Experiment(Node):
     # __add__ should return an Experiments object
     result_type = Experiments
 
+    def __add__(self, other) -> "Experiments":
+        return super().__add__(other).unique()
+
     def __init__(self, node: dict):
         super().__init__(node)
         if not Experiment.verify(self):
@@ -0,0 +1,241 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import operator
+from typing import Any, List
+
+from runtool.recurse_config import DirectiveIndex
+from runtool.utils import (
+    Located,
+    fold_tree,
+    get_item_from_path,
+    merge_nested_dict,
+)
+
+
+def keep_unchanged(node: Any, resolved: Any) -> Any:
+    """
+    Returns `node` if resolving its children did not change any of them,
+    this way unchanged subtrees are shared instead of copied.
+
+    >>> node = {"a": [1]}
+    >>> keep_unchanged(node, {"a": node["a"]}) is node
+    True
+    >>> keep_unchanged(node, {"a": [2]})
+    {'a': [2]}
+    """
+    values = resolved.values() if isinstance(node, dict) else resolved
+    original = node.values() if isinstance(node, dict) else node
+    if all(map(operator.is_, values, original)):
+        return node
+    return resolved
+
+
+class CircularReferenceError(ValueError):
+    """
+    Raised when following `$from` or `$ref` directives leads back to a
+    node which is currently being resolved. `cycle` contains the paths
+    which form the cycle.
+    """
+
+    def __init__(self, directive: str, cycle: List[str]):
+        self.directive = directive
+        self.cycle = cycle
+        super().__init__(
+            f"Circular {directive} reference: {' -> '.join(cycle)}"
+        )
+
+
+class Resolver:
+    """
+    Resolves a directive which points to other nodes in `context`, such as
+    `$from` or `$ref`.
+
+    The nodes pointed to are resolved depth first, thus any node is
+    resolved after the nodes it depends on, i.e. in topological order of
+    the reference graph. Each node pointed to is only resolved once, the
+    result is reused by all nodes pointing to it. If the references form
+    a cycle, a `CircularReferenceError` is raised.
+
+    Subclasses implement `apply` which resolves the directive in a single
+    node. Subtrees which `index` reports not to contain the directive are
+    not visited, an index can be shared between resolvers of configs which
+    share subtrees.
+    """
+
+    directive = None
+
+    def __init__(self, context: Any, index: DirectiveIndex = None):
+        self.context = context
+        self.index = (
+            index if index is not None else DirectiveIndex([self.directive])
+        )
+        self.resolved = {}
+        # paths of the nodes which are currently being resolved
+        self.resolving = []
+
+    def resolve(self, path: str) -> Any:
+        """
+        Returns the node at `path` in the context with the directive
+        resolved in it and in all of its children.
+        """
+        if path in self.resolved:
+            return self.resolved[path]
+
+        if path in self.resolving:
+            cycle = self.resolving[self.resolving.index(path) :] + [path]
+            raise CircularReferenceError(self.directive, cycle)
+
+        self.resolving.append(path)
+        try:
+            node = self.resolve_node(
+                get_item_from_path(self.context, path), path
+            )
+        finally:
+            self.resolving.pop()
+
+        self.resolved[path] = node
+        return node
+
+    def follow(self, path: str, target: str) -> Any:
+        """
+        Resolves the node at `target` which the node at `path` points to.
+        """
+        if self.resolving and self.resolving[-1] == path:
+            # the node at `path` is the node being resolved
+            return self.resolve(target)
+
+        self.resolving.append(path)
+        try:
+            return self.resolve(target)
+        finally:
+            self.resolving.pop()
+
+    def resolve_node(self, node: Any, path: str) -> Any:
+        """
+        Resolves the directive in `node` and all of its children, the
+        children are resolved before the node itself. The nodes are
+        traversed using `runtool.utils.fold_tree`, thus deeply nested
+        configs do not exceed the recursion limit.
+        """
+        if not self.index.contains(node):
+            return node
+
+        def children(located: Any) -> Any:
+            if not isinstance(located, Located):
+                return None
+            return located.children(keep=self.index.contains)
+
+        def combine(located: Located, results: list) -> Any:
+            # the results belong to the children which contain the directive
+            results = iter(results)
+            node = located.node
+            if isinstance(node, dict):
+                resolved = {
+                    key: next(results) if self.index.contains(value) else value
+                    for key, value in node.items()
+                }
+                return self.apply(keep_unchanged(node, resolved), located.path)
+            resolved = [
+                next(results) if self.index.contains(value) else value
+                for value in node
+            ]
+            return keep_unchanged(node, resolved)
+
+        return fold_tree(Located(node, path), children, combine)
+
+    def apply(self, node: dict, path: str) -> Any:
+        raise NotImplementedError
+
+
+class FromResolver(Resolver):
+    """
+    Resolves `$from` by merging a node with the node it inherits from.
+
+    >>> FromResolver(
+    ...     {
+    ...         "base": {"a": 1, "b": {"c": 2}},
+    ...         "child": {"$from": "base", "b": {"d": 3}},
+    ...     }
+    ... ).resolve("child")
+    {'a': 1, 'b': {'c': 2, 'd': 3}}
+
+    The inherited node is shared by every node inheriting from it, it is
+    never modified. Only the dictionaries which the inheriting node
+    changes are copied.
+
+    >>> FromResolver({"a": {"$from": "b"}, "b": {"$from": "a"}}).resolve("a")
+    Traceback (most recent call last):
+        ...
+    runtool.dependencies.CircularReferenceError: \
+Circular $from reference: a -> b -> a
+    """
+
+    directive = "$from"
+
+    def apply(self, node: dict, path: str) -> dict:
+        if "$from" not in node:
+            return node
+
+        source = self.follow(path, node["$from"])
+        assert isinstance(
+            source, dict
+        ), "$from can only be used to inherit from a dict"
+
+        return merge_nested_dict(
+            source,
+            {key: value for key, value in node.items() if key != "$from"},
+        )
+
+
+class RefResolver(Resolver):
+    """
+    Resolves `$ref` by replacing a node with the node it points to.
+
+    >>> RefResolver(
+    ...     {"target": 1, "a": {"$ref": "b"}, "b": {"$ref": "target"}}
+    ... ).resolve("a")
+    1
+    """
+
+    directive = "$ref"
+
+    def apply(self, node: dict, path: str) -> Any:
+        if "$ref" not in node:
+            return node
+
+        assert len(node) == 1, "$ref needs to be the only value"
+        return self.follow(path, node["$ref"])
+
+
+def resolve_from(config: dict) -> dict:
+    """
+    Resolves every `$from` in `config`.
+
+    >>> resolve_from(
+    ...     {"base": {"a": 1}, "x": {"$from": "base"}, "y": [{"$from": "x"}]}
+    ... )
+    {'base': {'a': 1}, 'x': {'a': 1}, 'y': [{'a': 1}]}
+    """
+    return FromResolver(config).resolve_node(config, "")
+
+
+def resolve_references(config: dict, index: DirectiveIndex = None) -> dict:
+    """
+    Resolves every `$ref` in `config`, `index` is used to skip subtrees
+    without any `$ref`.
+
+    >>> resolve_references({"a": 1, "b": [{"$ref": "a"}]})
+    {'a': 1, 'b': [1]}
+    """
+    return RefResolver(config, index).resolve_node(config, "")
@@ -12,7 +12,7 @@
 # permissions and limitations under the License.
 
 import time
-from itertools import count
+from itertools import count, islice
 from typing import Dict, Iterable, List, NamedTuple, NewType, Optional
 
 import boto3
@@ -106,7 +106,10 @@ class JobDispatcher(NamedTuple):
                     raise
 
     def dispatch(
-        self, jobs: List[JobConfiguration], max_retries: int = 10
+        self,
+        jobs: Iterable[JobConfiguration],
+        max_retries: int = 10,
+        buffer_size: Optional[int] = None,
     ) -> Dict[str, str]:
         """
         Schedule and start training jobs in sagemaker.
@@ -120,21 +123,48 @@ class JobDispatcher(NamedTuple):
         no more instances are available in sagemaker. This then repeats for
         another queue until all queues are empty. If all resources are busy
         for all queues, the dispatcher sleeps until resources are available.
+
+        `jobs` may be an iterator, such as the jobs read from a job file by
+        `runtool.jobfile.read_jobs`. If `buffer_size` is set, the jobs are
+        read while they are submitted and at most `buffer_size` jobs wait
+        in the queues at once. Otherwise all jobs are read into the queues
+        before the first job is submitted.
         """
-        queues = group_by_instance_type(jobs)
+        if buffer_size is not None and buffer_size < 1:
+            raise ValueError(
+                f"buffer_size must be at least 1, got {buffer_size}"
+            )
+        jobs = iter(jobs)
+        queues: Dict[str, List[JobConfiguration]] = {}
         responses = {}
+        read = 0
+
+        def fill():
+            """Read jobs into the queues until `buffer_size` jobs wait"""
+            nonlocal read
+            size = None
+            if buffer_size is not None:
+                waiting = sum(map(len, queues.values()))
+                size = max(buffer_size - waiting, 0)
+            for queue in group_by_instance_type(islice(jobs, size)):
+                instance = queue[0]["ResourceConfig"]["InstanceType"]
+                queues.setdefault(instance, []).extend(queue)
+                read += len(queue)
 
         def log(message, end="\r"):
             """Overwrite previous line in the terminal with `message`"""
             # \033[K deletes the remaining characters of the line
             print(
-                f"\033[K{len(responses)}/{len(jobs)} jobs submitted, {message}",
+                f"\033[K{len(responses)}/{read} jobs submitted, {message}",
                 end=end,
             )
 
-        print(f"total jobs to run: {len(jobs)}")
+        fill()
+        if buffer_size is None:
+            print(f"total jobs to run: {read}")
         while True:
-            for queue in queues:
+            blocked = False
+            for queue in queues.values():
                 while queue:
                     run = queue.pop()
                     log(f"submitting job: {run['TrainingJobName']}")
@@ -144,17 +174,19 @@ class JobDispatcher(NamedTuple):
                         responses[run["TrainingJobName"]] = response
                     else:
                         queue.append(run)
+                        blocked = True
                         break
 
-            if any(queues):
+            fill()
+            if not any(queues.values()):
+                break
+            if blocked:
                 self.timeout_with_printer(
                     60,
                     (
-                        f"\r{len(responses)}/{len(jobs)} jobs submitted."
+                        f"\r{len(responses)}/{read} jobs submitted."
                         " Instance limit reached, pausing for 60 seconds"
                     ),
                 )
-            else:
-                break
         log("Done!", "\n")
         return responses
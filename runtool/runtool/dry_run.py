@@ -12,7 +12,8 @@
 # permissions and limitations under the License.
 
 import os
-from typing import List
+from collections import Counter
+from typing import Dict, Iterable
 
 import click
 import pandas
@@ -24,10 +25,12 @@ from runtool.utils import get_item_from_path
 
 
 def generate_dry_run_table(
-    jobs: List[JobConfiguration], print_data: bool = True
+    jobs: Iterable[JobConfiguration], print_data: bool = True
 ) -> pandas.DataFrame:
     """
     Generate a dry run table summarizing the jobs and optionally print it.
+    The table has a row for each job, thus all rows are kept in memory,
+    see `generate_dry_run_summary` for large numbers of jobs.
 
     Returns
     -------
@@ -74,3 +77,25 @@ def generate_dry_run_table(
         print(table)
         print(f"total number of jobs: {len(table.rows)}")
     return table_data
+
+
+def generate_dry_run_summary(
+    jobs: Iterable[JobConfiguration], print_data: bool = True
+) -> Dict[str, int]:
+    """
+    Count the jobs for each instance type and optionally print the counts.
+    Only the counts are kept in memory, thus `jobs` may be a lazily read
+    job file of any size.
+
+    >>> generate_dry_run_summary(
+    ...     [{"ResourceConfig": {"InstanceType": "ml.m5.large"}}] * 2,
+    ...     print_data=False,
+    ... )
+    {'ml.m5.large': 2}
+    """
+    counts = Counter(job["ResourceConfig"]["InstanceType"] for job in jobs)
+    if print_data:
+        for instance, count in counts.items():
+            print(f"{instance}: {count} jobs")
+        print(f"total number of jobs: {sum(counts.values())}")
+    return dict(counts)
@@ -16,15 +16,23 @@ from datetime import datetime
 from functools import partial
 from hashlib import sha1
 from itertools import chain
-from typing import Any, Dict, Iterable, List, Optional, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 from pydantic import BaseModel, validator
 from toolz.dicttoolz import update_in, valmap
 
 from runtool.datatypes import DotDict, Experiment, Experiments
-from runtool.recurse_config import recursive_apply
-from runtool.transformations import apply_trial
-from runtool.utils import update_nested_dict
+from runtool.expressions import TRIAL, compile_expression
+from runtool.hashing import Hasher, canonical_hash
+from runtool.parallel import chunk_ranges, parallel_map
+from runtool.profiler import Profiler, profiled
+from runtool.recurse_config import DirectiveIndex, Versions, recursive_apply
+from runtool.transformations import (
+    NONDETERMINISTIC_NAMES,
+    apply_trial,
+    apply_where,
+)
+from runtool.utils import merge_nested_dict
 
 
 class Job(BaseModel):
@@ -44,11 +52,15 @@ class Job(BaseModel):
     run_configuration: str = None
 
     @validator("run_configuration", always=True)
-    def set_run_configuration(cls: "Job", _: str, values: dict):
-        return cls.generate_run_configuration(values)
+    def set_run_configuration(
+        cls: "Job", run_configuration: str, values: dict
+    ):
+        return run_configuration or cls.generate_run_configuration(values)
 
     @classmethod
-    def generate_run_configuration(cls: "Job", job: dict) -> str:
+    def generate_run_configuration(
+        cls: "Job", job: dict, fragments: "Fragments" = None
+    ) -> str:
         """
         The run configuration describes the dataset and algorithm of the job.
 
@@ -57,22 +69,28 @@ class Job(BaseModel):
 
         "<experiment_name>_<hash>"
 
+        The `run_configuration_id` tags join the results of jobs, thus the
+        hash is kept the same as in earlier versions of the runtool. The
+        JSONs of the hyperparameters and the dataset are taken from
+        `fragments` if it is given.
         """
-        hyperparameters = job["experiment"]["algorithm"].get(
-            "hyperparameters", ""
-        )
+        if fragments is None:
+            fragments = Fragments()
+        algorithm = job["experiment"]["algorithm"]
+        hyperparameters = algorithm.get("hyperparameters") or ""
         if hyperparameters:
-            hyperparameters = json.dumps(hyperparameters, sort_keys=True)
+            hyperparameters = fragments.get(sorted_json, hyperparameters)
 
         trial_id = "".join(
             (
-                job["experiment"]["algorithm"]["image"],
-                job["experiment"]["algorithm"]["instance"],
+                algorithm["image"],
+                algorithm["instance"],
                 hyperparameters,
-                json.dumps(job["experiment"]["dataset"], sort_keys=True),
+                fragments.get(sorted_json, job["experiment"]["dataset"]),
             )
         )
-        return f"{job['experiment_name']}_{reproducible_hash(trial_id)}"
+        trial_hash = sha1(trial_id.encode("UTF-8")).hexdigest()[:8]
+        return f"{job['experiment_name']}_{trial_hash}"
 
     def generate_tags(self) -> List[Dict[str, str]]:
         """
@@ -121,7 +139,7 @@ class Job(BaseModel):
             {"Key": key, "Value": str(value)} for key, value in tags.items()
         ]
 
-    def generate_job_name(self, run: int) -> str:
+    def generate_job_name(self, run: int, hasher: Hasher = None) -> str:
         """
         Generates a training job name for a sagemaker job.
 
@@ -130,7 +148,7 @@ class Job(BaseModel):
         Thereafter if a `$job_name` key exists in `job.experiment["algorithm"]`
         or in `job.experiment["dataset"]` its value will be used.
         If no custom name has been provided, a default training job name is
-        generated.
+        generated, the hash of the experiment in it is memoized by `hasher`.
         """
         # user naming convention has highest priority
         if self.job_name_expression:
@@ -155,25 +173,14 @@ class Job(BaseModel):
 
         # fallback on default naming
         return (
-            f"config-{reproducible_hash(self.experiment)}"
+            f"config-{reproducible_hash(self.experiment, hasher)}"
             f"-date-{self.creation_time}"
             f"-runid-{reproducible_hash(self.run_configuration)}"
             f"-run-{run}"
         )
 
     def generate_datasets(self):
-        return [
-            {
-                "ChannelName": name,
-                "DataSource": {
-                    "S3DataSource": {
-                        "S3DataType": "S3Prefix",
-                        "S3Uri": uri,
-                    }
-                },
-            }
-            for name, uri in self.experiment["dataset"]["path"].items()
-        ]
+        return input_data_config(self.experiment["dataset"]["path"])
 
     def generate_metrics(self) -> List[Dict[str, str]]:
         """
@@ -181,13 +188,9 @@ class Job(BaseModel):
         experiment in the job. These metric definitions are then compiled into a
         list with the format required by SageMaker API.
         """
-        return [
-            {"Name": key, "Regex": value}
-            for key, value in chain(
-                self.experiment["algorithm"].get("metrics", {}).items(),
-                self.experiment["dataset"].get("metrics", {}).items(),
-            )
-        ]
+        return metric_definitions(
+            self.experiment["algorithm"].get("metrics", {})
+        ) + metric_definitions(self.experiment["dataset"].get("metrics", {}))
 
     def generate_sagemaker_overrides(self) -> Dict[str, Any]:
         """
@@ -214,69 +217,192 @@ class Job(BaseModel):
         True
 
         """
-        # generate tuple of format: Tuple[List, Any]
-        # this tuple will only contain items having
-        # a key starting with "$sagemaker."
-        # i.e.
-        # {"$sagemaker.hello.world": 10, "smth": 2}
-        # ->
-        # (["hello", "world"], 10)
-
-        sagemaker_overrides = (
-            (key.split(".")[1:], value)
-            for key, value in chain(
-                self.experiment["algorithm"].items(),
-                self.experiment["algorithm"].items(),
-            )
-            if key.startswith("$sagemaker.")
-        )
-
-        # generate a dictionary from the tuple
-        # (["hello", "world"], 10)
-        # ->
-        # {"hello": {"world": 10}}
-        overrides = {}
-        for path, value in sagemaker_overrides:
-            overrides = update_in(overrides, path, lambda _: value)
-
-        return overrides
+        # the overrides are only taken from the algorithm
+        return sagemaker_overrides(self.experiment["algorithm"])
 
     def generate_hyperparameters(self):
-        return valmap(
-            str, self.experiment["algorithm"].get("hyperparameters", {})
+        return string_values(
+            self.experiment["algorithm"].get("hyperparameters", {})
         )
 
 
-def reproducible_hash(data):
+def reproducible_hash(data: Any, hasher: Hasher = None) -> str:
     """
     Generate a hash which is reproducible across several runs of Python.
 
     The builtin `hash` method of Python generates different hashes during
     different runs of Python while the `reproducible_hash`always generates
-    the same value.
+    the same value. The hash is the canonical hash of `data`, see
+    `runtool.hashing`, thus it does not depend on the order of the keys of
+    dicts nor on the version of Python. If `hasher` is given, the hashes
+    of the dicts and lists in `data` are memoized by it.
 
     >>> reproducible_hash("hello")
-    'aaf4c61d'
-    >>> reproducible_hash({"foo": 1})
-    '0c90a67c'
+    '41612ef2'
+    >>> reproducible_hash({"foo": 1, "bar": 2})
+    'ee9381c3'
+    >>> reproducible_hash({"bar": 2, "foo": 1})
+    'ee9381c3'
+    """
+    if hasher is None:
+        return canonical_hash(data)[:8]
+    return hasher.hexdigest(data)[:8]
+
+
+def sorted_json(node: dict) -> str:
+    """
+    Serializes `node` as JSON with sorted keys.
+
+    >>> sorted_json({"b": 1, "a": 2})
+    '{"a": 2, "b": 1}'
+    """
+    return json.dumps(node, sort_keys=True)
+
+
+def metric_definitions(metrics: dict) -> List[Dict[str, str]]:
+    """
+    Converts the `metrics` of an algorithm or dataset into the format
+    required by the SageMaker API.
+
+    >>> metric_definitions({"abs_error": "abs_error: (.*)"})
+    [{'Name': 'abs_error', 'Regex': 'abs_error: (.*)'}]
+    """
+    return [{"Name": key, "Regex": value} for key, value in metrics.items()]
+
+
+def input_data_config(path: dict) -> List[dict]:
+    """
+    Converts the `path` of a dataset into the channels of a training job.
+    """
+    return [
+        {
+            "ChannelName": name,
+            "DataSource": {
+                "S3DataSource": {
+                    "S3DataType": "S3Prefix",
+                    "S3Uri": uri,
+                }
+            },
+        }
+        for name, uri in path.items()
+    ]
+
+
+def sagemaker_overrides(node: dict) -> Dict[str, Any]:
+    """
+    Populates a new `dict` from the items of `node` which have a key of the
+    format `$sagemaker.<path>`, the value at `<path>` is set to the value
+    of the item.
+
+    >>> sagemaker_overrides({"$sagemaker.hello.world": 10, "smth": 2})
+    {'hello': {'world': 10}}
+    """
+    # generate tuple of format: Tuple[List, Any]
+    # this tuple will only contain items having
+    # a key starting with "$sagemaker."
+    # i.e.
+    # {"$sagemaker.hello.world": 10, "smth": 2}
+    # ->
+    # (["hello", "world"], 10)
+    overrides_ = (
+        (key.split(".")[1:], value)
+        for key, value in node.items()
+        if key.startswith("$sagemaker.")
+    )
+
+    # generate a dictionary from the tuple
+    # (["hello", "world"], 10)
+    # ->
+    # {"hello": {"world": 10}}
+    overrides = {}
+    for path, value in overrides_:
+        overrides = update_in(overrides, path, lambda _: value)
+
+    return overrides
+
+
+def string_values(hyperparameters: dict) -> Dict[str, str]:
     """
-    return str(sha1(str(data).encode("UTF-8")).hexdigest()[:8])
+    Converts the values of `hyperparameters` into strings as SageMaker
+    requires.
 
+    >>> string_values({"epochs": 10, "freq": "H"})
+    {'epochs': '10', 'freq': 'H'}
+    """
+    return valmap(str, hyperparameters)
 
-def generate_job_json(job: Job) -> Iterable[dict]:
-    """Creates JSONs for starting training jobs in SageMaker."""
+
+class Fragments:
+    """
+    Caches the parts of the job JSONs which only depend on a single node of
+    the experiment, such as the metric definitions of an algorithm. The
+    algorithms and datasets of the experiments of a grid are shared, see
+    `Templates`, thus each part is only generated once for each of them.
+
+    The nodes are identified by their id as in `Templates`, a canonical
+    hash would not do since it ignores the order of the keys which the
+    JSONs depend on. The fragments are shared by the JSONs, thus they may
+    not be modified. The hashes of the nodes used for the job names are
+    memoized by `hasher`.
+
+    >>> fragments = Fragments()
+    >>> metrics = {"abs_error": "abs_error: (.*)"}
+    >>> first = fragments.get(metric_definitions, metrics)
+    >>> first is fragments.get(metric_definitions, metrics)
+    True
+    """
+
+    def __init__(self, max_size: int = 2**12):
+        self.max_size = max_size
+        self.entries: Dict[Tuple[Callable, int], Tuple[Any, Any]] = {}
+        self.hasher = Hasher()
+
+    def get(self, fn: Callable, node: Any) -> Any:
+        """
+        Returns the fragment `fn(node)`, it is only generated the first
+        time `fn` is called with `node`. Empty nodes are not cached.
+        """
+        if not node:
+            return fn(node)
+        key = fn, id(node)
+        entry = self.entries.get(key)
+        if entry is None or entry[0] is not node:
+            if len(self.entries) >= self.max_size:
+                self.entries.clear()
+            entry = node, fn(node)
+            self.entries[key] = entry
+        return entry[1]
+
+
+def generate_job_json(job: Job, fragments: Fragments = None) -> Iterable[dict]:
+    """
+    Creates JSONs for starting training jobs in SageMaker.
+
+    The parts of the JSONs which only depend on the algorithm or the
+    dataset of the job are taken from `fragments` and are shared with the
+    JSONs of other jobs using the same node.
+    """
+    if fragments is None:
+        fragments = Fragments()
+    algorithm = job.experiment["algorithm"]
+    dataset = job.experiment["dataset"]
 
     run_configuration = job.run_configuration
     tags = job.generate_tags()
-    datasets = job.generate_datasets()
-    metrics = job.generate_metrics()
-    overrides = job.generate_sagemaker_overrides()
-    hyperparameters = job.generate_hyperparameters()
+    datasets = fragments.get(input_data_config, dataset["path"])
+    metrics = [
+        *fragments.get(metric_definitions, algorithm.get("metrics", {})),
+        *fragments.get(metric_definitions, dataset.get("metrics", {})),
+    ]
+    overrides = fragments.get(sagemaker_overrides, algorithm)
+    hyperparameters = fragments.get(
+        string_values, algorithm.get("hyperparameters", {})
+    )
 
     s3_path = f"s3://{job.bucket}/{job.experiment_name}/{run_configuration}"
 
     for run in range(job.runs):
-        job_name = job.generate_job_name(run)
+        job_name = job.generate_job_name(run, fragments.hasher)
         json_ = {
             "AlgorithmSpecification": {
                 "TrainingImage": job.experiment["algorithm"]["image"],
@@ -300,8 +426,8 @@ def generate_job_json(job: Job) -> Iterable[dict]:
             ],
         }
 
-        # apply any custom sagemaker json
-        yield update_nested_dict(json_, overrides)
+        # apply any custom sagemaker json, the fragments are not modified
+        yield merge_nested_dict(json_, overrides) if overrides else json_
 
 
 def generate_sagemaker_json(
@@ -313,6 +439,10 @@ def generate_sagemaker_json(
     creation_time: str,
     bucket: str,
     role: str,
+    workers: int = None,
+    templates: "Templates" = None,
+    fragments: Fragments = None,
+    profiler: Profiler = None,
 ) -> Iterable[dict]:
     """
     Converts an `Experiment` object into one or more dicts
@@ -340,6 +470,22 @@ def generate_sagemaker_json(
         for storing model data.
     role
         The AWS IAM Role to use when starting training jobs
+    workers
+        If set, the JSONs of an `Experiments` object are generated by this
+        many processes. The JSONs are returned in the same order as when
+        they are generated by a single process.
+    templates
+        The templates of the algorithms and datasets of the experiments,
+        see `Templates`. The experiments of an `Experiments` object share
+        the templates since they share their algorithms and datasets.
+    fragments
+        The parts of the JSONs which only depend on the algorithm or the
+        dataset of an experiment, see `Fragments`. These are shared by
+        the experiments of an `Experiments` object like the templates.
+    profiler
+        If set, the time spent resolving `$trial` is recorded by this
+        `runtool.profiler.Profiler` while the JSONs are generated. The
+        work done by `workers` processes is not recorded.
 
     Returns
     -------
@@ -347,6 +493,51 @@ def generate_sagemaker_json(
         Dict
             JSON that can be used to create training jobs.
     """
+    if profiler is not None:
+        return profiler.iterate(
+            generate_sagemaker_json(
+                experiment,
+                runs,
+                experiment_name,
+                job_name_expression,
+                tags,
+                creation_time,
+                bucket,
+                role,
+                workers=workers,
+                templates=templates,
+                fragments=fragments,
+            )
+        )
+
+    if isinstance(experiment, Experiments) and workers:
+        unique = [index for index, _ in experiment.iter_unique()]
+        chunks = (
+            [experiment[unique[position]] for position in chunk]
+            for chunk in chunk_ranges(len(unique), workers)
+        )
+        return chain.from_iterable(
+            parallel_map(
+                partial(
+                    generate_sagemaker_json_chunk,
+                    runs=runs,
+                    experiment_name=experiment_name,
+                    job_name_expression=job_name_expression,
+                    tags=tags,
+                    creation_time=creation_time,
+                    bucket=bucket,
+                    role=role,
+                ),
+                chunks,
+                workers,
+            )
+        )
+
+    if templates is None:
+        templates = Templates()
+    if fragments is None:
+        fragments = Fragments()
+
     if isinstance(experiment, Experiments):
         return chain.from_iterable(
             generate_sagemaker_json(
@@ -358,23 +549,24 @@ def generate_sagemaker_json(
                 creation_time,
                 bucket,
                 role,
+                templates=templates,
+                fragments=fragments,
             )
-            for trial in experiment
+            for _, trial in experiment.iter_unique()
         )
 
     # we know here which algorithm is used with which dataset
-    # thus we can now resolve $eval in the experiment.
-    experiment = DotDict(
-        recursive_apply(
-            experiment.as_dict(),
-            partial(apply_trial, locals=dict(__trial__=experiment)),
-        )
-    )
+    # thus we can now resolve $eval and $where in the experiment.
+    resolved = profiled("$trial", templates.fill, experiment)
+
+    # the experiment violates a `$where` constraint using `$trial`
+    if resolved is None:
+        return []
 
     # generate jsons for calling the sagemaker api
     return generate_job_json(
         Job(
-            experiment=experiment,
+            experiment=resolved,
             runs=runs,
             experiment_name=experiment_name,
             job_name_expression=job_name_expression,
@@ -382,5 +574,238 @@ def generate_sagemaker_json(
             creation_time=creation_time,
             bucket=bucket,
             role=role,
+            run_configuration=Job.generate_run_configuration(
+                dict(experiment=resolved, experiment_name=experiment_name),
+                fragments,
+            ),
+        ),
+        fragments,
+    )
+
+
+def resolve_trial(node: dict, trial: Experiment) -> Any:
+    """
+    Resolves the `$eval` expressions and `$where` constraints of a node
+    which refer to the experiment `trial`.
+
+    >>> resolve_trial({"$eval": "__trial__.a + 1"}, {"a": 1})
+    2
+    >>> resolve_trial({"b": 1, "$where": "$trial.a > b"}, {"a": 1})
+    Versions([])
+    """
+    node = apply_trial(node, locals=dict(__trial__=trial))
+    return apply_where(node, trial=trial)
+
+
+def find_holes(node: Any, index: DirectiveIndex) -> List[Tuple[tuple, Any]]:
+    """
+    Returns the path and the value of each node in `node` which contains any
+    of the keys of `index`, nodes within these nodes are not returned.
+
+    >>> find_holes(
+    ...     {"a": [{"$eval": "1"}], "b": {"c": 1, "$where": "c > 0"}},
+    ...     DirectiveIndex(["$eval", "$where"]),
+    ... )
+    [(('a', 0), {'$eval': '1'}), (('b',), {'c': 1, '$where': 'c > 0'})]
+    """
+    holes = []
+    stack = [((), node)]
+    while stack:
+        path, node = stack.pop()
+        if not index.contains(node):
+            continue
+        if isinstance(node, dict) and any(key in node for key in index.keys):
+            holes.append((path, node))
+            continue
+        items = node.items() if isinstance(node, dict) else enumerate(node)
+        # the holes are found in the order of the node
+        stack.extend(
+            reversed([(path + (key,), value) for key, value in items])
+        )
+    return holes
+
+
+def replace_in(
+    node: Any, path: tuple, value: Any, convert: bool = True
+) -> Any:
+    """
+    Returns a copy of `node` where the value at `path` is replaced by
+    `value`, only the dicts and lists along `path` are copied. Dicts which
+    are not in a list are converted into `DotDict` objects if `convert`
+    is True as `DotDict` would.
+
+    >>> node = DotDict({"a": {"b": 1}, "c": {"d": 2}})
+    >>> replaced = replace_in(node, ("a", "b"), {"e": 3})
+    >>> replaced.a.b.e, replaced.c is node.c, node.a.b
+    (3, True, 1)
+    """
+    if not path:
+        if convert and hasattr(value, "keys"):
+            return DotDict(value)
+        return value
+
+    key, rest = path[0], path[1:]
+    if isinstance(node, list):
+        copy = list(node)
+        convert = False
+    else:
+        copy = DotDict.__new__(type(node))
+        dict.update(copy, node)
+    copy[key] = replace_in(node[key], rest, value, convert)
+    return copy
+
+
+class Template:
+    """
+    An algorithm or dataset where the nodes which are resolved once the
+    experiment is known, i.e. the remaining `$eval` expressions and `$where`
+    constraints, are holes. The rest of the node is converted into a
+    `DotDict` once and shared by all experiments using the node, thus only
+    the holes are resolved for each experiment.
+
+    If the holes only read the `side` of the experiment which the node is,
+    they are resolved once and the result is reused for all experiments.
+
+    >>> index = DirectiveIndex(["$eval", "$where"])
+    >>> template = Template(
+    ...     {"image": "x", "freq": {"$eval": "$trial.dataset.meta.freq"}},
+    ...     "algorithm",
+    ...     index,
+    ... )
+    >>> template.holes, template.reads
+    ([(('freq',), {'$eval': '$trial.dataset.meta.freq'})], \
+{('dataset', 'meta', 'freq')})
+    >>> template.fill({"dataset": {"meta": {"freq": "H"}}})
+    {'image': 'x', 'freq': 'H'}
+    """
+
+    def __init__(self, node: dict, side: str, index: DirectiveIndex):
+        if hasattr(node, "as_dict"):
+            node = node.as_dict()
+        self.index = index
+        self.holes = find_holes(node, index)
+        self.dotdict = DotDict(node)
+
+        # the paths in the experiment which the expressions of the holes
+        # read, None if an expression reads the whole experiment.
+        self.reads = set()
+        deterministic = True
+        for expression in self.expressions():
+            deterministic &= expression.names.isdisjoint(
+                NONDETERMINISTIC_NAMES
+            )
+            for reference in expression.references:
+                if reference.root == TRIAL:
+                    if not reference.keys:
+                        self.reads = None
+                        break
+                    self.reads.add(reference.keys)
+            if self.reads is None:
+                break
+
+        self.shared = (
+            deterministic
+            and self.reads is not None
+            and all(path[0] == side for path in self.reads)
+        )
+        self.filled: list = []
+
+    def expressions(self) -> Iterable:
+        """
+        Yields the compiled `$eval` expressions and `$where` constraints in
+        the holes.
+        """
+        stack = [node for _, node in self.holes]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                for key in ("$eval", "$where"):
+                    if key in node:
+                        yield compile_expression(str(node[key]))
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                stack.extend(node)
+
+    def fill(self, trial: Any) -> Optional[DotDict]:
+        """
+        Returns the node where the holes are resolved for the experiment
+        `trial` or None if the experiment violates a `$where` constraint.
+        """
+        if not self.holes:
+            return self.dotdict
+        if self.filled:
+            return self.filled[0]
+
+        filled = self.dotdict
+        for path, hole in self.holes:
+            if any(isinstance(value, (dict, list)) for value in hole.values()):
+                value = recursive_apply(
+                    hole, partial(resolve_trial, trial=trial), index=self.index
+                )
+            else:
+                value = resolve_trial(hole, trial)
+            if isinstance(value, Versions):
+                filled = None
+                break
+            filled = replace_in(filled, path, value)
+
+        if self.shared:
+            self.filled.append(filled)
+        return filled
+
+
+class Templates:
+    """
+    Creates the `Template` objects of the algorithms and datasets of
+    experiments. Each node gets one template which is kept as long as at
+    most `max_size` templates are kept, the nodes are identified by their
+    id as in `runtool.recurse_config.DirectiveIndex`.
+    """
+
+    def __init__(self, max_size: int = 2**12):
+        # after the config has been transformed only the `$eval`
+        # expressions and `$where` constraints which use `$trial` remain
+        self.index = DirectiveIndex(["$eval", "$where"])
+        self.max_size = max_size
+        self.entries: Dict[int, Tuple[Any, Template]] = {}
+
+    def get(self, node: dict, side: str) -> Template:
+        """
+        Returns the template of `node` which is the `side` of experiments.
+        """
+        entry = self.entries.get(id(node))
+        if entry is None or entry[0] is not node:
+            if len(self.entries) >= self.max_size:
+                self.entries.clear()
+            entry = node, Template(node, side, self.index)
+            self.entries[id(node)] = entry
+        return entry[1]
+
+    def fill(self, experiment: Experiment) -> Optional[DotDict]:
+        """
+        Returns the experiment as a `DotDict` where the `$eval` expressions
+        and `$where` constraints are resolved or None if the experiment
+        violates a `$where` constraint.
+        """
+        filled = DotDict.__new__(DotDict)
+        for side in ("algorithm", "dataset"):
+            node = self.get(experiment[side], side).fill(experiment)
+            if node is None:
+                return None
+            filled[side] = node
+        return filled
+
+
+def generate_sagemaker_json_chunk(
+    experiments: List[Experiment], **kwargs
+) -> List[dict]:
+    """
+    Generates the JSONs of a chunk of experiments, this is what each
+    process runs when `generate_sagemaker_json` is called with `workers`.
+    The `kwargs` are passed on to `generate_sagemaker_json`.
+    """
+    return list(
+        generate_sagemaker_json(
+            Experiments.from_sequence(experiments), **kwargs
         )
     )
@@ -0,0 +1,476 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""
+Compiles the expressions of `$eval` and `$where` into reusable callables.
+
+An expression is Python code which can reference the config with `$`,
+i.e. `$.algorithm.image`, and the experiment with `$trial` or `__trial__`,
+i.e. `$trial.dataset.meta.freq`. Each expression is parsed once, its
+references are replaced by names which are bound to the referenced values
+when the expression is evaluated. Thus the values are never spliced into
+the text of the expression, and the expression is never parsed again.
+"""
+
+import ast
+import builtins
+import re
+from collections import UserList
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Tuple, Union
+from uuid import uuid4
+
+from runtool.datatypes import DotDict, LazyDotDict
+from runtool.utils import fold_tree
+
+# the roots of references to the config and to the experiment
+CONFIG = "$"
+TRIAL = "__trial__"
+
+# the builtins available in expressions, anything which imports modules,
+# accesses files or evaluates code is left out
+SAFE_BUILTINS = {
+    name: getattr(builtins, name)
+    for name in (
+        "abs",
+        "all",
+        "any",
+        "bin",
+        "bool",
+        "chr",
+        "dict",
+        "divmod",
+        "enumerate",
+        "filter",
+        "float",
+        "format",
+        "frozenset",
+        "hash",
+        "hex",
+        "id",
+        "int",
+        "isinstance",
+        "len",
+        "list",
+        "map",
+        "max",
+        "min",
+        "oct",
+        "ord",
+        "pow",
+        "range",
+        "repr",
+        "reversed",
+        "round",
+        "set",
+        "slice",
+        "sorted",
+        "str",
+        "sum",
+        "tuple",
+        "zip",
+    )
+}
+
+# a key of a reference, i.e. `.image`, `[0]`, `["image"]` or `['image']`
+PART_PATTERN = re.compile(r"""\.(\w+)|\[(\d+)\]|\[(["'])([\w$]+)\3\]""")
+WORD_PATTERN = re.compile(r"\w+")
+STRING_PREFIXES = frozenset(("r", "u", "b", "f", "br", "rb", "fr", "rf"))
+
+# the types of values which are passed to expressions as they are
+LEAF_TYPES = frozenset((str, int, float, bool, type(None)))
+
+
+class Reference(NamedTuple):
+    """
+    A reference to the config if `root` is `CONFIG` or to the experiment if
+    `root` is `TRIAL`. `keys` is the path of the referenced value and
+    `parts` the source of each key, such as `.image` or `["image"]`. If
+    the reference is in a replacement field of an f-string, `quote` is
+    the quote of the f-string.
+    """
+
+    root: str
+    keys: Tuple[str, ...]
+    parts: Tuple[str, ...]
+    quote: str = ""
+
+    @property
+    def source(self) -> str:
+        """
+        The source of the reference where `$trial` is named `__trial__`.
+        """
+        return self.root + "".join(self.parts)
+
+    def lookup(self, data: Any) -> Tuple[int, Any]:
+        """
+        Follows the keys of the reference in `data` as far as they exist and
+        returns the number of keys which were followed and the value which
+        was reached. The remaining keys are attributes or items of the value
+        such as `split` in `$.name.split()`.
+
+        >>> reference = Reference("$", ("a", "0", "b"), (".a", "[0]", ".b"))
+        >>> reference.lookup({"a": ["x y"]})
+        (2, 'x y')
+        """
+        consumed = 0
+        for key in self.keys:
+            try:
+                data = data[key]
+            except TypeError:
+                try:
+                    data = data[int(key)]
+                except Exception:
+                    break
+            except Exception:
+                break
+            consumed += 1
+        return consumed, data
+
+    def follow(self, value: Any, consumed: int) -> Any:
+        """
+        Applies the keys after the first `consumed` keys to `value` as the
+        Python code of the reference would.
+        """
+        if consumed == len(self.keys):
+            return value
+        for key, part in zip(self.keys[consumed:], self.parts[consumed:]):
+            if part.startswith("."):
+                value = getattr(value, key)
+            elif part[1] in "\"'":
+                value = value[key]
+            else:
+                value = value[int(key)]
+        return value
+
+
+def scan(text: str, start: int = 0, field: str = "") -> Tuple[list, int]:
+    """
+    Splits the code in `text` into the references it contains and the code
+    between them, references within strings are not split off except in
+    the replacement fields of f-strings. If `field` is the quote of an
+    f-string, the code of a replacement field of the f-string is scanned,
+    this ends at the closing `}`.
+
+    >>> segments, _ = scan("$.a['b'] + len(\\"$.c\\") + $trial.d")
+    >>> [getattr(segment, "source", segment) for segment in segments]
+    ["$.a['b']", ' + len("$.c") + ', '__trial__.d']
+
+    Returns
+    -------
+    Tuple[list, int]
+        The segments which are strings or `Reference` objects and the
+        position where scanning ended.
+    """
+    segments: List[Union[str, Reference]] = []
+    depth = 0
+    position = start
+    while position < len(text):
+        char = text[position]
+        root = None
+        if text.startswith("$trial", position) and not (
+            text[position + 6 : position + 7].isidentifier()
+            or text[position + 6 : position + 7].isdigit()
+        ):
+            root, end = TRIAL, position + 6
+        elif char == "$" and PART_PATTERN.match(text, position + 1):
+            root, end = CONFIG, position + 1
+        elif char.isidentifier():
+            word = WORD_PATTERN.match(text, position)[0]
+            end = position + len(word)
+            if word == TRIAL:
+                root = TRIAL
+            elif word.lower() in STRING_PREFIXES and text[end : end + 1] in (
+                "'",
+                '"',
+            ):
+                position = scan_string(text, position, end, segments)
+                continue
+            else:
+                segments.append(word)
+                position = end
+                continue
+        elif char in "'\"":
+            position = scan_string(text, position, position, segments)
+            continue
+
+        if root is not None:
+            keys, parts = [], []
+            match = PART_PATTERN.match(text, end)
+            while match:
+                keys.append(match[1] or match[2] or match[4])
+                parts.append(match[0])
+                end = match.end()
+                match = PART_PATTERN.match(text, end)
+            segments.append(Reference(root, tuple(keys), tuple(parts), field))
+            position = end
+            continue
+
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            if field and depth == 0:
+                return merge(segments), position
+            depth -= 1
+        segments.append(char)
+        position += 1
+    return merge(segments), position
+
+
+def merge(segments: list) -> list:
+    """
+    Joins the consecutive strings in `segments`.
+
+    >>> merge(["a", "b", Reference("$", ("c",), (".c",)), "d"])
+    ['ab', Reference(root='$', keys=('c',), parts=('.c',), quote=''), 'd']
+    """
+    merged: list = []
+    for segment in segments:
+        if merged and isinstance(segment, str) and isinstance(merged[-1], str):
+            merged[-1] += segment
+        else:
+            merged.append(segment)
+    return merged
+
+
+def scan_string(text: str, start: int, quote: int, segments: list) -> int:
+    """
+    Scans the string literal starting at `start` whose quote starts at
+    `quote`, the string is appended to `segments`. The replacement fields
+    of f-strings are scanned for references using `scan`.
+    """
+    delimiter = text[quote] * (
+        3 if text.startswith(text[quote] * 3, quote) else 1
+    )
+    formatted = "f" in text[start:quote].lower()
+    segments.append(text[start : quote + len(delimiter)])
+    position = quote + len(delimiter)
+    while position < len(text):
+        if text.startswith(delimiter, position):
+            segments.append(delimiter)
+            return position + len(delimiter)
+        if text[position] == "\\" or (
+            formatted and text[position : position + 2] in ("{{", "}}")
+        ):
+            segments.append(text[position : position + 2])
+            position += 2
+        elif formatted and text[position] == "{":
+            field, position = scan(text, position + 1, field=delimiter)
+            segments += ["{", *field, "}"]
+            position += 1
+        else:
+            segments.append(text[position])
+            position += 1
+    return position
+
+
+def to_source(value: Any, quote: str = "") -> str:
+    """
+    Returns the source code of `value`, an expression which is evaluated
+    once the experiment is known is put in parentheses. A string in a
+    replacement field of an f-string with the given `quote` uses the
+    other kind of quote where possible, which older versions of Python
+    require.
+
+    >>> to_source("x y"), to_source({"$eval": "1 + 1"}), to_source([1])
+    ("'x y'", '(1 + 1)', '[1]')
+    >>> to_source("x", quote="'")
+    '"x"'
+    """
+    if isinstance(value, dict) and "$eval" in value:
+        return f"({value['$eval']})"
+    if not isinstance(value, str):
+        return str(value)
+
+    source = repr(value)
+    if quote and source[0] == quote[0]:
+        other = "'" if quote[0] == '"' else '"'
+        if other not in value and source[1:-1] == value:
+            return other + value + other
+        if other * 3 not in value and not value.endswith(other):
+            return other * 3 + value + other * 3
+    return source
+
+
+def plain(value: Any) -> Any:
+    """
+    Converts the dicts and lists in `value` into plain `dict` and `list`
+    objects, this is how referenced values are passed to expressions.
+
+    >>> plain(DotDict({"a": [DotDict({"b": 1})]}))
+    {'a': [{'b': 1}]}
+    """
+    if type(value) in LEAF_TYPES:
+        return value
+
+    def children(node: Any) -> Any:
+        if isinstance(node, Mapping):
+            return node.values()
+        if isinstance(node, (list, UserList)):
+            return node
+        return None
+
+    def combine(node: Any, values: list) -> Any:
+        if isinstance(node, Mapping):
+            return dict(zip(node.keys(), values))
+        return values
+
+    return fold_tree(value, children, combine)
+
+
+class Expression:
+    """
+    An expression compiled into Python code where each reference is replaced
+    by a name, see `scan`. The expression is evaluated by calling it with
+    the `locals` which the names used by the expression and the references
+    are looked up in. References to the experiment are looked up in
+    `locals["__trial__"]`.
+
+    >>> expression = Expression("$.a.split() + [x]")
+    >>> expression({"a": "y z", "x": "x"})
+    ['y', 'z', 'x']
+    >>> sorted(expression.names)
+    ['x']
+
+    Only the builtins in `SAFE_BUILTINS` can be used and names and attributes
+    starting with `__` are not allowed.
+
+    >>> Expression("__import__('os')")
+    Traceback (most recent call last):
+    ...
+    ValueError: __import__ is not allowed in $eval: __import__('os')
+    >>> Expression("open('config.yml')")({})
+    Traceback (most recent call last):
+    ...
+    NameError: builtin 'open' is not allowed in $eval: open('config.yml')
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.segments, _ = scan(text)
+        self.references: List[Reference] = [
+            segment
+            for segment in self.segments
+            if isinstance(segment, Reference)
+        ]
+        self.placeholders = [
+            f"__reference{index}__" for index in range(len(self.references))
+        ]
+        placeholders = iter(self.placeholders)
+        source = "".join(
+            next(placeholders) if isinstance(segment, Reference) else segment
+            for segment in self.segments
+        )
+
+        tree = ast.parse(source.lstrip(" \t"), "<$eval>", "eval")
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name):
+                name = node.id
+                if name in self.placeholders:
+                    continue
+                names.add(name)
+            elif isinstance(node, ast.Attribute):
+                name = node.attr
+            else:
+                continue
+            if name.startswith("__"):
+                raise ValueError(f"{name} is not allowed in $eval: {text}")
+
+        self.names: FrozenSet[str] = frozenset(names)
+        self.code = compile(tree, "<$eval>", "eval")
+
+    def lookup(self, index: int, locals: dict) -> Tuple[int, Any]:
+        """
+        Looks up the reference with `index` in `locals`, see
+        `Reference.lookup`.
+        """
+        reference = self.references[index]
+        if reference.root == CONFIG:
+            return reference.lookup(locals)
+        if TRIAL not in locals:
+            raise NameError(f"name '{TRIAL}' is not defined")
+        return reference.lookup(locals[TRIAL])
+
+    def __call__(
+        self, locals: dict, values: Dict[int, Tuple[int, Any]] = None
+    ) -> Any:
+        """
+        Evaluates the expression. `values` contains the results of `lookup`
+        for the references which have already been looked up, the values
+        may have been transformed since, i.e. by evaluating them.
+        """
+        namespace = {"__builtins__": SAFE_BUILTINS}
+        if "uid" in self.names:
+            namespace["uid"] = str(uuid4()).split("-")[-1]
+        for name in self.names:
+            if name in locals:
+                value = locals[name]
+                if hasattr(value, "keys") and not isinstance(value, DotDict):
+                    value = LazyDotDict(value)
+                namespace[name] = value
+        for index, reference in enumerate(self.references):
+            if values and index in values:
+                consumed, value = values[index]
+            else:
+                consumed, value = self.lookup(index, locals)
+            namespace[self.placeholders[index]] = reference.follow(
+                plain(value), consumed
+            )
+        try:
+            return eval(self.code, namespace)
+        except NameError as error:
+            for name in self.names - namespace.keys():
+                if hasattr(builtins, name) and f"'{name}'" in str(error):
+                    raise NameError(
+                        f"builtin '{name}' is not allowed in $eval: "
+                        f"{self.text}"
+                    ) from None
+            raise
+
+    def substitute(self, values: Dict[int, Tuple[int, Any]]) -> str:
+        """
+        Returns the text of the expression where the references in `values`
+        are replaced by the source of their values, see `to_source`. This
+        is used to defer the evaluation of expressions referencing `$trial`.
+
+        >>> expression = Expression("f'{$.a}-{$trial.b}' + $.c.upper()")
+        >>> print(expression.substitute({0: (1, "x"), 2: (1, "it's")}))
+        f'{"x"}-{__trial__.b}' + "it's".upper()
+        """
+        result = []
+        index = 0
+        for segment in self.segments:
+            if not isinstance(segment, Reference):
+                result.append(segment)
+                continue
+            if index in values:
+                consumed, value = values[index]
+                result.append(to_source(value, segment.quote))
+                result += segment.parts[consumed:]
+            else:
+                result.append(segment.source)
+            index += 1
+        return "".join(result)
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(text: str) -> Expression:
+    """
+    Compiles an expression, each unique expression is only compiled once.
+
+    >>> compile_expression("1 + $.a") is compile_expression("1 + $.a")
+    True
+    """
+    return Expression(text)
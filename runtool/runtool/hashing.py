@@ -0,0 +1,259 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""
+Canonical structural hashes of config nodes. Two nodes have the same hash
+if they are equal, regardless of the order of the keys of their dicts.
+The hash of a dict or list is a BLAKE2 digest of the encoding of its
+children, where a child which is a dict or a list is encoded by its own
+digest. Thus the hash of a node which is shared by several others, such
+as an algorithm shared by many experiments, can be reused, see `digest`.
+"""
+
+from collections.abc import Mapping, Sequence
+from hashlib import blake2b
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from runtool.utils import fold_tree
+
+DIGEST_SIZE = 16
+LEAF_TYPES = (str, bytes, int, float, type(None))
+
+
+class Digest(bytes):
+    """The digest of a dict or a list, as opposed to a `bytes` value."""
+
+
+def is_node(value: Any) -> bool:
+    """
+    Checks if `value` is hashed by the digests of its children.
+
+    >>> is_node({"a": 1}), is_node([1]), is_node("abc")
+    (True, True, False)
+    """
+    # the checks against the abstract classes are slow, thus the common
+    # types are checked first
+    if isinstance(value, (dict, list, tuple)):
+        return True
+    if isinstance(value, LEAF_TYPES):
+        return False
+    return isinstance(value, (Mapping, Sequence))
+
+
+def encode_bool(value: bool) -> bytes:
+    return b"t" if value else b"f"
+
+
+def encode_int(value: int) -> bytes:
+    return b"i%d;" % value
+
+
+def encode_float(value: float) -> bytes:
+    return b"d" + repr(value).encode() + b";"
+
+
+def encode_str(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return b"s%d:" % len(data) + data
+
+
+def encode_digest(value: Digest) -> bytes:
+    # digests have a fixed size, thus the tag is enough to decode them
+    return b"h" + value
+
+
+ENCODERS: Dict[type, Callable[[Any], bytes]] = {
+    Digest: encode_digest,
+    type(None): lambda value: b"n",
+    bool: encode_bool,
+    int: encode_int,
+    float: encode_float,
+    str: encode_str,
+}
+
+
+def encode(value: Any) -> bytes:
+    """
+    Encodes a value which is not a dict or list, each type has its own
+    prefix thus `1`, `1.0`, `True` and `"1"` have different encodings.
+    The digest of a dict or list is prefixed as well, thus the encoding of
+    a node can only be decoded in one way.
+
+    >>> encode(1), encode(1.0), encode(True), encode("1")
+    (b'i1;', b'd1.0;', b't', b's1:1')
+    """
+    # the exact types are looked up first as this is the hottest path
+    encoder = ENCODERS.get(type(value))
+    if encoder is not None:
+        return encoder(value)
+    if isinstance(value, Digest):
+        return encode_digest(value)
+    if isinstance(value, bool):
+        return encode_bool(value)
+    if isinstance(value, int):
+        return encode_int(value)
+    if isinstance(value, float):
+        return encode_float(value)
+    if isinstance(value, str):
+        return encode_str(value)
+    data = repr(value).encode("utf-8")
+    return b"r%d:" % len(data) + data
+
+
+def combine(node: Any, results: List[Any]) -> Digest:
+    """
+    Calculates the digest of a dict or list from the results of its
+    children, the items of a dict are sorted by the encodings of the keys.
+    """
+    if isinstance(node, (dict, Mapping)):
+        items = sorted(
+            encode(key) + encode(result)
+            for key, result in zip(node.keys(), results)
+        )
+        data = b"{" + b"".join(items) + b"}"
+    else:
+        data = b"[" + b"".join(map(encode, results)) + b"]"
+    return Digest(blake2b(data, digest_size=DIGEST_SIZE).digest())
+
+
+def digest(node: Any, memo: Dict[int, Tuple[Any, Digest]] = None) -> bytes:
+    """
+    Returns the canonical digest of `node`.
+
+    If `memo` is given, the digests of the dicts and lists in `node` are
+    stored in it and reused when the same object is hashed again. The
+    nodes are kept in `memo` together with their digests, thus a node
+    cannot be replaced by another one with the same `id`. The nodes may
+    not be modified while `memo` is used.
+
+    >>> shared = {"image": "image", "instance": "ml.m5.large"}
+    >>> memo = {}
+    >>> digest([shared, 1], memo) == digest([dict(shared), 1])
+    True
+    >>> id(shared) in memo
+    True
+    """
+    if memo is not None and id(node) in memo:
+        return memo[id(node)][1]
+
+    def children(node: Any) -> Iterable:
+        if not is_node(node):
+            return None
+        if memo is not None and id(node) in memo:
+            return ()
+        return node.values() if isinstance(node, (dict, Mapping)) else node
+
+    def fold(node: Any, results: List[Any]) -> Digest:
+        if memo is None:
+            return combine(node, results)
+        if id(node) not in memo:
+            memo[id(node)] = node, combine(node, results)
+        return memo[id(node)][1]
+
+    result = fold_tree(node, children, fold)
+    if isinstance(result, Digest):
+        return result
+    return blake2b(encode(result), digest_size=DIGEST_SIZE).digest()
+
+
+def shallow_digest(node: Any, memo: Dict[int, Tuple[Any, Digest]]) -> bytes:
+    """
+    Returns the same digest as `digest` but only the children of `node`
+    are stored in `memo`. This is used for the many short-lived nodes
+    sharing the same children, such as the experiments of a grid, which
+    would otherwise all be kept alive by `memo`.
+
+    >>> shared = {"image": "image"}
+    >>> node, memo = {"algorithm": shared}, {}
+    >>> shallow_digest(node, memo) == digest(node)
+    True
+    >>> id(shared) in memo, id(node) in memo
+    (True, False)
+    """
+    if not is_node(node):
+        return digest(node)
+    values = node.values() if isinstance(node, Mapping) else node
+    return combine(
+        node,
+        [digest(value, memo) if is_node(value) else value for value in values],
+    )
+
+
+class Hasher:
+    """
+    Hashes nodes while memoizing the digests of the dicts and lists in
+    them, thus a node which is shared by many others, such as the dataset
+    of a grid of experiments, is only hashed once. The node passed to
+    `digest` is not memoized itself, see `shallow_digest`. At most
+    `max_size` digests are kept and the nodes may not be modified while
+    they are hashed by the same `Hasher`.
+
+    >>> hasher = Hasher()
+    >>> dataset = {"path": {"train": "s3://bucket/train"}}
+    >>> hasher.hexdigest({"dataset": dataset}) == canonical_hash(
+    ...     {"dataset": dataset}
+    ... )
+    True
+    >>> len(hasher.memo)
+    2
+    """
+
+    def __init__(self, max_size: int = 2**16):
+        self.max_size = max_size
+        self.memo: Dict[int, Tuple[Any, Digest]] = {}
+
+    def digest(self, node: Any) -> bytes:
+        """
+        Returns the canonical digest of `node`.
+        """
+        if len(self.memo) >= self.max_size:
+            self.memo.clear()
+        return shallow_digest(node, self.memo)
+
+    def hexdigest(self, node: Any) -> str:
+        """
+        Returns the canonical hash of `node`, see `canonical_hash`.
+        """
+        return self.digest(node).hex()
+
+
+def canonical_hash(node: Any) -> str:
+    """
+    Returns the canonical hash of `node` as a hex string, it does not
+    depend on the order of the keys of any dicts in `node`.
+
+    >>> canonical_hash({"a": 1, "b": [1, 2]}) == canonical_hash(
+    ...     {"b": [1, 2], "a": 1}
+    ... )
+    True
+    >>> canonical_hash([1, 2]) == canonical_hash([2, 1])
+    False
+    >>> len(canonical_hash("text"))
+    32
+    """
+    return digest(node).hex()
+
+
+def unique(items: Iterable, memo: Dict = None) -> list:
+    """
+    Returns the items with a unique canonical hash in their original
+    order, i.e. only the first of several equal items is kept.
+
+    >>> unique([{"a": 1, "b": 2}, {"c": 3}, {"b": 2, "a": 1}])
+    [{'a': 1, 'b': 2}, {'c': 3}]
+    """
+    memo = {} if memo is None else memo
+    index = {}
+    for item in items:
+        index.setdefault(digest(item, memo), item)
+    return list(index.values())
@@ -0,0 +1,166 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import hashlib
+import json
+import marshal
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Union
+
+import yaml
+
+import runtool
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# the libyaml based loader is much faster than the pure python loader
+# but it is only available if PyYAML was built with libyaml.
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def parse_yaml(data: Union[str, bytes]) -> Any:
+    """
+    Parses a YAML document using the fastest available safe loader.
+
+    >>> parse_yaml("a: [1, 2]")
+    {'a': [1, 2]}
+    """
+    return yaml.load(data, Loader=SafeLoader)
+
+
+def parse_json(data: Union[str, bytes]) -> Any:
+    """
+    Parses a JSON document, `orjson` is used if it is installed.
+
+    >>> parse_json(b'{"a": [1, 2]}')
+    {'a': [1, 2]}
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def parse_config(data: Union[str, bytes], path: Union[str, Path]) -> Any:
+    """
+    Parses the content of the config file at `path`. Files ending with
+    `.json` are parsed as JSON, any other file is parsed as YAML.
+
+    >>> parse_config('{"a": 1}', "config.json")
+    {'a': 1}
+    >>> parse_config("a: 1", "config.yml")
+    {'a': 1}
+    """
+    if Path(path).suffix.lower() == ".json":
+        return parse_json(data)
+    return parse_yaml(data)
+
+
+def snapshot_path(path: Union[str, Path]) -> Path:
+    """
+    Returns the path of the snapshot of a config file.
+
+    >>> snapshot_path("configs/large.yml").name
+    '.large.yml.snapshot'
+    """
+    path = Path(path)
+    return path.with_name(f".{path.name}.snapshot")
+
+
+def read_config(path: Union[str, Path], snapshot: bool = False) -> Any:
+    """
+    Reads and parses the config file at `path`.
+
+    If `snapshot` is True, the parsed config is stored in a snapshot file
+    next to the config file. Later calls reuse the snapshot instead of
+    parsing the config again as long as the modification time and
+    the hash of the config file match the ones stored in the snapshot.
+
+    Parameters
+    ----------
+    path
+        Path to a YAML or JSON config file.
+    snapshot
+        Whether a snapshot of the parsed config should be used.
+    Returns
+    -------
+    Any
+        The parsed config.
+    """
+    with open(path, "rb") as config_file:
+        data = config_file.read()
+
+    if not snapshot:
+        return parse_config(data, path)
+
+    header = dict(
+        mtime=os.stat(path).st_mtime_ns,
+        sha256=hashlib.sha256(data).hexdigest(),
+        version=runtool.__version__,
+    )
+    stored = load_snapshot(snapshot_path(path), header)
+    if stored is not None:
+        return stored["config"]
+
+    config = parse_config(data, path)
+    save_snapshot(snapshot_path(path), header, dict(config=config))
+    return config
+
+
+def load_snapshot(path: Path, header: dict) -> Any:
+    """
+    Loads a snapshot if its header matches `header`, None is returned if
+    it is missing, unreadable or belongs to another version of the config.
+
+    A snapshot consists of a line with a JSON header followed by the
+    parsed config serialized with `marshal`. The header is checked before
+    the config is deserialized, and unlike `pickle`, `marshal` cannot run
+    code while loading data, thus reading a snapshot which was tampered
+    with does not execute anything.
+    """
+    try:
+        with open(path, "rb") as snapshot:
+            stored = json.loads(snapshot.readline())
+            if not isinstance(stored, dict) or any(
+                stored.get(key) != value for key, value in header.items()
+            ):
+                return None
+            content = marshal.loads(snapshot.read())
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+    return content if isinstance(content, dict) else None
+
+
+def save_snapshot(path: Path, header: dict, content: dict):
+    """
+    Writes a snapshot, failing to write it is not an error since the
+    snapshot only speeds up reading the config. Configs containing values
+    which `marshal` does not support, such as dates, are not stored.
+    """
+    try:
+        data = marshal.dumps(content)
+    except ValueError:
+        return
+
+    try:
+        descriptor, temporary = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(descriptor, "wb") as snapshot_file:
+            snapshot_file.write(json.dumps(header).encode() + b"\n")
+            snapshot_file.write(data)
+        os.replace(temporary, path)
+    except OSError:
+        pass
@@ -0,0 +1,138 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""
+Job files store the JSONs which start training jobs in SageMaker, one JSON
+per line. The jobs of an experiment can thus be generated on one machine
+and started from another, and neither needs to keep all jobs in memory.
+Job files are only appended to, files ending with `.gz` are compressed
+with gzip and files ending with `.zst` with zstd, which requires the
+`zstandard` package.
+"""
+
+import gzip
+import io
+import json
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Union
+
+from runtool.ingestion import parse_json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZSTD_SUFFIXES = (".zst", ".zstd")
+
+
+def open_job_file(path: Union[str, Path], mode: str = "rb") -> IO[bytes]:
+    """
+    Opens the job file at `path` in the binary `mode` "rb" or "ab", the
+    file is compressed or decompressed depending on its suffix.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == ".gz":
+        return gzip.open(path, mode)
+    if suffix not in ZSTD_SUFFIXES:
+        return open(path, mode)
+    if zstandard is None:
+        raise ImportError(f"The zstandard package is required to open {path}.")
+    if "r" not in mode:
+        return zstandard.open(path, mode)
+    # each time jobs are appended to a file a new frame is started
+    return io.BufferedReader(
+        zstandard.ZstdDecompressor().stream_reader(
+            open(path, mode), read_across_frames=True, closefd=True
+        )
+    )
+
+
+def dump_job(job: dict) -> bytes:
+    """
+    Serializes a job as a line of a job file, `orjson` is used if it is
+    installed.
+
+    >>> dump_job({"TrainingJobName": "job", "HyperParameters": {"a": "1"}})
+    b'{"TrainingJobName":"job","HyperParameters":{"a":"1"}}\\n'
+    """
+    if orjson is not None:
+        return orjson.dumps(job, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+    return json.dumps(job, separators=(",", ":")).encode() + b"\n"
+
+
+class JobWriter:
+    """
+    Appends jobs to the job file at `path`, the file is created if it does
+    not exist. The jobs are written as they are passed to `write`, thus
+    the jobs generated by `runtool.experiments_converter` can be streamed
+    into the file.
+
+    >>> import tempfile
+    >>> path = Path(tempfile.mkdtemp()) / "jobs.jsonl.gz"
+    >>> with JobWriter(path) as writer:
+    ...     writer.write({"TrainingJobName": "first"})
+    ...     writer.write({"TrainingJobName": "second"})
+    >>> writer.count
+    2
+    >>> [job["TrainingJobName"] for job in read_jobs(path)]
+    ['first', 'second']
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.count = 0
+        self.file = None
+
+    def __enter__(self) -> "JobWriter":
+        self.file = open_job_file(self.path, "ab")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.file.close()
+        self.file = None
+
+    def write(self, job: dict) -> None:
+        """
+        Appends `job` to the job file.
+        """
+        self.file.write(dump_job(job))
+        self.count += 1
+
+
+def write_jobs(path: Union[str, Path], jobs: Iterable[dict]) -> int:
+    """
+    Appends `jobs` to the job file at `path` and returns the number of
+    jobs which were written.
+    """
+    with JobWriter(path) as writer:
+        for job in jobs:
+            writer.write(job)
+    return writer.count
+
+
+def read_jobs(path: Union[str, Path]) -> Iterator[dict]:
+    """
+    Reads the jobs in the job file at `path` in the order in which they
+    were written. The jobs are read lazily, thus only the job which is
+    currently used is kept in memory.
+    """
+    with open_job_file(path, "rb") as file:
+        for line in file:
+            if line.strip():
+                yield parse_json(line)
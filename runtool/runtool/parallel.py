@@ -0,0 +1,87 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List
+
+# number of chunks each worker processes, using more chunks than workers
+# evens out the load when some chunks take longer than others.
+CHUNKS_PER_WORKER = 4
+
+
+def split_range(total: int, parts: int) -> List[range]:
+    """
+    Splits `range(total)` into at most `parts` contiguous ranges
+    of nearly equal length.
+
+    >>> split_range(10, 3)
+    [range(0, 3), range(3, 6), range(6, 10)]
+    >>> split_range(2, 3)
+    [range(0, 1), range(1, 2)]
+    """
+    parts = max(1, min(parts, total))
+    return [
+        range(total * index // parts, total * (index + 1) // parts)
+        for index in range(parts)
+    ]
+
+
+def chunk_ranges(total: int, workers: int) -> List[range]:
+    """
+    Splits `range(total)` into the chunks which `workers` processes
+    should work on.
+
+    >>> chunk_ranges(100, 2)
+    [range(0, 12), range(12, 25), range(25, 37), range(37, 50), \
+range(50, 62), range(62, 75), range(75, 87), range(87, 100)]
+    """
+    return split_range(total, workers * CHUNKS_PER_WORKER)
+
+
+def parallel_map(
+    fn: Callable[[Any], Any], chunks: Iterable, workers: int
+) -> Iterator:
+    """
+    Applies `fn` to each chunk in `chunks` using a pool of `workers`
+    processes and yields the results in the same order as `chunks`.
+
+    Chunks are submitted to the pool as results are consumed, thus at most
+    a few chunks per worker are held in memory at the same time.
+    Both `fn` and the chunks need to be picklable.
+
+    >>> list(parallel_map(sum, [[1, 2], [3, 4], [5]], workers=2))
+    [3, 7, 5]
+
+    Parameters
+    ----------
+    fn
+        The function to apply to each chunk.
+    chunks
+        The chunks of work which should be processed.
+    workers
+        The number of processes to use.
+    Returns
+    -------
+    Iterator
+        The result of `fn` for each chunk.
+    """
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(fn, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,403 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+from functools import partial
+from typing import Any, Dict, List, NamedTuple
+
+from runtool.recurse_config import recursive_apply
+from runtool.dependencies import CircularReferenceError, resolve_from
+from runtool.sampling import count_samples
+from runtool.transformations import apply_eval, count_zip, find_sweep
+from runtool.transformer import find_components
+from runtool.utils import (
+    Located,
+    fold_tree,
+    get_item_from_path,
+    is_container,
+    join_path,
+)
+
+
+class ChoicePoint(NamedTuple):
+    """
+    A node in the config which generates several versions.
+
+    `width` is the number of alternatives listed in the directive and
+    `versions` is the number of versions the node expands into, including
+    any versions generated by its children.
+    """
+
+    path: str
+    directive: str
+    width: int
+    versions: int
+
+
+class Reference(NamedTuple):
+    """An edge from the node at `path` to the node at `target`."""
+
+    path: str
+    directive: str
+    target: str
+
+
+class Count(NamedTuple):
+    """
+    The number of versions a node expands into together with the total
+    number of items in these versions. A version which is a list
+    contributes its length, any other value contributes one item.
+    """
+
+    versions: int
+    items: int
+
+
+def find_references(node: Any, path: str = "") -> List[Reference]:
+    """
+    Finds all `$from` and `$ref` directives in `node`.
+
+    >>> find_references({"a": {"$from": "b"}, "c": [{"$ref": "a"}]})
+    [Reference(path='a', directive='$from', target='b'), \
+Reference(path='c.0', directive='$ref', target='a')]
+    """
+    references = []
+
+    def children(located: Located) -> list:
+        # the references of a node are recorded when it is visited, i.e.
+        # before the references of its children
+        node = located.node
+        if isinstance(node, dict):
+            for directive in ("$from", "$ref"):
+                if directive in node:
+                    references.append(
+                        Reference(
+                            located.path, directive, str(node[directive])
+                        )
+                    )
+        return located.children(keep=is_container)
+
+    if is_container(node):
+        fold_tree(Located(node, path), children, lambda node, results: None)
+    return references
+
+
+class ExpansionPlan:
+    """
+    An `ExpansionPlan` describes how a config expands without performing
+    the expansion. It holds the choice points created by `$each`, `$sample`,
+    `$zip` and the numeric sweeps as well as the `$from` and `$ref` edges
+    between nodes of the config. The top level keys are grouped into
+    `components` which are expanded independently of each other, see
+    `runtool.transformer.find_components`.
+
+    The plan is created by `compile_plan`, refer to its documentation
+    for examples.
+    """
+
+    def __init__(
+        self,
+        counts: Dict[str, Count],
+        choice_points: List[ChoicePoint],
+        references: List[Reference],
+        components: List[List[str]] = None,
+    ):
+        self.counts = counts
+        self.choice_points = choice_points
+        self.references = references
+        self.components = (
+            components if components is not None else [[key] for key in counts]
+        )
+        self.component_of = {
+            key: component
+            for component in self.components
+            for key in component
+        }
+
+    def count(self, key: str = None) -> int:
+        """
+        Returns the number of versions `runtool.load_config` generates for
+        `key`, i.e. the number of versions of the component of `key`.
+        If no key is given, the largest number of versions of any key
+        is returned. Versions which are dropped by a `$where` constraint
+        are included in the count, thus it is an upper bound for configs
+        using `$where`.
+        """
+        if key is None:
+            return max(map(self.count, self.counts), default=1)
+        if key not in self.counts:
+            raise KeyError(key)
+
+        total = 1
+        for other in self.component_of[key]:
+            total *= self.counts[other].versions
+        return total
+
+    def items(self, key: str) -> int:
+        """
+        Returns the total number of items in the versions of `key`,
+        i.e. the number of `Algorithm` objects in `config.algorithms`.
+        """
+        own = self.counts[key]
+        if not own.versions:
+            # e.g. an `$each` without any values
+            return 0
+        return self.count(key) // own.versions * own.items
+
+    def jobs(self, *keys: str) -> int:
+        """
+        Returns the number of experiments which multiplying the `keys` with
+        each other generates, i.e. `jobs("a", "b")` is the length of
+        `config.a * config.b`.
+        """
+        total = 1
+        for key in keys:
+            total *= self.items(key)
+        return total
+
+    def explain(self) -> str:
+        """
+        Returns a human readable summary of the plan.
+        """
+        lines = [f"max versions: {self.count()}", "keys:"]
+        for key in self.counts:
+            lines.append(
+                f"    {key}: {self.count(key)} versions,"
+                f" {self.items(key)} items"
+            )
+
+        lines.append("components:")
+        for component in self.components:
+            lines.append(f"    {', '.join(component)}")
+
+        if self.choice_points:
+            lines.append("choice points:")
+            for point in self.choice_points:
+                lines.append(
+                    f"    {point.path}: {point.directive} with {point.width}"
+                    f" alternatives -> {point.versions} versions"
+                )
+
+        if self.references:
+            lines.append("references:")
+            for reference in self.references:
+                lines.append(
+                    f"    {reference.path} -> {reference.directive}"
+                    f" {reference.target}"
+                )
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return f"ExpansionPlan({self.count()} versions)"
+
+
+class PlanCompiler:
+    """
+    Counts the versions of each node in a config where `$from` and `$eval`
+    have been resolved. Any `$each`, `$sample`, `$zip` or numeric sweep
+    found is recorded as a `ChoicePoint`.
+    """
+
+    def __init__(self, root: dict):
+        self.root = root
+        self.choice_points = []
+        # paths of the references which are currently being counted
+        self.following = []
+
+    def count(self, node: Any, path: str) -> Count:
+        """
+        Counts the versions of `node` which is located at `path`, the
+        children of a node are counted before the node itself.
+        """
+        return fold_tree(Located(node, path), self.children, self.combine)
+
+    def children(self, located: Located) -> list:
+        node = located.node
+        if isinstance(node, list):
+            return located.children()
+        if not isinstance(node, dict) or "$ref" in node:
+            return []
+        if find_sweep(node) is not None:
+            return []
+        if "$sample" in node:
+            # the search space does not contain any versioned nodes
+            return Located(
+                {
+                    key: value
+                    for key, value in node.items()
+                    if key != "$sample"
+                },
+                located.path,
+            ).children()
+        if "$zip" in node:
+            lists = node["$zip"]
+            count_zip(lists)
+            rest = Located(
+                {key: value for key, value in node.items() if key != "$zip"},
+                located.path,
+            )
+            return rest.children() + [
+                child
+                for key, value in lists.items()
+                for child in Located(
+                    value, join_path(join_path(located.path, "$zip"), key)
+                ).children()
+            ]
+        if "$each" not in node:
+            return located.children()
+
+        each = node["$each"]
+        if not isinstance(each, list):
+            raise TypeError(
+                f"$each requires a list, not an object of type {type(each)}"
+            )
+        rest = Located(
+            {key: value for key, value in node.items() if key != "$each"},
+            located.path,
+        )
+        return (
+            rest.children()
+            + Located(each, join_path(located.path, "$each")).children()
+        )
+
+    def combine(self, located: Located, counts: List[Count]) -> Count:
+        node = located.node
+        versions = 1
+        for count in counts:
+            versions *= count.versions
+
+        if isinstance(node, list):
+            return Count(versions, versions * len(node))
+
+        if not isinstance(node, dict):
+            return Count(1, 1)
+
+        if "$ref" in node:
+            # a reference takes the same version as the node it points to
+            # thus it does not generate any additional versions.
+            if node["$ref"] in self.following:
+                cycle = self.following[self.following.index(node["$ref"]) :]
+                raise CircularReferenceError("$ref", cycle + [node["$ref"]])
+
+            recorded = len(self.choice_points)
+            self.following.append(node["$ref"])
+            target = self.count(
+                get_item_from_path(self.root, node["$ref"]), node["$ref"]
+            )
+            self.following.pop()
+            del self.choice_points[recorded:]
+            if not target.versions:
+                return Count(1, 0)
+            return Count(1, target.items // target.versions)
+
+        if "$sample" in node:
+            width = count_samples(node["$sample"])
+            count = Count(versions * width, versions * width)
+            self.choice_points.append(
+                ChoicePoint(located.path, "$sample", width, count.versions)
+            )
+            return count
+
+        values = find_sweep(node)
+        if values is not None:
+            # the sweep is the only key of the node
+            (directive,) = node
+            self.choice_points.append(
+                ChoicePoint(located.path, directive, len(values), len(values))
+            )
+            return Count(len(values), len(values))
+
+        if "$zip" in node:
+            width = count_zip(node["$zip"])
+            count = Count(versions * width, versions * width)
+            self.choice_points.append(
+                ChoicePoint(located.path, "$zip", width, count.versions)
+            )
+            return count
+
+        if "$each" not in node:
+            return Count(versions, versions)
+
+        each = node["$each"]
+        items = sum(
+            len(item) if isinstance(item, list) else 1 for item in each
+        )
+        count = Count(versions * len(each), versions * items)
+        self.choice_points.append(
+            ChoicePoint(located.path, "$each", len(each), count.versions)
+        )
+        return count
+
+
+def compile_plan(config: dict, keys: List[str] = None) -> ExpansionPlan:
+    """
+    Compiles a config into an `ExpansionPlan` which reports the number of
+    versions the config expands into without generating them.
+
+    >>> plan = compile_plan(
+    ...     {
+    ...         "algorithm": {
+    ...             "image": "image",
+    ...             "instance": {"$each": ["ml.m5.large", "ml.c5.large"]},
+    ...         },
+    ...         "datasets": [
+    ...             {"path": {"train": {"$each": ["a", "b", "c"]}}},
+    ...             {"path": {"train": "d"}},
+    ...         ],
+    ...     }
+    ... )
+    >>> plan.count("algorithm"), plan.count("datasets")
+    (2, 3)
+    >>> plan.jobs("algorithm", "datasets")
+    12
+
+    `$from` and `$eval` are resolved before the plan is compiled since
+    these may change which `$each` exist in the config.
+
+    If `keys` are given, the plan only covers these top level keys and
+    only the `$eval` expressions within them are evaluated.
+
+    >>> plan = compile_plan(
+    ...     {"a": {"$each": [1, 2]}, "unused": {"$eval": "1 / 0"}}, keys=["a"]
+    ... )
+    >>> plan.count()
+    2
+
+    Parameters
+    ----------
+    config
+        The config which the plan should be compiled for.
+    keys
+        The top level keys which the plan should cover, all keys if None.
+    Returns
+    -------
+    ExpansionPlan
+        The plan describing how the config expands.
+    """
+    data = resolve_from(config)
+    if keys is not None:
+        config = {key: config[key] for key in keys}
+        selected = {key: data[key] for key in keys}
+    else:
+        selected = data
+
+    references = find_references(config)
+    evaluated = recursive_apply(selected, partial(apply_eval, locals=data))
+    components = find_components(selected, evaluated=evaluated)
+
+    compiler = PlanCompiler(dict(data, **evaluated))
+    counts = {
+        key: compiler.count(value, key) for key, value in evaluated.items()
+    }
+    return ExpansionPlan(
+        counts, compiler.choice_points, references, components
+    )
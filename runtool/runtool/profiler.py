@@ -0,0 +1,237 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import json
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# the profiler which the directives are currently recorded by, if any
+ACTIVE: Optional["Profiler"] = None
+
+
+def profiled(directive: str, fn: Callable, *args, **kwargs) -> Any:
+    """
+    Calls `fn` with `args` and `kwargs`, the call is recorded as time
+    spent in `directive` if a `Profiler` is active.
+
+    >>> profiled("$eval", sum, [1, 2])
+    3
+    """
+    if ACTIVE is None:
+        return fn(*args, **kwargs)
+    return ACTIVE.call(directive, fn, *args, **kwargs)
+
+
+class Profiler:
+    """
+    Records how a config expands, i.e. the number of versions of each node
+    which generates versions as well as the time spent in each directive.
+    If `memory` is True, the peak memory allocated while the profiler is
+    active is recorded using `tracemalloc`, this slows down the expansion.
+
+    The time of a directive excludes the time of any directive which is
+    applied within it, such as the `$each` in the result of an `$eval`.
+    The profiler is passed to `runtool.runtool.transform_config` or to
+    `runtool.experiments_converter.generate_sagemaker_json`, any other
+    code can be profiled by activating the profiler with `with`.
+
+    >>> profiler = Profiler(memory=False)
+    >>> with profiler:
+    ...     profiled("$eval", sum, [1, 2])
+    3
+    >>> profiler.calls["$eval"]
+    1
+    >>> profiled("$eval", sum, [1, 2])
+    3
+    >>> profiler.calls["$eval"]
+    1
+    """
+
+    def __init__(self, memory: bool = True):
+        self.memory = memory
+        self.calls: Dict[str, int] = Counter()
+        self.seconds: Dict[str, float] = defaultdict(float)
+        # the versions of each node generating versions, the nodes are
+        # given by their path, directive and number of alternatives
+        self.nodes: Dict[str, dict] = {}
+        # the number of versions of each top level key
+        self.keys: Dict[str, int] = {}
+        self.peak_memory = 0
+        # the time spent in directives nested in the directives being
+        # recorded, for each of these
+        self.nested: List[float] = []
+        self.previous: List[Optional["Profiler"]] = []
+        self.tracing: List[bool] = []
+
+    def __enter__(self) -> "Profiler":
+        global ACTIVE
+        self.previous.append(ACTIVE)
+        ACTIVE = self
+        started = self.memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        self.tracing.append(started)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        global ACTIVE
+        ACTIVE = self.previous.pop()
+        if self.memory and tracemalloc.is_tracing():
+            self.peak_memory = max(
+                self.peak_memory, tracemalloc.get_traced_memory()[1]
+            )
+        if self.tracing.pop():
+            tracemalloc.stop()
+
+    def call(self, directive: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Calls `fn` and records the time spent in it for `directive`.
+        """
+        self.nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self.nested.pop()
+            if self.nested:
+                self.nested[-1] += elapsed
+            self.calls[directive] += 1
+            self.seconds[directive] += elapsed - nested
+
+    def iterate(self, items: Iterable) -> Iterator:
+        """
+        Iterates over `items` with the profiler activated while each item
+        is generated, i.e. for the lazily generated jobs of experiments.
+        """
+        iterator = iter(items)
+        while True:
+            with self:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def record(
+        self, path: str, directive: str, width: int, versions: int
+    ) -> None:
+        """
+        Records that the node at `path` generates `versions` versions
+        from `width` alternatives of `directive`.
+        """
+        self.nodes[path] = dict(
+            path=path, directive=directive, width=width, versions=versions
+        )
+
+    def report(self) -> dict:
+        """
+        Returns the recorded data where the nodes are sorted by their
+        number of versions and the directives by the time spent in them.
+
+        >>> profiler = Profiler(memory=False)
+        >>> profiler.record("a.b", "$each", 3, 3)
+        >>> profiler.record("a", "$each", 2, 6)
+        >>> [node["path"] for node in profiler.report()["nodes"]]
+        ['a', 'a.b']
+        """
+        return {
+            "keys": dict(self.keys),
+            "nodes": sorted(
+                self.nodes.values(), key=lambda node: -node["versions"]
+            ),
+            "directives": [
+                {
+                    "directive": directive,
+                    "calls": self.calls[directive],
+                    "seconds": self.seconds[directive],
+                }
+                for directive in sorted(
+                    self.seconds, key=lambda key: -self.seconds[key]
+                )
+            ],
+            "peak_memory": self.peak_memory,
+        }
+
+    def to_json(self, **kwargs) -> str:
+        """
+        Returns the report as JSON, `kwargs` are passed to `json.dumps`.
+        """
+        return json.dumps(self.report(), **kwargs)
+
+    def table(self) -> str:
+        """
+        Returns the report as human readable tables.
+
+        >>> profiler = Profiler(memory=False)
+        >>> profiler.keys["algorithm"] = 6
+        >>> profiler.record("algorithm.image", "$each", 2, 6)
+        >>> print(profiler.table())
+        key       versions
+        algorithm        6
+        <BLANKLINE>
+        path            directive width versions
+        algorithm.image $each         2        6
+        <BLANKLINE>
+        directive calls seconds
+        <BLANKLINE>
+        peak memory: 0 bytes
+        """
+        report = self.report()
+        lines = format_table(["key", "versions"], list(report["keys"].items()))
+        lines.append("")
+        lines += format_table(
+            ["path", "directive", "width", "versions"],
+            [list(node.values()) for node in report["nodes"]],
+        )
+        lines.append("")
+        lines += format_table(
+            ["directive", "calls", "seconds"],
+            [
+                [row["directive"], row["calls"], row["seconds"]]
+                for row in report["directives"]
+            ],
+        )
+        lines += ["", f"peak memory: {report['peak_memory']} bytes"]
+        return "\n".join(lines)
+
+
+def format_table(header: List[str], rows: List[list]) -> List[str]:
+    """
+    Formats `rows` as lines of aligned columns, strings are aligned to the
+    left and numbers to the right.
+
+    >>> for line in format_table(["a", "b"], [["x", 0.5], ["yz", 10]]):
+    ...     print(line)
+    a         b
+    x  0.500000
+    yz       10
+    """
+    cells = [header] + [
+        [
+            f"{value:.6f}" if isinstance(value, float) else str(value)
+            for value in row
+        ]
+        for row in rows
+    ]
+    widths = [max(map(len, column)) for column in zip(*cells)]
+    left = [isinstance(value, str) for value in (rows[0] if rows else header)]
+    return [
+        " ".join(
+            cell.ljust(width) if is_left else cell.rjust(width)
+            for cell, width, is_left in zip(row, widths, left)
+        ).rstrip()
+        for row in cells
+    ]
@@ -12,9 +12,23 @@
 # permissions and limitations under the License.
 
 import itertools
-from functools import singledispatch
-from itertools import chain, product
-from typing import Any, Callable
+from array import array
+from bisect import bisect_right
+from collections import UserList
+from functools import partial, singledispatch
+from itertools import accumulate, chain, islice, product
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
 
 from runtool.datatypes import (
     Algorithm,
@@ -23,6 +37,328 @@ from runtool.datatypes import (
     Datasets,
     Experiments,
 )
+from runtool.utils import fold_tree
+
+
+def lazy_product(factors: Sequence[Iterable]) -> Iterator[tuple]:
+    """
+    Generates the same tuples as `itertools.product` in the same order.
+    Unlike `itertools.product`, the factors are iterated again for each
+    combination instead of being buffered in memory. This keeps memory
+    bounded when the factors are themselves lazy.
+
+    >>> list(lazy_product([[1, 2], "ab"]))
+    [(1, 'a'), (1, 'b'), (2, 'a'), (2, 'b')]
+    """
+    if not factors:
+        yield ()
+        return
+
+    head, *tail = factors
+    for item in head:
+        for rest in lazy_product(tail):
+            yield (item, *rest)
+
+
+class LazySequence:
+    """
+    Base class for sequences whose items are generated on demand.
+    Subclasses implement `__iter__` and may override `__len__`
+    and `item` if these can be computed without iterating.
+
+    Slicing a `LazySequence` returns a new `LazySequence` which
+    only generates the items within the slice.
+    """
+
+    def __iter__(self) -> Iterator:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def item(self, index: int) -> Any:
+        """Returns the item at the non-negative `index`."""
+        try:
+            return next(islice(self, index, None))
+        except StopIteration:
+            raise IndexError(f"{type(self).__name__} index out of range")
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return LazyMap(self.item, range(len(self))[index])
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError(f"{type(self).__name__} index out of range")
+        return self.item(index)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (list, LazySequence)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)})"
+
+
+def length(node: Any) -> int:
+    """
+    Returns the number of items `node` contributes when it is
+    flattened, i.e. one for any object which is not a list.
+
+    >>> length([1, 2]), length(1)
+    (2, 1)
+    """
+    return len(node) if isinstance(node, (list, UserList)) else 1
+
+
+def cumulative_sum(values: Iterable[int]) -> Iterator[int]:
+    """
+    Returns the running totals of `values` starting with zero.
+
+    >>> list(cumulative_sum([2, 1, 3]))
+    [0, 2, 3, 6]
+    """
+    return accumulate(chain([0], values))
+
+
+class LazyProduct(LazySequence):
+    """
+    A lazily evaluated cartesian product of `factors` where `combine`
+    is applied to each combination when it is generated.
+    Results of `combine` which are instances of the `flatten` type(s)
+    have their items spliced into the sequence.
+
+    >>> LazyProduct([[1, 2], [10, 20]], combine=sum)
+    LazyProduct([11, 21, 12, 22])
+
+    >>> LazyProduct([[1, 2]], combine=lambda item: [item[0]] * 2, flatten=list)
+    LazyProduct([1, 1, 2, 2])
+
+    Items can be accessed by index without generating the preceding
+    items. The index is decoded as a mixed radix number with one digit
+    per factor where the last factor varies fastest, just like
+    `itertools.product`.
+
+    >>> product = LazyProduct([range(1000), range(1000), range(1000)])
+    >>> product[123456789]
+    (123, 456, 789)
+    >>> product[-1]
+    (999, 999, 999)
+
+    When `flatten` is used, the number of items generated by each
+    combination is needed to decode an index. If each combination
+    generates the same number of items, this number can be passed as
+    `size`. If the number of items generated by a combination is the
+    product of the number of items each of its parts contribute,
+    `weight` can be passed which returns the contribution of an item
+    of a factor. If neither is given, `combine` is called once for each
+    combination the first time an index is decoded.
+
+    >>> weighted = LazyProduct(
+    ...     [[1, 2, 3], [1, 2]],
+    ...     combine=lambda item: [item] * item[0] * item[1],
+    ...     flatten=list,
+    ...     weight=lambda item: item,
+    ... )
+    >>> len(weighted)
+    18
+    >>> weighted[7]
+    (2, 2)
+    >>> weighted[7] == list(weighted)[7]
+    True
+    """
+
+    def __init__(
+        self,
+        factors: Sequence[Iterable],
+        combine: Callable[[tuple], Any] = tuple,
+        flatten: Union[type, Tuple[type, ...]] = (),
+        size: int = None,
+        weight: Callable[[Any], int] = None,
+    ):
+        self.factors = list(factors)
+        self.combine = combine
+        self.flatten = flatten
+        self.size = size
+        self.weight = weight
+        self._prefixes = None
+        self._offsets = None
+
+    def combinations(self) -> Iterator[tuple]:
+        if any(
+            isinstance(factor, (Versions, LazySequence))
+            for factor in self.factors
+        ):
+            return lazy_product(self.factors)
+        return product(*self.factors)
+
+    def __iter__(self) -> Iterator:
+        for combination in self.combinations():
+            result = self.combine(combination)
+            if self.flatten and isinstance(result, self.flatten):
+                yield from result
+            else:
+                yield result
+
+    @property
+    def decodable(self) -> bool:
+        """
+        Whether the position of a combination can be calculated
+        without calling `combine`.
+        """
+        return not self.flatten or self.size is not None or bool(self.weight)
+
+    def prefixes(self) -> List[Union[range, array]]:
+        """
+        The number of items which the preceding items of each factor
+        contribute, i.e. the cumulative sum of their weights.
+        """
+        if self._prefixes is None:
+            if self.weight:
+                self._prefixes = [
+                    array("q", cumulative_sum(map(self.weight, factor)))
+                    for factor in self.factors
+                ]
+            else:
+                self._prefixes = [
+                    range(len(factor) + 1) for factor in self.factors
+                ]
+        return self._prefixes
+
+    def offsets(self) -> array:
+        """
+        The number of items generated before each combination
+        when `combine` has to be called to find out.
+        """
+        if self._offsets is None:
+            sizes = (
+                len(result) if isinstance(result, self.flatten) else 1
+                for result in map(self.combine, self.combinations())
+            )
+            self._offsets = array("q", cumulative_sum(sizes))
+        return self._offsets
+
+    def __len__(self) -> int:
+        if not self.decodable:
+            return self.offsets()[-1]
+
+        total = 1 if self.size is None else self.size
+        for prefix in self.prefixes():
+            total *= prefix[-1]
+        return total
+
+    def locate(self, index: int) -> Tuple[tuple, int]:
+        """
+        Returns the combination which generates the item at `index`
+        together with the position of the item among the items
+        generated by the combination.
+        """
+        if not self.decodable:
+            offsets = self.offsets()
+            position = bisect_right(offsets, index) - 1
+            return (
+                next(islice(self.combinations(), position, None)),
+                index - offsets[position],
+            )
+
+        prefixes = self.prefixes()
+        # number of items generated by all combinations of the
+        # factors following the current factor
+        tails = [1] * len(prefixes)
+        for position in reversed(range(len(prefixes) - 1)):
+            tails[position] = tails[position + 1] * prefixes[position + 1][-1]
+
+        digits = []
+        start = 0
+        scale = 1 if self.size is None else self.size
+        for factor, prefix, tail in zip(self.factors, prefixes, tails):
+            digit = bisect_right(prefix, (index - start) // (scale * tail)) - 1
+            start += scale * prefix[digit] * tail
+            scale *= prefix[digit + 1] - prefix[digit]
+            digits.append(factor[digit])
+        return tuple(digits), index - start
+
+    def item(self, index: int) -> Any:
+        if index >= len(self):
+            raise IndexError(f"{type(self).__name__} index out of range")
+
+        combination, position = self.locate(index)
+        result = self.combine(combination)
+        if self.flatten and isinstance(result, self.flatten):
+            return result[position]
+        return result
+
+
+class LazyMap(LazySequence):
+    """
+    Applies `fn` to the items of `source` when they are accessed.
+
+    >>> mapped = LazyMap(str, [1, 2])
+    >>> mapped
+    LazyMap(['1', '2'])
+    >>> mapped[1]
+    '2'
+
+    If `source` is a `LazyMap` itself, the functions of both are applied
+    in a loop rather than by calling each other, thus deeply nested maps
+    do not exceed the recursion limit.
+
+    >>> LazyMap(len, LazyMap(str, [1, 20])).source
+    [1, 20]
+    """
+
+    def __init__(self, fn: Callable, source: Sequence):
+        if isinstance(source, Versions):
+            source = source.__root__
+        if isinstance(source, LazyMap):
+            self.fns = source.fns + (fn,)
+            self.source = source.source
+        else:
+            self.fns = (fn,)
+            self.source = source
+
+    def apply(self, item: Any) -> Any:
+        for fn in self.fns:
+            item = fn(item)
+        return item
+
+    def __iter__(self) -> Iterator:
+        return map(self.apply, self.source)
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return LazyMap(self.apply, self.source[index])
+        return self.apply(self.source[index])
+
+
+class ArraySequence(LazySequence):
+    """
+    The items of a NumPy array, an item is converted to a python number
+    only when it is accessed. Thus a numeric sweep takes the memory of
+    the array rather than that of a list of python objects.
+
+    >>> values = ArraySequence(np.linspace(0, 1, 3))
+    >>> values
+    ArraySequence([0.0, 0.5, 1.0])
+    >>> values[-1], type(values[-1])
+    (1.0, <class 'float'>)
+    """
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    def __iter__(self) -> Iterator:
+        return (value.item() for value in self.values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def item(self, index: int) -> Any:
+        return self.values[index].item()
 
 
 class Versions:
@@ -33,15 +369,28 @@ class Versions:
 
     >>> Versions([1, 2, 3])
     Versions([1, 2, 3])
+
+    Instead of a list, a `LazySequence` can be passed. The versions are
+    then generated on demand each time the `Versions` object is iterated.
+
+    >>> lazy = Versions(LazyProduct([[1, 2], [3]], combine=sum))
+    >>> lazy.is_lazy
+    True
+    >>> lazy
+    Versions([4, 5])
     """
 
-    def __init__(self, versions: list = None):
-        self.__root__ = versions if versions else []
+    def __init__(self, versions: Union[list, LazySequence] = None):
+        self.__root__ = versions if versions is not None else []
+
+    @property
+    def is_lazy(self) -> bool:
+        return isinstance(self.__root__, LazySequence)
 
     def __repr__(self):
         if len(self) == 1:
             return repr(self[0])
-        return f"Versions({self.__root__})"
+        return f"Versions({list(self.__root__)})"
 
     def __getitem__(self, item):
         return self.__root__[item]
@@ -54,10 +403,12 @@ class Versions:
 
     def __eq__(self, other):
         if isinstance(other, Versions):
-            return self.__root__ == other.__root__
+            return list(self.__root__) == list(other.__root__)
         return False
 
     def append(self, data: Any):
+        if self.is_lazy:
+            self.__root__ = list(self.__root__)
         self.__root__.append(data)
 
     def __mul__(
@@ -121,6 +472,19 @@ class Versions:
         #   Experiment.from_nodes(algorithm_1, dataset_2),
         #   Experiment.from_nodes(algorithm_2, dataset_2),
         # ])
+        #
+        # If either side is lazy, the experiments are generated on demand
+        # while iterating over the returned `Experiments` object.
+        if self.is_lazy or getattr(other, "is_lazy", False):
+            return Experiments.from_sequence(
+                LazyProduct(
+                    [self, other],
+                    combine=lambda item: item[0] * item[1],
+                    flatten=Experiments,
+                    weight=length,
+                )
+            )
+
         return Experiments(
             list(
                 chain.from_iterable(
@@ -130,8 +494,77 @@ class Versions:
         )
 
 
+class DirectiveIndex:
+    """
+    Keeps track of which nodes in a config contain any of the directives in
+    `keys`, either directly or in one of their children. Passes over the
+    config use it to skip subtrees which only contain data.
+
+    >>> index = DirectiveIndex(("$each",))
+    >>> config = {"metrics": {"loss": "loss: (.*)"}, "a": {"$each": [1, 2]}}
+    >>> index.contains(config["metrics"])
+    False
+    >>> index.contains(config)
+    True
+
+    Nodes are indexed by their id when they are first looked up. A node is
+    never modified after it has been indexed, when a pass rewrites a node it
+    creates a new node instead. Thus looking up a rewritten node only has to
+    check its direct children, the unchanged children are already indexed.
+    The index keeps a reference to each indexed node so that their ids are
+    not reused and it is cleared once it has more than `max_size` entries.
+    Looking up a node indexes all of its children as well.
+    """
+
+    def __init__(self, keys: Sequence[str], max_size: int = 2**16):
+        self.keys = tuple(keys)
+        self.max_size = max_size
+        self.entries = {}
+
+    def contains(self, node: Any) -> bool:
+        """
+        Checks if `node` or any of its children contains any of the keys.
+        """
+        if not isinstance(node, (dict, list)):
+            return False
+
+        entry = self.entries.get(id(node))
+        if entry is not None and entry[0] is node:
+            return entry[1]
+
+        if len(self.entries) >= self.max_size:
+            self.entries.clear()
+        fold_tree(node, self.unindexed_children, self.add)
+        return self.entries[id(node)][1]
+
+    def unindexed_children(self, node: Any) -> Any:
+        if not isinstance(node, (dict, list)):
+            return None
+        entry = self.entries.get(id(node))
+        if entry is not None and entry[0] is node:
+            return None
+        return node.values() if isinstance(node, dict) else node
+
+    def add(self, node: Union[dict, list], children: list) -> Any:
+        found = (
+            isinstance(node, dict) and any(key in node for key in self.keys)
+        ) or any(
+            self.entries[id(child)][1]
+            for child in children
+            if isinstance(child, (dict, list))
+        )
+        self.entries[id(node)] = (node, found)
+        return node
+
+
 @singledispatch
-def recursive_apply(node, fn: Callable) -> Any:
+def recursive_apply(
+    node,
+    fn: Callable,
+    lazy: bool = False,
+    size: Callable[[Any], int] = None,
+    index: DirectiveIndex = None,
+) -> Any:
     """
     Applies a function to `dict` nodes in a JSON-like structure.
     The node that the function is applied to will be replaced with what
@@ -201,12 +634,70 @@ def recursive_apply(node, fn: Callable) -> Any:
     {'my_list': [{'hello': 'there'}, {'a': 2}, {'b': 3}]}
     {'my_list': [{'hello': 'there'}, {'a': 2}, {'b': 4}]}
 
+    If `lazy` is set, the combinations are not calculated up front.
+    Instead the returned `runtool.datatypes.Versions` object generates
+    each version when it is iterated over, keeping memory usage bounded
+    for configs with many `$each` sweeps.
+
+    >>> result = recursive_apply(
+    ...     {"a": {"version": [1, 2]}, "b": {"version": [3, 4]}},
+    ...     fn=transform,
+    ...     lazy=True,
+    ... )
+    >>> result.is_lazy
+    True
+    >>> for version in result:
+    ...     print(version)
+    {'a': 1, 'b': 3}
+    {'a': 1, 'b': 4}
+    {'a': 2, 'b': 3}
+    {'a': 2, 'b': 4}
+
+    A lazily generated version can be accessed by its index without
+    generating the versions preceding it. If `fn` can generate
+    `runtool.datatypes.Versions`, `size` should be passed to tell how many
+    versions `fn` generates for a node, else every version of the node has
+    to be generated once to find the version at an index.
+
+    >>> result = recursive_apply(
+    ...     {"a": {"version": list(range(10 ** 6))}, "b": {"version": [3, 4]}},
+    ...     fn=transform,
+    ...     lazy=True,
+    ...     size=lambda node: len(node.get("version", [None])),
+    ... )
+    >>> len(result)
+    2000000
+    >>> result[1_234_567]
+    {'a': 617283, 'b': 4}
+
+    If an `index` is passed, subtrees which the index reports not to
+    contain any directive are kept as is without visiting them. This
+    requires that `fn` does not change nodes which contain no directive.
+
+    >>> recursive_apply(
+    ...     {"a": {"version": [1, 2]}, "data": {"b": {"double": 1}}},
+    ...     fn=transform,
+    ...     index=DirectiveIndex(("version",)),
+    ... )
+    Versions([{'a': 1, 'data': {'b': {'double': 1}}}, \
+{'a': 2, 'data': {'b': {'double': 1}}}])
+
     Parameters
     ----------
     node
         The node which should be processed.
     fn
         The function which should be applied to the node.
+    lazy
+        If True, `runtool.datatypes.Versions` objects are generated lazily.
+    size
+        Returns the number of versions `fn` generates for a node. The node
+        is passed before its versioned children are combined, i.e. these
+        are still `runtool.datatypes.Versions` objects. If the number
+        differs between the versions of the node, `size` should return
+        None. Only used if `lazy` is True.
+    index
+        Used to skip the subtrees which contain no directives.
     Returns
     -------
     Any
@@ -215,97 +706,190 @@ def recursive_apply(node, fn: Callable) -> Any:
     return node
 
 
-@recursive_apply.register
-def recursive_apply_dict(node: dict, fn: Callable) -> Any:
+def flatten_versions(nodes: Iterable) -> Versions:
+    """
+    Merges `nodes` into a `Versions` object, any of the nodes which are
+    themselves `Versions` objects have their versions spliced in.
+
+    >>> flatten_versions([1, Versions([2, 3]), 4])
+    Versions([1, 2, 3, 4])
+    """
+    versions = []
+    for node in nodes:
+        if isinstance(node, Versions):
+            versions.extend(node)
+        else:
+            versions.append(node)
+    return Versions(versions)
+
+
+@recursive_apply.register(dict)
+@recursive_apply.register(list)
+def recursive_apply_tree(
+    node: Union[dict, list],
+    fn: Callable,
+    lazy: bool = False,
+    size: Callable[[Any], int] = None,
+    index: DirectiveIndex = None,
+) -> Any:
+    """
+    Applies `fn` to each `dict` in the tree using `runtool.utils.fold_tree`,
+    thus deeply nested trees do not exceed the recursion limit. The
+    children of each node are processed before the node itself, see
+    `apply_to_dict` and `apply_to_list`.
+
+    >>> deep = {"version": [1, 2]}
+    >>> for _ in range(10 ** 4):
+    ...     deep = {"a": deep}
+    >>> len(recursive_apply(deep, lambda node: Versions(node["version"])
+    ...     if "version" in node else node))
+    2
     """
-    Applies `fn` to the node, if `fn` changes the node,
-    the changes should be returned. If the `fn` does not change the node,
-    it calls `recursive_apply` on the children of the node.
 
-    In case the recursion on the children results in one or more
-    `runtool.datatypes.Versions` objects, the cartesian product of these
-    versions is calculated and a new `runtool.datatypes.Versions` object will be
-    returned containing the different versions of this node.
+    def children(node: Any) -> Any:
+        if not isinstance(node, (dict, list)):
+            return None
+        if index is not None and not index.contains(node):
+            return None
+        return node.values() if isinstance(node, dict) else node
 
+    def combine(node: Union[dict, list], children: list) -> Any:
+        if isinstance(node, dict):
+            return apply_to_dict(node, children, fn, lazy, size)
+        return apply_to_list(node, children, lazy)
+
+    return fold_tree(node, children, combine)
+
+
+def apply_to_dict(
+    node: dict,
+    children: list,
+    fn: Callable,
+    lazy: bool = False,
+    size: Callable[[Any], int] = None,
+) -> Any:
     """
+    Applies `fn` to the node, where `children` are the values of the node
+    after `recursive_apply` has been applied to them.
+
+    In case one or more of the children are `runtool.datatypes.Versions`
+    objects, the cartesian product of these versions is calculated and a
+    new `runtool.datatypes.Versions` object will be returned containing the
+    different versions of this node.
 
-    # else merge children of type Versions into a new Versions object
-    expanded_children = []
+    """
+
+    # merge children of type Versions into a new Versions object
+    versioned_keys = []
+    versioned_children = []
     new_node = {}
-    for key, value in node.items():
-        child = recursive_apply(value, fn)
-        # If the child is a Versions object, map the key to all its versions,
-        # child = Versions([1,2]),
-        # key = ['a']
-        # ->
-        # (('a':1), ('a':2))
+    changed = False
+    for (key, value), child in zip(node.items(), children):
+        changed = changed or child is not value
+        # If the child is a Versions object, the key is mapped to each
+        # of its versions when the cartesian product is calculated below.
         if isinstance(child, Versions):
-            expanded_children.append(itertools.product([key], child))
+            versioned_keys.append(key)
+            versioned_children.append(child)
         else:
             new_node[key] = child
-    if expanded_children:
-        # example:
-        # expanded_children = [(('a':1), ('a':2)), (('b':1), ('b':2))]
-        # new_node = {"c": 3}
-        # results in:
-        # [
-        #   {'a':1, 'b':1, 'c':3},
-        #   {'a':1, 'b':2, 'c':3},
-        #   {'a':2, 'b':1, 'c':3},
-        #   {'a':3, 'b':2, 'c':3},
-        # ]
-        new_node = [
-            fn(
-                dict(version_of_node, **new_node)
-            )  # apply fn to the new version of the node
-            for version_of_node in itertools.product(*expanded_children)
-        ]
-
-        # if the current node generated Versions object, these
-        # need to be flattened as well. For example:
-        # new_node = [Versions([1,2]), Versions([3,4])]
-        # results in
-        # Versions([[1,3], [1,4], [2,3], [2,4]])
-        if all(isinstance(val, Versions) for val in new_node):
-            return Versions(list(*itertools.product(*new_node)))
-        return Versions(new_node)
-    return fn(new_node)
-
-
-@recursive_apply.register
-def recursive_apply_list(node: list, fn: Callable) -> Any:
+
+    if not versioned_children:
+        # unchanged nodes are kept as is, thus unchanged subtrees are
+        # shared between the input and the output of `recursive_apply`.
+        return fn(new_node if changed else node)
+
+    def combine(version_of_node: tuple) -> Any:
+        # apply fn to the new version of the node
+        return fn(dict(zip(versioned_keys, version_of_node), **new_node))
+
+    # example:
+    # versioned_keys = ['a', 'b']
+    # versioned_children = [Versions([1, 2]), Versions([1, 2])]
+    # new_node = {"c": 3}
+    # results in:
+    # [
+    #   {'a':1, 'b':1, 'c':3},
+    #   {'a':1, 'b':2, 'c':3},
+    #   {'a':2, 'b':1, 'c':3},
+    #   {'a':2, 'b':2, 'c':3},
+    # ]
+    #
+    # if `fn` generates Versions objects for a version of the node,
+    # these are flattened into the result. For example:
+    # [Versions([1,2]), Versions([3,4])]
+    # results in
+    # Versions([1, 2, 3, 4])
+    if lazy:
+        # the versioned children are passed as they are, thus `size` can
+        # tell whether the number of versions `fn` generates is the same
+        # for every version of the node
+        count = (
+            size(dict(zip(versioned_keys, versioned_children), **new_node))
+            if size
+            else None
+        )
+        if count == 1 and len(versioned_children) == 1:
+            # each version of the only versioned child gives one version of
+            # the node, mapping the versions of the child keeps nodes which
+            # are nested deeply within each other from nesting their
+            # `LazyProduct` objects as deeply
+            return Versions(
+                LazyMap(partial(single, combine), versioned_children[0])
+            )
+        return Versions(
+            LazyProduct(versioned_children, combine, Versions, size=count)
+        )
+    return flatten_versions(map(combine, product(*versioned_children)))
+
+
+def apply_to_list(node: list, children: list, lazy: bool = False) -> Any:
     """
-    Calls `recursive_apply` on each element in the node, without applying `fn`.
-    Calculates the cartesian product of any `runtool.datatypes.Versions` objects
-    in the nodes children. From this a new `runtool.datatypes.Versions`object is
-    generated representing the different variants that this node can take.
+    Calculates the cartesian product of any `runtool.datatypes.Versions`
+    objects in `children`, i.e. the elements of the node after
+    `recursive_apply` has been applied to them. From this a new
+    `runtool.datatypes.Versions`object is generated representing the
+    different variants that this node can take.
 
     NOTE::
         The indexes of the node are maintained throughout this process.
     """
-    versions_in_children = []
+    versioned_indexes = []
+    versioned_children = []
     child_normal = [None] * len(node)  # maintans indexes
-    for index, value in enumerate(node):
-        child = recursive_apply(value, fn)
+    changed = False
+    for position, (value, child) in enumerate(zip(node, children)):
+        changed = changed or child is not value
         if isinstance(child, Versions):
-            # child = Versions([1,2])
-            # ->
-            # expanded_child_version = ((index, 1), (index, 2))
-            expanded_child_version = itertools.product([index], child)
-            versions_in_children.append(expanded_child_version)
+            versioned_indexes.append(position)
+            versioned_children.append(child)
         else:
-            child_normal[index] = child
+            child_normal[position] = child
 
-    if not versions_in_children:
-        return child_normal
+    if not versioned_children:
+        return child_normal if changed else node
 
     # merge the data from the children which were not Versions objects
     # together with the data from the children which were Versions objects
-    new_versions = []
-    for version in itertools.product(*versions_in_children):
+    def combine(version: tuple) -> list:
         new_data = child_normal[:]
-        for index, value in version:
+        for index, value in zip(versioned_indexes, version):
             new_data[index] = value
-        new_versions.append(new_data)
+        return new_data
+
+    if lazy:
+        if len(versioned_children) == 1:
+            return Versions(
+                LazyMap(partial(single, combine), versioned_children[0])
+            )
+        return Versions(LazyProduct(versioned_children, combine))
+    return Versions(list(map(combine, product(*versioned_children))))
 
-    return Versions(new_versions)
+
+def single(combine: Callable[[tuple], Any], version: Any) -> Any:
+    """
+    Calls `combine` with a version of the only versioned child of a node
+    which generates a single version.
+    """
+    result = combine((version,))
+    return result[0] if isinstance(result, Versions) else result
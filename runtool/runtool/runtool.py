@@ -12,15 +12,27 @@
 # permissions and limitations under the License.
 
 from collections import defaultdict
+from collections.abc import Mapping
 from datetime import datetime
-from functools import singledispatch
+from functools import partial, singledispatch
+from itertools import chain, islice
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Dict, Iterable, Union
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import boto3
-import yaml
 from toolz import valmap
 
+from runtool.cache import ConfigCache, is_deterministic
 from runtool.datatypes import (
     Algorithm,
     Algorithms,
@@ -30,11 +42,28 @@ from runtool.datatypes import (
     Experiment,
     Experiments,
 )
+from runtool.dependencies import resolve_from
 from runtool.dispatcher import JobDispatcher
+from runtool.dry_run import (
+    generate_dry_run_summary,
+    generate_dry_run_table,
+)
 from runtool.experiments_converter import generate_sagemaker_json
-from runtool.recurse_config import Versions
-from runtool.transformer import apply_transformations
-from runtool.dry_run import generate_dry_run_table
+from runtool.ingestion import read_config
+from runtool.jobfile import read_jobs, write_jobs
+from runtool.parallel import chunk_ranges, parallel_map
+from runtool.plan import ExpansionPlan, compile_plan
+from runtool.profiler import Profiler
+from runtool.recurse_config import LazyMap, LazySequence, Versions
+from runtool.transformer import (
+    apply_expansions,
+    apply_substitutions,
+    apply_transformations,
+    expand_components,
+    find_components,
+    merge_components,
+    Transformer,
+)
 
 
 class Client:
@@ -50,6 +79,32 @@ class Client:
         self.session = session
         self.dispatcher = JobDispatcher(session.client("sagemaker"))
 
+    def generate_jobs(
+        self,
+        experiment: Union[Experiments, Experiment],
+        experiment_name: str = "default experiment name",
+        runs: int = 1,
+        job_name_expression: str = None,
+        tags: dict = {},
+        workers: int = None,
+    ) -> Iterable[dict]:
+        """
+        Lazily generates the JSONs which start the training jobs of an
+        Experiment or an Experiments object in SageMaker, see `Client.run`
+        for the parameters.
+        """
+        return generate_sagemaker_json(
+            experiment,
+            runs=runs,
+            experiment_name=experiment_name,
+            job_name_expression=job_name_expression,
+            tags=tags,
+            creation_time=datetime.utcnow().strftime("%Y-%m-%d-%H-%M-%S"),
+            bucket=self.bucket,
+            role=self.role,
+            workers=workers,
+        )
+
     def run(
         self,
         experiment: Union[Experiments, Experiment],
@@ -57,6 +112,8 @@ class Client:
         runs: int = 1,
         job_name_expression: str = None,
         tags: dict = {},
+        workers: int = None,
+        buffer_size: int = None,
     ) -> Dict[str, str]:
         """
         Execute an Experiment or a Experiments object on SageMaker.
@@ -74,6 +131,12 @@ class Client:
             the `TrainingJobName` field in the generated JSON.
         tags
             Any tags that should be set in the training job JSON
+        workers
+            Number of processes used to generate the training job JSONs
+        buffer_size
+            If set, the training job JSONs are generated while the jobs
+            are started and at most this many are kept in memory, see
+            `runtool.dispatcher.JobDispatcher.dispatch`.
 
         Returns
         -------
@@ -81,17 +144,15 @@ class Client:
             Dictionary with the training job name as a key and the AWS ARN of the
             training job as a value.
         """
-        json_stream = generate_sagemaker_json(
+        json_stream = self.generate_jobs(
             experiment,
-            runs=runs,
             experiment_name=experiment_name,
+            runs=runs,
             job_name_expression=job_name_expression,
             tags=tags,
-            creation_time=datetime.utcnow().strftime("%Y-%m-%d-%H-%M-%S"),
-            bucket=self.bucket,
-            role=self.role,
+            workers=workers,
         )
-        return self.dispatcher.dispatch(list(json_stream))
+        return self.dispatcher.dispatch(json_stream, buffer_size=buffer_size)
 
     def dry_run(
         self,
@@ -100,7 +161,8 @@ class Client:
         runs: int = 1,
         job_name_expression: str = None,
         tags: dict = {},
-    ) -> Dict[str, str]:
+        workers: int = None,
+    ) -> List[dict]:
         """
         Summarize jobs which would be created when calling `Client.run`.
 
@@ -117,23 +179,96 @@ class Client:
             the `TrainingJobName` field in the generated JSON.
         tags
             Any tags that should be set in the training job JSON
+        workers
+            Number of processes used to generate the training job JSONs
 
         Returns
         -------
-        Pandas.Dataframe
-            The dry run table
+        List
+            Dict
+                The rows of the dry run table
         """
-        json_stream = generate_sagemaker_json(
+        json_stream = self.generate_jobs(
             experiment,
-            runs=runs,
             experiment_name=experiment_name,
+            runs=runs,
             job_name_expression=job_name_expression,
             tags=tags,
-            creation_time=datetime.utcnow().strftime("%Y-%m-%d-%H-%M-%S"),
-            bucket=self.bucket,
-            role=self.role,
+            workers=workers,
         )
-        return generate_dry_run_table(list(json_stream))
+        return generate_dry_run_table(json_stream)
+
+    def save(
+        self,
+        experiment: Union[Experiments, Experiment],
+        path: Union[str, Path],
+        experiment_name: str = "default experiment name",
+        runs: int = 1,
+        job_name_expression: str = None,
+        tags: dict = {},
+        workers: int = None,
+    ) -> int:
+        """
+        Appends the training job JSONs of an Experiment or an Experiments
+        object to the job file at `path`, see `runtool.jobfile`. The jobs
+        are written while they are generated and can be started later,
+        possibly on another machine, with `Client.run_file`. The other
+        parameters are the same as for `Client.run`.
+
+        Returns
+        -------
+        int
+            The number of jobs which were written.
+        """
+        return write_jobs(
+            path,
+            self.generate_jobs(
+                experiment,
+                experiment_name=experiment_name,
+                runs=runs,
+                job_name_expression=job_name_expression,
+                tags=tags,
+                workers=workers,
+            ),
+        )
+
+    def run_file(
+        self, path: Union[str, Path], buffer_size: int = 1000
+    ) -> Dict[str, str]:
+        """
+        Starts the training jobs in the job file at `path` on SageMaker,
+        at most `buffer_size` jobs are read into memory at once.
+
+        Returns
+        -------
+        Dict
+            Dictionary with the training job name as a key and the AWS ARN of the
+            training job as a value.
+        """
+        return self.dispatcher.dispatch(
+            read_jobs(path), buffer_size=buffer_size
+        )
+
+    def dry_run_file(
+        self, path: Union[str, Path], summary: bool = False
+    ) -> Union[List[dict], Dict[str, int]]:
+        """
+        Summarize the jobs which would be created when calling
+        `Client.run_file` with the job file at `path`.
+
+        The dry run table has a row for each job which are all kept in
+        memory. For large job files, `summary` only counts the jobs for
+        each instance type while the file is read.
+
+        Returns
+        -------
+        List or Dict
+            The rows of the dry run table or, if `summary` is set, the
+            number of jobs for each instance type.
+        """
+        if summary:
+            return generate_dry_run_summary(read_jobs(path))
+        return generate_dry_run_table(read_jobs(path))
 
 
 @singledispatch
@@ -278,7 +413,24 @@ def generate_versions(data: Iterable[dict]) -> Dict[Any, Versions]:
     ...     ]
     ... )
     {'a': Versions([1, 2]), 'b': 3}
+
+    If `data` is a `runtool.recurse_config.LazySequence`, the values of
+    each key are extracted lazily from the items of `data` when the
+    corresponding `Versions` object is iterated over.
+    In this case, each item in `data` must have the same keys.
+
+    >>> lazy = generate_versions(LazyMap(dict, [{"a": 1}, {"a": 2}]))
+    >>> lazy["a"].is_lazy
+    True
+    >>> lazy
+    {'a': Versions([1, 2])}
     """
+    if isinstance(data, LazySequence):
+        if not len(data):
+            return {}
+        return {
+            key: Versions(LazyMap(itemgetter(key), data)) for key in data[0]
+        }
 
     # creates a new Versions object for any new keys and appends
     # the value to the created Versions object
@@ -289,16 +441,247 @@ def generate_versions(data: Iterable[dict]) -> Dict[Any, Versions]:
     return dict(result)
 
 
-def load_config(path: Union[str, Path]) -> DotDict:
+class LazyConfig(Mapping):
+    """
+    A transformed config where each top level key is expanded and has its
+    types inferred the first time it is accessed. Creating a `LazyConfig`
+    only resolves `$from` and groups the keys into the components which
+    are expanded together, see `runtool.transformer.find_components`.
+    The versions of a key are cached until `invalidate` is called.
+
+    >>> config = LazyConfig(
+    ...     {
+    ...         "algorithm": {"image": {"$each": ["1", "2"]}, "instance": "..."},
+    ...         "unused": {"$eval": "1 / 0"},
+    ...     }
+    ... )
+    >>> config.algorithm
+    Versions([Algorithm({'image': '1', 'instance': '...'}), \
+Algorithm({'image': '2', 'instance': '...'})])
+    >>> config.expanded
+    ['algorithm']
+
+    If `lazy` is True, the versions of each key are generated on demand,
+    see `transform_config`.
+
+    If `max_versions` is set, the number of versions of a component is
+    checked the first time one of its keys is accessed, a `ValueError` is
+    raised if it exceeds `max_versions`.
+
+    >>> config = LazyConfig(
+    ...     {"a": {"$each": [1, 2, 3]}, "b": {"$each": [1]}}, max_versions=2
+    ... )
+    >>> config.b
+    1
+    >>> config.a
+    Traceback (most recent call last):
+        ...
+    ValueError: The config expands into 3 versions, the maximum is 2
+    """
+
+    def __init__(
+        self, config: dict, lazy: bool = False, max_versions: int = None
+    ):
+        self.config = config
+        self.lazy = lazy
+        self.max_versions = max_versions
+        self.transformer = Transformer(config)
+        self.component_of = {
+            key: component
+            for component in find_components(self.transformer.context)
+            for key in component
+        }
+        self.versions = {}
+
+    def __getitem__(self, key: str) -> Versions:
+        if key not in self.versions:
+            component = self.component_of[key]
+            versions = self.expand(component)
+            while self.transformer.outside:
+                # the result of an `$eval` refers to keys of other
+                # components, these are expanded together from now on
+                component = merge_components(
+                    self.component_of, component, self.transformer.outside
+                )
+                for name in component:
+                    self.versions.pop(name, None)
+                versions = self.expand(component)
+
+            self.versions.update(infer_versions(versions))
+            # every version of the component violated a `$where` constraint
+            for name in component:
+                self.versions.setdefault(name, Versions([]))
+        return self.versions[key]
+
+    def expand(self, component: List[str]) -> Sequence:
+        if self.max_versions is not None:
+            check_versions(
+                compile_plan(self.config, keys=component).count(),
+                self.max_versions,
+            )
+        return self.transformer.transform(lazy=self.lazy, keys=component)
+
+    def __getattr__(self, key: str) -> Versions:
+        if key.startswith("__") or key not in self.component_of:
+            raise AttributeError(key)
+        return self[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.component_of)
+
+    def __len__(self) -> int:
+        return len(self.component_of)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)})"
+
+    @property
+    def expanded(self) -> List[str]:
+        """The keys which have been expanded and are cached."""
+        return [key for key in self if key in self.versions]
+
+    def invalidate(self, *keys: str):
+        """
+        Removes the cached versions of `keys` and of the keys which are
+        expanded together with them, thus they are expanded again the next
+        time they are accessed. If no keys are given, the whole cache is
+        cleared.
+        """
+        if not keys:
+            self.versions.clear()
+        for key in keys:
+            for other in self.component_of[key]:
+                self.versions.pop(other, None)
+
+
+def infer_versions(versions: Sequence[dict]) -> Dict[str, Versions]:
+    """
+    Infers the types of the versions of a config and converts them into a
+    `Versions` object for each top level key, see `generate_versions`.
+    """
+    if isinstance(versions, LazySequence):
+        return generate_versions(LazyMap(infer_types, versions))
+    return generate_versions(map(infer_types, versions))
+
+
+def check_versions(total: int, max_versions: int):
+    """
+    Raises a `ValueError` if a config expands into more versions than
+    `max_versions`.
+    """
+    if total > max_versions:
+        raise ValueError(
+            f"The config expands into {total} versions,"
+            f" the maximum is {max_versions}"
+        )
+
+
+def load_plan(path: Union[str, Path]) -> ExpansionPlan:
+    """
+    Loads a yaml or json file from the provided path and compiles it into a
+    `runtool.plan.ExpansionPlan` without expanding the config.
+    """
+    return compile_plan(read_config(path))
+
+
+def load_config(
+    path: Union[str, Path],
+    lazy: bool = False,
+    max_versions: int = None,
+    workers: int = None,
+    cache: ConfigCache = None,
+    snapshot: bool = False,
+    profiler: Profiler = None,
+) -> DotDict:
     """
     Loads a yaml file from the provided path and calls converts it
     to a dictionary and then calls `transform_config` on the data.
+    Files ending with `.json` are loaded as json instead.
+
+    If `lazy` is True, the versions of the config are generated on demand,
+    see `transform_config` for further information.
+
+    If `max_versions` is set, a `ValueError` is raised before the config is
+    expanded if it would generate more versions than `max_versions`.
+
+    If `workers` is set, the config is expanded using that many processes.
+
+    If a `runtool.cache.ConfigCache` is passed as `cache`, the transformed
+    config is stored in the cache and later calls with the same file
+    content return the cached config instead of transforming it again.
+    Configs which use `uid` in an `$eval` are not cached since these
+    generate different values each time they are transformed.
+    Lazily transformed configs are never cached.
+
+    If `snapshot` is True, the parsed file is stored next to it and reused
+    until the file changes, see `runtool.ingestion.read_config`.
+
+    If a `runtool.profiler.Profiler` is passed as `profiler`, it records how
+    the config expands, see `transform_config`.
+
+    Use `open_config` instead to only expand the keys which are accessed.
     """
-    with open(path) as config_file:
-        return transform_config(yaml.safe_load(config_file))
+    if cache is None or lazy:
+        return transform_config(
+            read_config(path, snapshot=snapshot),
+            lazy=lazy,
+            max_versions=max_versions,
+            workers=workers,
+            profiler=profiler,
+        )
+
+    with open(path, "rb") as config_file:
+        key = cache.key(
+            config_file.read(),
+            max_versions=max_versions,
+            suffix=Path(path).suffix.lower(),
+        )
+    config = cache.get(key)
+    if config is not None:
+        return config
+
+    raw_config = read_config(path, snapshot=snapshot)
+    config = transform_config(
+        raw_config,
+        max_versions=max_versions,
+        workers=workers,
+        profiler=profiler,
+    )
+    if is_deterministic(raw_config):
+        cache.put(key, config)
+    return config
 
 
-def transform_config(config: dict) -> DotDict:
+def open_config(
+    path: Union[str, Path],
+    lazy: bool = False,
+    max_versions: int = None,
+    snapshot: bool = False,
+) -> LazyConfig:
+    """
+    Reads a yaml or json file like `load_config`, however none of its keys
+    are expanded yet. Instead a `LazyConfig` is returned which expands
+    each key the first time it is accessed, thus keys which are not used
+    are never expanded and their `$eval` expressions are never evaluated.
+
+    `lazy`, `max_versions` and `snapshot` have the same meaning as for
+    `load_config`, `max_versions` is checked for each group of keys when
+    they are accessed.
+    """
+    return LazyConfig(
+        read_config(path, snapshot=snapshot),
+        lazy=lazy,
+        max_versions=max_versions,
+    )
+
+
+def transform_config(
+    config: dict,
+    lazy: bool = False,
+    max_versions: int = None,
+    workers: int = None,
+    profiler: Profiler = None,
+) -> DotDict:
     """
     This function applies a series of transformations to a runtool config
     before converting it into a DotDict. The config is transformed through
@@ -349,7 +732,162 @@ def transform_config(config: dict) -> DotDict:
     True
 
     Finally, the dict is converted to a DotDict and returned.
+
+    Rather than expanding the whole config at once as above, the top level
+    keys are split into groups of keys which depend on each other through
+    `$ref` or `$eval`, see `runtool.transformer.find_components`. The keys
+    of each group are expanded together while keys of different groups do
+    not multiply each others versions.
+
+    >>> config = transform_config(
+    ...     {
+    ...         "algorithm": {"image": {"$each": ["1", "2"]}, "instance": "..."},
+    ...         "image": {"$ref": "algorithm.image"},
+    ...         "dataset": {"path": {"train": {"$each": ["a", "b"]}}},
+    ...     }
+    ... )
+    >>> len(config.algorithm), len(config.image), len(config.dataset)
+    (2, 2, 2)
+
+    If `lazy` is True, none of the above steps are performed up front.
+    Instead each `Versions` object in the returned `DotDict` generates its
+    versions on demand. Multiplying such `Versions` objects creates an
+    `Experiments` object which in turn generates the `Experiment` objects
+    one at a time when iterated over. This keeps the memory usage bounded
+    for configs with large sweeps.
+
+    >>> config = transform_config(
+    ...     {
+    ...         "algorithm": {"image": {"$each": ["1", "2"]}, "instance": "..."},
+    ...         "dataset": {"path": {"train": "a"}},
+    ...     },
+    ...     lazy=True,
+    ... )
+    >>> config.algorithm.is_lazy
+    True
+    >>> experiments = config.algorithm * config.dataset
+    >>> len(experiments)
+    2
+
+    Setting `max_versions` compiles a `runtool.plan.ExpansionPlan` of the
+    config first, a `ValueError` is raised if the config expands into more
+    versions than allowed.
+
+    >>> transform_config({"a": {"$each": [1, 2, 3]}}, max_versions=2)
+    Traceback (most recent call last):
+        ...
+    ValueError: The config expands into 3 versions, the maximum is 2
+
+    Setting `workers` splits the versions of the config into chunks which
+    are generated by a pool of `workers` processes. The result is the same
+    as when the config is transformed in a single process. `$from` and
+    `$eval` are resolved before the work is split up, thus every process
+    sees the same values for these.
+
+    If a `runtool.profiler.Profiler` is passed as `profiler`, it records
+    the number of versions of each top level key and of each node which
+    generates versions, as well as the time spent in each directive.
+
+    >>> profiler = Profiler(memory=False)
+    >>> config = transform_config(
+    ...     {"a": {"b": {"$each": [1, 2]}, "c": {"$each": [3, 4, 5]}}},
+    ...     profiler=profiler,
+    ... )
+    >>> profiler.keys
+    {'a': 6}
+    >>> [node["path"] for node in profiler.report()["nodes"]]
+    ['a.c', 'a.b']
+    >>> profiler.calls["$each"]
+    2
+
+    If `lazy` is True, the versions are generated when they are accessed,
+    the profiler has to be active while they are accessed to record this.
+    The work done by `workers` processes is not recorded.
+
+    To only expand the keys which are used, see `LazyConfig`.
+    """
+    # the plan is compiled once, outside of the profiler, since compiling
+    # it evaluates every `$eval` of the config
+    plan = None
+    if max_versions is not None or profiler is not None:
+        plan = compile_plan(config)
+    if max_versions is not None:
+        check_versions(plan.count(), max_versions)
+
+    if profiler is not None:
+        with profiler:
+            config_versions = transform_config(
+                config, lazy=lazy, workers=workers
+            )
+        profiler.keys.update(valmap(len, config_versions))
+        for point in plan.choice_points:
+            profiler.record(
+                point.path, point.directive, point.width, point.versions
+            )
+        return config_versions
+
+    versions = {}
+    if workers:
+        if lazy:
+            raise ValueError("`workers` cannot be combined with `lazy`")
+        for component in expand_in_parallel(config, workers):
+            versions.update(generate_versions(component))
+    else:
+        for component in expand_components(config, lazy=lazy):
+            versions.update(infer_versions(component))
+
+    # keys of components where every version violated a `$where`
+    # constraint have no versions
+    return DotDict({key: versions.get(key, Versions([])) for key in config})
+
+
+def transform_chunk(data: dict, chunk: range) -> List[dict]:
+    """
+    Generates the versions of `data` with an index in `chunk` and infers
+    their types. `data` should have had `apply_substitutions` applied to it.
+
+    >>> transform_chunk({"a": {"$each": [1, 2, 3]}}, range(1, 3))
+    [{'a': 2}, {'a': 3}]
+    """
+    versions = apply_expansions(data, lazy=True)
+    return [infer_types(versions[index]) for index in chunk]
+
+
+def transform_component_chunk(task: Tuple[dict, range]) -> List[dict]:
+    """
+    Calls `transform_chunk` with a component of the config and a chunk of
+    its versions.
+    """
+    return transform_chunk(*task)
+
+
+def expand_in_parallel(config: dict, workers: int) -> List[Iterable[dict]]:
+    """
+    Generates the versions of each component of the config using `workers`
+    processes, see `transform_config` for further information.
     """
-    return DotDict(
-        generate_versions(map(infer_types, apply_transformations(config)))
+    data = apply_substitutions(config)
+    components = [
+        {key: data[key] for key in keys}
+        for keys in find_components(resolve_from(config), evaluated=data)
+    ]
+    chunks = [
+        chunk_ranges(len(apply_expansions(component, lazy=True)), workers)
+        for component in components
+    ]
+
+    # the chunks of all components share one pool of processes, the
+    # results are returned in order thus each component takes as many
+    # results as it has chunks
+    results = parallel_map(
+        transform_component_chunk,
+        (
+            (component, chunk)
+            for component, ranges in zip(components, chunks)
+            for chunk in ranges
+        ),
+        workers,
     )
+    return [
+        chain.from_iterable(islice(results, len(ranges))) for ranges in chunks
+    ]
@@ -0,0 +1,252 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+"""
+Draws points from a search space for the `$sample` directive. The points
+are drawn in the unit hypercube using one of `METHODS` and thereafter
+scaled to the dimensions of the space, all of it is vectorized over the
+points using NumPy.
+
+A space maps names to dimensions, a dimension is one of
+
+- `{"uniform": [low, high]}`     a float in `[low, high)`
+- `{"loguniform": [low, high]}`  a float in `[low, high)` which is uniform
+                                 in log space, i.e. for learning rates
+- `{"int": [low, high]}`         an integer in `[low, high]`
+- `{"choice": [a, b, ...]}`      one of the values, a plain list is a
+                                 shorthand for this
+"""
+
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+# primitive polynomials and initial direction numbers of the Sobol
+# sequence for dimensions 2 to 21, from S. Joe and F. Y. Kuo,
+# "Constructing Sobol sequences with better two-dimensional projections",
+# each row is the degree `s`, the coefficients `a` and `m_1, ..., m_s`.
+SOBOL_DIRECTIONS = (
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)),
+    (6, 16, (1, 3, 1, 13, 27, 49)),
+    (6, 19, (1, 1, 1, 15, 7, 5)),
+    (6, 22, (1, 3, 1, 15, 13, 25)),
+    (6, 25, (1, 1, 5, 5, 19, 61)),
+    (7, 1, (1, 3, 7, 11, 23, 15, 103)),
+    (7, 4, (1, 3, 7, 13, 13, 15, 69)),
+)
+
+# number of bits of the Sobol points, at most 2 ** BITS points are drawn
+BITS = 32
+
+
+def draw_random(n: int, d: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draws `n` points uniformly at random in `d` dimensions.
+    """
+    return rng.random((n, d))
+
+
+def draw_lhs(n: int, d: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draws a latin hypercube of `n` points in `d` dimensions, i.e. each
+    dimension is split into `n` intervals of equal size and each interval
+    contains exactly one point.
+
+    >>> points = draw_lhs(4, 2, np.random.default_rng(0))
+    >>> sorted((points[:, 0] * 4).astype(int).tolist())
+    [0, 1, 2, 3]
+    """
+    # the rank of a random number is a random permutation of the intervals
+    intervals = np.argsort(rng.random((d, n)), axis=1).T
+    return (intervals + rng.random((n, d))) / n
+
+
+def sobol_directions(d: int) -> np.ndarray:
+    """
+    Returns the direction numbers of the first `d` dimensions of the
+    Sobol sequence as a `(BITS, d)` array.
+    """
+    if d > len(SOBOL_DIRECTIONS) + 1:
+        raise ValueError(
+            f"sobol supports at most {len(SOBOL_DIRECTIONS) + 1}"
+            f" dimensions, not {d}"
+        )
+    directions = np.zeros((BITS, d), dtype=np.uint64)
+    # the first dimension is the van der Corput sequence
+    directions[:, 0] = [1 << (BITS - 1 - bit) for bit in range(BITS)]
+    for dimension, (s, a, initial) in enumerate(SOBOL_DIRECTIONS[: d - 1]):
+        m = list(initial)
+        for k in range(s, BITS):
+            value = m[k - s] ^ (m[k - s] << s)
+            for bit in range(1, s):
+                if (a >> (s - 1 - bit)) & 1:
+                    value ^= m[k - bit] << bit
+            m.append(value)
+        directions[:, dimension + 1] = [
+            value << (BITS - 1 - bit) for bit, value in enumerate(m)
+        ]
+    return directions
+
+
+def draw_sobol(n: int, d: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draws the first `n` points of the Sobol sequence in `d` dimensions.
+    The points are shifted by a random digital shift drawn from `rng`,
+    this keeps the low discrepancy of the sequence.
+
+    The first `2 ** k` points of the sequence contain exactly one point in
+    each of the `2 ** k` intervals of a dimension.
+
+    >>> points = draw_sobol(8, 3, np.random.default_rng(0))
+    >>> [sorted((points[:, i] * 8).astype(int).tolist()) for i in range(3)]
+    [[0, 1, 2, 3, 4, 5, 6, 7], [0, 1, 2, 3, 4, 5, 6, 7], \
+[0, 1, 2, 3, 4, 5, 6, 7]]
+    """
+    if n > 1 << BITS:
+        raise ValueError(f"sobol supports at most 2 ** {BITS} points")
+    directions = sobol_directions(d)
+    index = np.arange(n, dtype=np.uint64)
+    gray = index ^ (index >> np.uint64(1))
+
+    points = np.zeros((n, d), dtype=np.uint64)
+    for bit in range(max(n - 1, 1).bit_length()):
+        selected = ((gray >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        points[selected] ^= directions[bit]
+
+    shift = rng.integers(0, 1 << BITS, size=d, dtype=np.uint64)
+    return (points ^ shift) / float(1 << BITS)
+
+
+# functions drawing `n` points in the `d` dimensional unit hypercube
+METHODS: Dict[str, Callable[[int, int, np.random.Generator], np.ndarray]] = {
+    "random": draw_random,
+    "lhs": draw_lhs,
+    "sobol": draw_sobol,
+}
+
+
+def scale(dimension: Any, unit: np.ndarray) -> list:
+    """
+    Scales points in `[0, 1)` to a dimension of the search space.
+
+    >>> unit = np.array([0.0, 0.5, 0.99])
+    >>> scale({"uniform": [2, 4]}, unit)
+    [2.0, 3.0, 3.98]
+    >>> scale({"loguniform": [0.001, 0.1]}, unit)[:2]
+    [0.001, 0.01]
+    >>> scale({"int": [1, 3]}, unit)
+    [1, 2, 3]
+    >>> scale(["relu", "tanh"], unit)
+    ['relu', 'tanh', 'tanh']
+    """
+    if isinstance(dimension, list):
+        dimension = {"choice": dimension}
+    if not (isinstance(dimension, dict) and len(dimension) == 1):
+        raise TypeError(
+            "a dimension of $sample requires a list or a dict with one of"
+            f" uniform, loguniform, int or choice, not {dimension}"
+        )
+
+    ((kind, values),) = dimension.items()
+    if not isinstance(values, list):
+        raise TypeError(
+            f"{kind} requires a list, not an object of type {type(values)}"
+        )
+    if kind == "choice":
+        index = np.minimum((unit * len(values)).astype(int), len(values) - 1)
+        return [values[i] for i in index]
+
+    low, high = values
+    if kind == "uniform":
+        return (low + unit * (high - low)).tolist()
+    if kind == "loguniform":
+        return (low * (high / low) ** unit).tolist()
+    if kind == "int":
+        return (low + np.floor(unit * (high - low + 1))).astype(int).tolist()
+    raise ValueError(f"unknown dimension of $sample: {kind}")
+
+
+def sample(spec: dict) -> List[dict]:
+    """
+    Draws `spec["n"]` points from the search space in `spec["space"]`
+    using the method in `spec["method"]`, see `METHODS`. The points only
+    depend on `spec["seed"]`, which defaults to 0.
+
+    >>> spec = {
+    ...     "n": 3,
+    ...     "method": "lhs",
+    ...     "space": {"lr": {"loguniform": [1e-4, 1e-1]}, "act": ["a", "b"]},
+    ... }
+    >>> points = sample(spec)
+    >>> len(points), list(points[0])
+    (3, ['lr', 'act'])
+    >>> points == sample(spec)
+    True
+
+    Parameters
+    ----------
+    spec
+        The value of the `$sample` directive.
+    Returns
+    -------
+    List[dict]
+        The points, each of them maps the names of the space to values.
+    """
+    if not isinstance(spec, dict):
+        raise TypeError(
+            f"$sample requires a dict, not an object of type {type(spec)}"
+        )
+    space = spec.get("space")
+    if not isinstance(space, dict) or not space:
+        raise TypeError("$sample requires a non-empty dict in 'space'")
+    method = spec.get("method", "random")
+    if method not in METHODS:
+        raise ValueError(
+            f"unknown method of $sample: {method},"
+            f" use one of {', '.join(METHODS)}"
+        )
+
+    n = count_samples(spec)
+    rng = np.random.default_rng(spec.get("seed", 0))
+    unit = METHODS[method](n, len(space), rng)
+    columns = [
+        scale(dimension, unit[:, i])
+        for i, dimension in enumerate(space.values())
+    ]
+    return [dict(zip(space, values)) for values in zip(*columns)]
+
+
+def count_samples(spec: dict) -> int:
+    """
+    Returns the number of points `sample` draws.
+
+    >>> count_samples({"n": 500, "space": {}})
+    500
+    """
+    n = spec.get("n")
+    if not isinstance(n, int) or isinstance(n, bool) or n < 0:
+        raise TypeError(f"$sample requires a non-negative integer n, not {n}")
+    return n
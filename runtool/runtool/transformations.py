@@ -12,13 +12,44 @@
 # permissions and limitations under the License.
 
 import re
-from functools import partial
-from typing import Any, Callable, Tuple
-from uuid import uuid4
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
-from runtool.datatypes import DotDict
-from runtool.recurse_config import Versions, recursive_apply
-from runtool.utils import get_item_from_path, update_nested_dict
+import numpy as np
+
+from runtool.dependencies import FromResolver, RefResolver
+from runtool.expressions import TRIAL, Expression, compile_expression
+from runtool.recurse_config import ArraySequence, Versions
+from runtool.sampling import count_samples, sample
+
+# matches `$trial` in a `$where` constraint
+TRIAL_PATTERN = re.compile(r"\$trial\b")
+
+# types of values which can be shared between several nodes
+IMMUTABLE_TYPES = (int, float, complex, str, bytes, bool, type(None))
+
+# names which make the result of an expression differ between evaluations
+NONDETERMINISTIC_NAMES = frozenset(
+    ("uid", "__import__", "id", "hash", "input", "open", "eval", "exec")
+)
+
+# matches any of `NONDETERMINISTIC_NAMES` in the text of an expression
+NONDETERMINISTIC_PATTERN = re.compile(
+    r"\b(?:{})\b".format("|".join(sorted(NONDETERMINISTIC_NAMES)))
+)
+
+# directives generating numeric sweeps and the NumPy functions generating
+# their values from the arguments of the directive
+SWEEPS = {
+    "$range": np.arange,
+    "$linspace": np.linspace,
+    "$logspace": np.logspace,
+}
+
+# the results of evaluated expressions which do not depend on
+# the `locals` passed to `evaluate`
+EVALUATED: Dict[str, Any] = {}
+MAX_EVALUATED = 4096
 
 
 def apply_from(node: dict, context: dict) -> dict:
@@ -46,17 +77,7 @@ def apply_from(node: dict, context: dict) -> dict:
     if not (isinstance(node, dict) and "$from" in node):
         return node
 
-    source = get_item_from_path(context, node.pop("$from"))
-
-    # resolve any $from in the node we inherit from
-    # this is to avoid updating the node with a new $from
-    source = recursive_apply(source, partial(apply_from, context=context))
-
-    assert isinstance(
-        source, dict
-    ), "$from can only be used to inherit from a dict"
-
-    return update_nested_dict(source, node)
+    return FromResolver(context).apply(node, path="")
 
 
 def apply_ref(node: dict, context: dict) -> Any:
@@ -96,16 +117,18 @@ def apply_ref(node: dict, context: dict) -> Any:
     if not (isinstance(node, dict) and "$ref" in node):
         return node
 
-    assert len(node) == 1, "$ref needs to be the only value"
-    data = get_item_from_path(context, node["$ref"])
-    return recursive_apply(data, partial(apply_ref, context=context))
+    return RefResolver(context).apply(node, path="")
 
 
-def evaluate(expression: str, locals: dict) -> Any:
+def evaluate(
+    expression: Union[str, Expression],
+    locals: dict,
+    values: Dict[int, Tuple[int, Any]] = None,
+) -> Any:
     """
-    Performs the python function `eval` using the `expression`.
+    Evaluates the `expression`, see `runtool.expressions.Expression`.
     The evaluated expression will have access to the values in `locals`
-    when `eval` is applied as well as to a unique id `uid`.
+    as well as to a unique id `uid`.
 
     >>> evaluate(
     ...     expression="len(uid) + some_value",
@@ -118,68 +141,54 @@ def evaluate(expression: str, locals: dict) -> Any:
     expression
         The expression which should be evaluated
     locals
-        The locals parameter to the `eval` function in the standard library.
+        The values which the expression can use by their name and which
+        the references in the expression refer to.
+    values
+        The values of the references which have already been looked up,
+        see `runtool.expressions.Expression.lookup`.
     Returns
     -------
     Any
-        The value after applying `eval` to the expression.
+        The value of the expression.
+
+    Each unique expression is only compiled once. The result of an
+    expression which neither uses `uid`, references nor any names in
+    `locals` is reused by later calls if it is immutable.
     """
-    return eval(
-        expression,
-        dict(uid=str(uuid4()).split("-")[-1]),
-        dict(DotDict(locals)),
+    if isinstance(expression, str):
+        expression = compile_expression(expression)
+
+    # expressions which do not use `uid` or any names in `locals` always
+    # evaluate to the same value, this value is reused if it is immutable.
+    # `locals` can be large, thus only the names are iterated over
+    names = expression.names
+    constant = (
+        not expression.references
+        and names.isdisjoint(NONDETERMINISTIC_NAMES)
+        and not any(name in locals for name in names)
     )
+    if constant and expression.text in EVALUATED:
+        return EVALUATED[expression.text]
 
+    value = expression(locals, values)
 
-def recurse_eval(path: str, data: dict, fn: Callable) -> Tuple[str, Any]:
-    """
-    Given a `path` such as `a.b.0.split(' ')` this function traverses
-    the `data` dictionary using the path, stopping whenever a key cannot be
-    found in the `data`. `fn` is then applied to the extracted data and the
-    result is returned along with the part of the path which was traversed.
+    if constant and is_immutable(value):
+        if len(EVALUATED) >= MAX_EVALUATED:
+            EVALUATED.clear()
+        EVALUATED[expression.text] = value
+    return value
 
-    In the following example, `a.b.0` is identified as the path to return
-    since `.split()` is not an item in `data`.
 
-    >>> recurse_eval(
-    ...     path="a.b.0.split(' ')",
-    ...     data={"a": {"b": [{"$eval": "'hey ' * 2"}]}},
-    ...     fn=lambda node, _ : eval(node["$eval"]) if "$eval" in node else node
-    ... )
-    ('a.b.0', 'hey hey ')
+def is_immutable(value: Any) -> bool:
+    """
+    Checks if `value` and anything it contains cannot be modified.
 
-    Parameters
-    ----------
-    path
-        The path to fetch from in the data
-    data
-        Dictionary which should be traversed using the path
-    fn
-        function to call with the fetched data as parameter
-    Returns
-    -------
-    Tuple[str, Any]
-        The path and the value after applying the `fn`
-    """
-    tmp = data
-    current_path = []
-    path = path.replace("[", ".[")
-    for key in path.split("."):
-        original_key = key
-        if "[" in key:
-            key = key.replace("[", "").replace("]", "").replace('"', "")
-        try:
-            tmp = tmp[key]
-            current_path.append(original_key)
-        except TypeError:
-            try:
-                tmp = tmp[int(key)]
-                current_path.append(original_key)
-            except ValueError:
-                break
-        except:
-            break
-    return ".".join(current_path).replace(".[", "["), fn(tmp, data)
+    >>> is_immutable((1, "a")), is_immutable([1])
+    (True, False)
+    """
+    if isinstance(value, (tuple, frozenset)):
+        return all(map(is_immutable, value))
+    return isinstance(value, IMMUTABLE_TYPES)
 
 
 def apply_eval(node: dict, locals: dict) -> Any:
@@ -187,9 +196,9 @@ def apply_eval(node: dict, locals: dict) -> Any:
     Evaluates the expression in `node["$eval"]` recursively then returns
     the result.
 
-    The text in `node["$eval"]` can contain some keywords which `apply_eval`
-    can use to preprocess the text before `eval` is run on the text.
-    The following keywords are supported in the text:
+    The expression is compiled once, see `runtool.expressions`, and can
+    contain references which are bound to the referenced values when it
+    is evaluated. The following references are supported:
 
     - `$`       is used to reference data in the `locals` parameters
     - `$trial`  references an experiment which is defined during runtime
@@ -204,7 +213,8 @@ def apply_eval(node: dict, locals: dict) -> Any:
     ['some', 'string']
 
     Example of when `$trial` is used. Since we do not yet know what the `$trial`
-    should resolve to we cannot calculate the value.
+    should resolve to we cannot calculate the value. The values of any
+    other references are substituted into the expression.
     Note::
 
         $trial gets renamed to __trial__ here as this function is a
@@ -228,51 +238,27 @@ def apply_eval(node: dict, locals: dict) -> Any:
         return node
 
     assert len(node) == 1, "$eval needs to be only value"
-    text = str(node["$eval"])
-    text = text.replace("$trial", "__trial__")
-
-    # matches any parts of the text which is similar to this:
-    # $.somestring.somotherstring[0]['a_key']["some_key"]
-    regex = r"""
-        (\$                         # match string starting with $ and followed by:
-            (?:
-                \[[\d]+\]|          # digits enclosed in [] i.e. $[0]
-                \[\"[\w_\d$]+\"\]|  # words or digits in "[]" i.e. $["0"]
-                \[\'[\w_\d$]+\'\]|  # words or digits in '[]' i.e. $['0']
-                \.[\w_\d]+          # words or digits prepended with a dot, i.e. $.hello
-            )+
-        )
-    """
+    expression = compile_expression(str(node["$eval"]))
+    values = lookup_references(expression, locals, apply_eval)
 
-    # replace any matched substrings of the text with whatever the
-    # substrings pointed to in the locals parameter
-    for match in re.finditer(regex, text, flags=re.VERBOSE):
-        path, value = recurse_eval(match[0].lstrip("$."), locals, apply_eval)
-        path = f"$.{path}"
-        if isinstance(value, dict) and "$eval" in value:
-            text = text.replace(path, f"({value['$eval']})")
-        elif type(value) is str:
-            text = text.replace(path, f"'{value}'")
-        else:
-            text = text.replace(path, str(value))
-
-    try:
-        # continue recursion as to handle any $eval nodes
-        # generated after evaluating the current node.
-        return apply_eval(evaluate(text, locals), locals)
-    except NameError as error:
-        if "__trial__" in str(error):
-            node["$eval"] = text
-            return node
-        else:
-            raise error
+    # the expression is evaluated once the experiment is known, the values
+    # which are known are substituted into the expression until then
+    if len(values) < len(expression.references) or any(
+        is_deferred(value) for _, value in values.values()
+    ):
+        return {"$eval": expression.substitute(values)}
+
+    # continue recursion as to handle any $eval nodes
+    # generated after evaluating the current node.
+    return apply_eval(evaluate(expression, locals, values), locals)
 
 
 def apply_trial(node: dict, locals: dict) -> Any:
     """
-    Works similarly as `apply_eval` however this method only evaluates
-    the parts of `node["$eval"]` which starts with __trial__.
-    For more information read the documentation of `apply_eval`.
+    Works similarly as `apply_eval` however this method also evaluates
+    the expressions which reference `__trial__`, the experiment is given
+    by `locals["__trial__"]`. For more information read the documentation
+    of `apply_eval`.
 
     >>> apply_trial(
     ...     {"$eval" : "2 + __trial__.something[0]"},
@@ -295,33 +281,42 @@ def apply_trial(node: dict, locals: dict) -> Any:
         return node
 
     assert len(node) == 1, "$eval needs to be only value"
-    text = str(node["$eval"])
-
-    regex = r"""
-        (__trial__
-            (?:
-                \[[\d]+\]|          # digits enclosed in [] i.e. __trial__[0]
-                \[\"[\w_\d$]+\"\]|  # words or digits in "[]" i.e. __trial__["0"]
-                \[\'[\w_\d$]+\'\]|  # words or digits in '[]' i.e. __trial__['0']
-                \.\w+[\w_\d]*       # words or digits prepended with a dot, i.e. __trial__.hell0
-            )+
-        )
+    expression = compile_expression(str(node["$eval"]))
+    values = lookup_references(expression, locals, apply_trial)
+    if any(is_deferred(value) for _, value in values.values()):
+        raise TypeError("$eval: $trial cannot resolve to value")
+
+    # continue recursion as to handle any $eval nodes
+    # generated after evaluating the current node.
+    return apply_eval(evaluate(expression, locals, values), locals)
+
+
+def lookup_references(
+    expression: Expression, locals: dict, fn: Callable
+) -> Dict[int, Tuple[int, Any]]:
     """
+    Looks up the references of `expression` in `locals` and applies `fn`
+    to the referenced values, such as to evaluate an `$eval` they contain.
+    References to `$trial` are skipped if the experiment is not known.
 
-    # find longest working path for each match in locals
-    for match in re.finditer(regex, text, flags=re.VERBOSE):
-        substring, value = recurse_eval(match[0], locals, apply_trial)
+    >>> expression = compile_expression("$.a * $trial.b")
+    >>> lookup_references(expression, {"a": {"$eval": "1 + 1"}}, apply_eval)
+    {0: (1, 2)}
+    """
+    values = {}
+    for index, reference in enumerate(expression.references):
+        if reference.root != TRIAL or TRIAL in locals:
+            consumed, value = expression.lookup(index, locals)
+            values[index] = consumed, fn(value, locals)
+    return values
 
-        if isinstance(value, dict) and "$eval" in value:
-            raise TypeError("$eval: $trial cannot resolve to value")
-        elif type(value) is str:
-            text = text.replace(substring, f"'{value}'")
-        else:
-            text = text.replace(substring, str(value))
 
-    # continue recursion as to handle any $eval nodes
-    # generated after evaluating the current node.
-    return apply_eval(evaluate(text, locals), locals)
+def is_deferred(value: Any) -> bool:
+    """
+    Checks if `value` is an expression which is evaluated once the
+    experiment is known.
+    """
+    return isinstance(value, dict) and "$eval" in value
 
 
 def apply_each(node: dict) -> Versions:
@@ -377,12 +372,15 @@ def apply_each(node: dict) -> Versions:
     if not (isinstance(node, dict) and "$each" in node):
         return node
 
-    each = node.pop("$each")
+    each = node["$each"]
     if not isinstance(each, list):
         raise TypeError(
             f"$each requires a list, not an object of type {type(each)}"
         )
 
+    # the node is not modified since it may be shared with other nodes
+    rest = {key: value for key, value in node.items() if key != "$each"}
+
     # Generate versions of the current node
     versions = []
     for item in each:
@@ -391,22 +389,20 @@ def apply_each(node: dict) -> Versions:
             # node = {"a": 1, "$each": ["$None"]}
             # ==>
             # {"a": 1}
-            versions.append(node)
+            versions.append(rest)
         elif isinstance(item, dict):
             # merge node with value in $each
             # node = {"a": 1, "$each": [{"b: 2"}]}
             # ==>
             # {"a": 1, "b": 2}
-            item.update(node)
-            versions.append(item)
+            versions.append({**item, **rest})
         else:
             # any other value overwrites the node if node is
             # otherwise empty.
             # node = {"$each": [2]}
             # ==>
             # 2
-            if node:
-                node["$each"] = each
+            if rest:
                 raise TypeError(
                     "Using $each in a non-empty node is only supported"
                     " when using dictionaries or with the $None operator."
@@ -414,3 +410,362 @@ def apply_each(node: dict) -> Versions:
                 )
             versions.append(item)
     return Versions(versions)
+
+
+def apply_sample(node: dict) -> Versions:
+    """
+    If `$sample` is in the node, the node becomes `node["$sample"]["n"]`
+    versions, each with a point drawn from the search space in
+    `node["$sample"]["space"]`. In contrast to `$each`, the number of
+    versions does not grow with the number of dimensions of the space.
+    The points are drawn by `runtool.sampling.sample` using the `method`,
+    one of `random`, `lhs` or `sobol`, and the `seed` of the directive.
+
+    >>> versions = apply_sample(
+    ...     {
+    ...         "epochs": 10,
+    ...         "$sample": {
+    ...             "n": 4,
+    ...             "method": "sobol",
+    ...             "space": {"cell_type": ["lstm", "gru"]},
+    ...         },
+    ...     }
+    ... )
+    >>> sorted(version["cell_type"] for version in versions)
+    ['gru', 'gru', 'lstm', 'lstm']
+    >>> versions[0]["epochs"]
+    10
+
+    Like the dictionaries in `$each`, each point is updated with the
+    other values of the node.
+
+    Parameters
+    ----------
+    node
+        The node which should have `$sample` applied to it.
+
+    Returns
+    -------
+    runtool.datatypes.Versions
+        The versions object representing the different values of the node.
+    """
+    if not (isinstance(node, dict) and "$sample" in node):
+        return node
+    if "$each" in node:
+        raise TypeError(
+            f"$sample cannot be combined with $each in the same node:\n{node}"
+        )
+
+    # the node is not modified since it may be shared with other nodes
+    rest = {key: value for key, value in node.items() if key != "$sample"}
+    return Versions([{**point, **rest} for point in sample(node["$sample"])])
+
+
+def apply_zip(node: dict) -> Versions:
+    """
+    If `$zip` is in the node, the lists in `node["$zip"]` are expanded in
+    lockstep, i.e. the i-th version of the node takes the i-th value of
+    each list. Thus, values which vary together generate as many versions
+    as each list has values rather than every combination of them.
+
+    >>> apply_zip(
+    ...     {
+    ...         "epochs": 10,
+    ...         "$zip": {
+    ...             "prediction_length": [6, 24],
+    ...             "context_length": [12, 48],
+    ...         },
+    ...     }
+    ... )
+    Versions([{'prediction_length': 6, 'context_length': 12, 'epochs': 10}, \
+{'prediction_length': 24, 'context_length': 48, 'epochs': 10}])
+
+    Like the dictionaries in `$each`, each version is updated with the
+    other values of the node. The lists have to be of the same length.
+
+    >>> apply_zip({"$zip": {"a": [1, 2], "b": [3]}})
+    Traceback (most recent call last):
+     ...
+    ValueError: $zip requires lists of the same length, not {'a': 2, 'b': 1}
+
+    Parameters
+    ----------
+    node
+        The node which should have `$zip` applied to it.
+
+    Returns
+    -------
+    runtool.datatypes.Versions
+        The versions object representing the different values of the node.
+    """
+    if not (isinstance(node, dict) and "$zip" in node):
+        return node
+    if "$each" in node or "$sample" in node:
+        raise TypeError(
+            "$zip cannot be combined with $each or $sample in the same"
+            f" node:\n{node}"
+        )
+
+    lists = node["$zip"]
+    count_zip(lists)
+
+    # the node is not modified since it may be shared with other nodes
+    rest = {key: value for key, value in node.items() if key != "$zip"}
+    return Versions(
+        [
+            {**dict(zip(lists, values)), **rest}
+            for values in zip(*lists.values())
+        ]
+    )
+
+
+def count_zip(lists: dict) -> int:
+    """
+    Returns the length of the lists in the value of a `$zip` directive.
+
+    >>> count_zip({"a": [1, 2], "b": [3, 4]})
+    2
+    """
+    if not isinstance(lists, dict) or not lists:
+        raise TypeError(
+            f"$zip requires a non-empty dict of lists, not {lists}"
+        )
+    lengths = {key: list_length(value) for key, value in lists.items()}
+    if None in lengths.values():
+        raise TypeError(f"$zip requires a dict of lists, not {lists}")
+    if len(set(lengths.values())) > 1:
+        raise ValueError(
+            f"$zip requires lists of the same length, not {lengths}"
+        )
+    return next(iter(lengths.values()))
+
+
+def apply_sweep(node: dict) -> Versions:
+    """
+    If one of the `SWEEPS` is in the node, the node takes each value of a
+    numeric sweep. The arguments of the directive are passed to the
+    corresponding NumPy function, i.e.
+
+    - `$range: [start, stop, step]` works like `numpy.arange`
+    - `$linspace: [start, stop, num]` works like `numpy.linspace`
+    - `$logspace: [start, stop, num]` works like `numpy.logspace`, i.e.
+      `start` and `stop` are exponents of 10
+
+    >>> apply_sweep({"$range": [1, 10, 4]})
+    Versions([1, 5, 9])
+    >>> apply_sweep({"$logspace": [-3, -1, 3]})
+    Versions([0.001, 0.01, 0.1])
+
+    The values are kept in a NumPy array, thus the versions can be
+    counted and accessed by their index without creating a python number
+    for each of them.
+
+    >>> versions = apply_sweep({"$linspace": [0, 1, 10001]})
+    >>> len(versions), versions[5000]
+    (10001, 0.5)
+
+    Parameters
+    ----------
+    node
+        The node which should have the sweep applied to it.
+
+    Returns
+    -------
+    runtool.datatypes.Versions
+        The versions object representing the different values of the node.
+    """
+    values = find_sweep(node)
+    if values is None:
+        return node
+    return Versions(ArraySequence(values))
+
+
+def find_sweep(node: dict) -> Optional[np.ndarray]:
+    """
+    Returns the values of the sweep in `node`, or None if the node does
+    not contain any of the `SWEEPS`.
+    """
+    if not isinstance(node, dict):
+        return None
+    directives = [directive for directive in SWEEPS if directive in node]
+    if not directives:
+        return None
+    if len(node) != 1:
+        raise TypeError(
+            f"{directives[0]} needs to be the only value of the node:\n{node}"
+        )
+
+    directive = directives[0]
+    arguments = node[directive]
+    if not isinstance(arguments, list) or not all(
+        isinstance(argument, (int, float)) and not isinstance(argument, bool)
+        for argument in arguments
+    ):
+        raise TypeError(
+            f"{directive} requires a list of numbers, not {arguments}"
+        )
+    return sweep_values(directive, tuple(arguments))
+
+
+@lru_cache(maxsize=1024)
+def sweep_values(directive: str, arguments: tuple) -> np.ndarray:
+    """
+    Generates the values of a sweep, each unique sweep is only generated
+    once and its values are shared by the nodes using it.
+    """
+    values = SWEEPS[directive](*arguments)
+    # the array is shared, thus it may not be modified
+    values.flags.writeable = False
+    return values
+
+
+def apply_versions(node: dict) -> Any:
+    """
+    Generates the versions of a node using `apply_zip`, `apply_sample`,
+    `apply_sweep` or `apply_each` depending on which of these directives
+    the node has.
+
+    >>> apply_versions({"$zip": {"a": [1, 2]}})
+    Versions([{'a': 1}, {'a': 2}])
+    """
+    return apply_each(apply_sweep(apply_sample(apply_zip(node))))
+
+
+def apply_where(node: dict, trial: Any = None) -> Any:
+    """
+    If `$where` is in the node, the node is only kept if the expression in
+    `node["$where"]` is true. The expression can use the keys of the node
+    as variables. A node which is not kept is replaced by an empty
+    `runtool.datatypes.Versions` object, thus any version containing the
+    node is dropped when the versions of its parent are combined.
+
+    >>> apply_where({"a": 1, "b": 2, "$where": "a < b"})
+    {'a': 1, 'b': 2}
+    >>> apply_where({"a": 3, "b": 2, "$where": "a < b"})
+    Versions([])
+
+    If the node also contains `$each`, the constraint is checked for each
+    version of the node.
+
+    >>> apply_where(
+    ...     {
+    ...         "context_length": 24,
+    ...         "$each": [{"prediction_length": 3}, {"prediction_length": 12}],
+    ...         "$where": "context_length <= 4 * prediction_length",
+    ...     }
+    ... )
+    {'prediction_length': 12, 'context_length': 24}
+
+    Constraints using `$trial` can only be checked once the experiment is
+    known, such nodes are kept until `apply_where` is called with the
+    experiment as `trial`.
+
+    >>> node = {"image": "gpu", "$where": "$trial.algorithm.image != 'gpu'"}
+    >>> apply_where(node) == node
+    True
+    >>> apply_where(node, trial={"algorithm": {"image": "gpu"}})
+    Versions([])
+
+    Parameters
+    ----------
+    node
+        The node which should be processed.
+    trial
+        The experiment which `$trial` refers to.
+    Returns
+    -------
+    Any
+        The node without `$where` if the constraint holds.
+    """
+    if not (isinstance(node, dict) and "$where" in node):
+        return node
+
+    text = str(node["$where"])
+    if TRIAL_PATTERN.search(text):
+        if trial is None:
+            # the constraint is kept in each version of the node
+            return apply_versions(node)
+        text = TRIAL_PATTERN.sub("__trial__", text)
+
+    def check(version: Any) -> bool:
+        locals = dict(version) if isinstance(version, dict) else {}
+        if trial is not None:
+            locals["__trial__"] = trial
+        return bool(evaluate(text, locals))
+
+    rest = {key: value for key, value in node.items() if key != "$where"}
+    versions = apply_versions(rest)
+    if isinstance(versions, Versions):
+        return Versions(list(filter(check, versions)))
+    return rest if check(rest) else Versions([])
+
+
+def count_each(node: dict) -> int:
+    """
+    Returns the number of versions `apply_each` generates for the node
+    without generating them. If the node has a `$where` constraint, the
+    number is not known in advance and None is returned.
+
+    >>> count_each({"a": 1, "$each": ["$None", {"b": 2}]})
+    2
+    >>> count_each({"a": 1})
+    1
+    >>> count_each({"a": 1, "$where": "a > 1"}) is None
+    True
+    >>> count_each({"$sample": {"n": 500, "space": {"a": [1, 2]}}})
+    500
+    >>> count_each({"$zip": {"a": [1, 2], "b": [3, 4]}})
+    2
+    >>> count_each({"$linspace": [0, 1, 10000]})
+    10000
+
+    If the `$each` list itself has several versions, the number is only
+    known if each of them has the same length.
+
+    >>> count_each({"$each": Versions([[1, 2], [3, 4]])})
+    2
+    >>> count_each({"$each": Versions([[1, 2], [3]])}) is None
+    True
+    """
+    if not isinstance(node, dict):
+        return 1
+    if "$where" in node:
+        return None
+
+    if "$sample" in node:
+        return count_samples(node["$sample"])
+    if "$zip" in node:
+        lists = node["$zip"]
+        if isinstance(lists, dict) and any(
+            isinstance(value, Versions) for value in lists.values()
+        ):
+            lengths = {list_length(value) for value in lists.values()}
+            return lengths.pop() if len(lengths) == 1 else None
+        return count_zip(lists)
+    if "$each" in node:
+        return list_length(node["$each"])
+    values = find_sweep(node)
+    if values is not None:
+        return len(values)
+    return 1
+
+
+def list_length(value: Any) -> int:
+    """
+    Returns the length of a list, if the list has several versions the
+    length is only known if each of them has the same length.
+
+    >>> list_length([1, 2]), list_length(Versions([[1, 2], [3, 4]]))
+    (2, 2)
+    >>> list_length(Versions([[1, 2], [3]])) is None
+    True
+    """
+    if isinstance(value, list):
+        return len(value)
+    if isinstance(value, Versions):
+        lengths = {
+            len(version) if isinstance(version, list) else None
+            for version in value
+        }
+        return lengths.pop() if len(lengths) == 1 else None
+    return None
@@ -11,28 +11,44 @@
 # express or implied. See the License for the specific language governing
 # permissions and limitations under the License.
 
+import re
 from functools import partial
+from typing import Any, Dict, Iterable, List, Sequence
 
-from runtool.recurse_config import Versions, recursive_apply
+from runtool.dependencies import resolve_from, resolve_references
+from runtool.profiler import profiled
+from runtool.recurse_config import (
+    DirectiveIndex,
+    LazyMap,
+    Versions,
+    recursive_apply,
+)
+from runtool.utils import get_item_from_path
 from runtool.transformations import (
-    apply_each,
+    SWEEPS,
     apply_eval,
-    apply_from,
-    apply_ref,
+    apply_versions,
+    apply_where,
+    count_each,
 )
 
 
-def apply_transformations(data: dict) -> list:
+def apply_transformations(data: dict, lazy: bool = False) -> Sequence:
     """
     Applies a chain of transformations converting nodes in `data` using
 
     - `apply_from`
     - `apply_eval`
-    - `apply_each`
+    - `apply_each`, `apply_sample`, `apply_zip` and `apply_sweep`
+    - `apply_where`
     - `apply_ref`
 
     Returns the different variants of the `data` after transformations as a list.
 
+    `$from` is resolved first since the other directives operate on the
+    inherited data. Thereafter `$eval`, `$each` and `$ref` are applied in
+    a single traversal of the config, see `Transformer` for details.
+
     >>> result = apply_transformations(
     ...    {
     ...         "base": {"msg": "hi"},
@@ -45,22 +61,405 @@ def apply_transformations(data: dict) -> list:
     {'a': {'smth': 49, 'msg': 'hi'}, 'base': {'msg': 'hi'}, 'b': ['hi']}
     {'a': {'smth': 2, 'msg': 'hi'}, 'base': {'msg': 'hi'}, 'b': ['hi']}
 
+    If `lazy` is True, the versions are generated one at a time when the
+    returned sequence is iterated over instead of all being kept in memory.
+
+    >>> result = apply_transformations(
+    ...     {"a": {"$each": [1, 2]}, "b": {"$each": [3, 4]}}, lazy=True
+    ... )
+    >>> len(result)
+    4
+    >>> result[3]
+    {'a': 2, 'b': 4}
+
+    A version is accessed by its index without generating the versions
+    preceding it, thus the versions can be sliced or split into chunks.
+
+    >>> result = apply_transformations(
+    ...     {"a": {"$each": list(range(1000))}, "b": {"$each": list(range(1000))}},
+    ...     lazy=True,
+    ... )
+    >>> result[123_456]
+    {'a': 123, 'b': 456}
+    >>> list(result[999_998:])
+    [{'a': 999, 'b': 998}, {'a': 999, 'b': 999}]
+
     Parameters
     ----------
     data
         The dictionary which should be transformed
+    lazy
+        Whether the versions of the data should be generated lazily.
     Returns
     -------
-    list
+    Sequence
         the transformed `data` where each item is a version of the data.
     """
-    data = recursive_apply(data, partial(apply_from, context=data))
-    data = recursive_apply(data, partial(apply_eval, locals=data))
-    data = recursive_apply(data, apply_each)
+    return Transformer(data).transform(lazy=lazy)
+
+
+def apply_substitutions(data: dict) -> dict:
+    """
+    Applies the transformations which replace nodes in `data` without
+    generating versions of it, i.e. `apply_from` and `apply_eval`.
+
+    >>> apply_substitutions({"a": {"$eval": "2 + 2"}, "b": {"$from": "a"}})
+    {'a': 4, 'b': 4}
+    """
+    data = resolve_from(data)
+    return recursive_apply(
+        data,
+        partial(apply_eval, locals=data),
+        index=DirectiveIndex(["$eval"]),
+    )
+
+
+def apply_expansions(data: dict, lazy: bool = False) -> Sequence:
+    """
+    Generates the versions of `data` using `expand` and resolves
+    references in each version using `apply_ref`. `data` should already
+    have had `apply_substitutions` applied to it.
+
+    >>> apply_expansions({"a": {"$each": [1, 2]}, "b": {"$ref": "a"}})
+    [{'a': 1, 'b': 1}, {'a': 2, 'b': 2}]
+    """
+    data = recursive_apply(
+        data,
+        expand,
+        lazy=lazy,
+        size=count_each,
+        index=DirectiveIndex(EXPANSIONS),
+    )
+
+    # the versions share most of their subtrees, thus sharing the index
+    # between them avoids searching these subtrees for `$ref` again.
+    resolve = partial(resolve_references, index=DirectiveIndex(["$ref"]))
+    if not isinstance(data, Versions):
+        return [resolve(data)]
+    if data.is_lazy:
+        return LazyMap(resolve, data)
+    return list(map(resolve, data))
+
+
+def expand(node: dict) -> Any:
+    """
+    Generates the versions of a node, using `apply_where` if the node has
+    a `$where` constraint and `apply_versions` otherwise.
+
+    >>> expand({"$each": [1, 2, 3], "$where": "True"})
+    Versions([1, 2, 3])
+    """
+    if "$where" in node:
+        return apply_where(node)
+    return apply_versions(node)
+
+
+# directives which generate the versions of a node
+EXPANSIONS = ("$where", "$each", "$sample", "$zip", *SWEEPS)
+
+# directives which are resolved while the config is transformed
+DIRECTIVES = ("$from", "$eval", "$ref", *EXPANSIONS)
+
+# matches the top level key which an `$eval` expression refers to, i.e.
+# `a` in `$.a.b` or `$["a"][0]`
+TOP_LEVEL_REFERENCE = re.compile(r"""\$(?:\.(\w+)|\[["']([\w$]+)["']\])""")
+
+
+def find_dependencies(node: Any) -> Iterable[str]:
+    """
+    Finds the top level keys of the config which `node` refers to using
+    `$ref` or `$eval`.
+
+    >>> sorted(find_dependencies(
+    ...     {"a": [{"$ref": "b.c"}], "d": {"$eval": "$.e.f + $['g'][0]"}}
+    ... ))
+    ['b', 'e', 'g']
+    """
+    dependencies = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if "$ref" in node:
+                dependencies.add(str(node["$ref"]).split(".")[0])
+            if isinstance(node.get("$eval"), str):
+                for match in TOP_LEVEL_REFERENCE.finditer(node["$eval"]):
+                    dependencies.add(match[1] or match[2])
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return dependencies
+
+
+def find_components(data: dict, evaluated: dict = None) -> List[List[str]]:
+    """
+    Groups the top level keys of `data` such that keys which depend on each
+    other through `$ref` or `$eval`, directly or through other keys, are in
+    the same group. Each group is expanded independently of the others.
+    `data` should have had `$from` resolved.
+
+    The results of `$eval` expressions can contain references as well, if
+    `evaluated` is given, the references in this version of `data` where
+    the expressions have been evaluated are taken into account too.
+
+    >>> data = {"a": {"$eval": "{'$ref': 'b'}"}, "b": {"$each": [1, 2]}}
+    >>> find_components(data)
+    [['a'], ['b']]
+    >>> find_components(data, evaluated={"a": {"$ref": "b"}, "b": data["b"]})
+    [['a', 'b']]
+
+    >>> find_components(
+    ...     {
+    ...         "a": {"$each": [1, 2]},
+    ...         "b": {"$ref": "c"},
+    ...         "c": {"$each": [3, 4]},
+    ...         "d": {"$eval": "$.a * 2"},
+    ...     }
+    ... )
+    [['a', 'd'], ['b', 'c']]
+    """
+    parent = {key: key for key in data}
+
+    def root(key: str) -> str:
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for source in (data, evaluated or {}):
+        for key, value in source.items():
+            for dependency in find_dependencies(value):
+                if dependency in parent and key in parent:
+                    parent[root(dependency)] = root(key)
+
+    components = {}
+    for key in data:
+        components.setdefault(root(key), []).append(key)
+    return list(components.values())
+
+
+def merge_components(
+    component_of: Dict[str, List[str]],
+    component: List[str],
+    keys: Iterable[str],
+) -> List[str]:
+    """
+    Merges `component` with the components of `keys`, `component_of` maps
+    each key to its component and is updated with the merged component.
+
+    >>> component_of = {"a": ["a"], "b": ["b", "c"], "c": ["b", "c"]}
+    >>> merge_components(component_of, ["a"], ["c"])
+    ['a', 'b', 'c']
+    >>> component_of["b"]
+    ['a', 'b', 'c']
+    """
+    merged = list(component)
+    for key in keys:
+        merged.extend(
+            other for other in component_of[key] if other not in merged
+        )
+    for key in merged:
+        component_of[key] = merged
+    return merged
+
+
+def expand_components(data: dict, lazy: bool = False) -> List[Sequence]:
+    """
+    Transforms `data` like `apply_transformations`, however the keys of
+    each group found by `find_components` are expanded independently.
+    Thus, keys which do not depend on each other do not multiply each
+    others versions. Returns the versions of each group.
+
+    >>> expand_components(
+    ...     {"a": {"$each": [1, 2]}, "b": {"$each": [3, 4]}, "c": {"$ref": "b"}}
+    ... )
+    [[{'a': 1}, {'a': 2}], [{'b': 3, 'c': 3}, {'b': 4, 'c': 4}]]
+
+    Groups which are joined by references in the results of `$eval`
+    expressions are merged once the expressions have been evaluated.
+
+    >>> expand_components(
+    ...     {"a": {"$eval": "{'$ref': 'b'}"}, "b": {"$each": [1, 2]}}
+    ... )
+    [[{'b': 1, 'a': 1}, {'b': 2, 'a': 2}]]
+    """
+    transformer = Transformer(data)
+    components = find_components(transformer.context)
+    component_of = {key: keys for keys in components for key in keys}
+
+    expanded = {}
+    pending = list(components)
+    while pending:
+        keys = pending.pop(0)
+        versions = transformer.transform(lazy=lazy, keys=keys)
+        if not transformer.outside:
+            expanded[tuple(keys)] = versions
+            continue
+
+        merged = merge_components(component_of, keys, transformer.outside)
+        pending = [other for other in pending if other[0] not in merged]
+        for other in list(expanded):
+            if other[0] in merged:
+                del expanded[other]
+        pending.insert(0, merged)
+    return list(expanded.values())
+
+
+class Transformer:
+    """
+    Transforms a config in a single traversal where each node is handled
+    according to the directives it contains.
+
+    `$from` is resolved for the whole config before the traversal by
+    `runtool.dependencies.resolve_from`, the result is the context which
+    `$eval` and `$ref` refer to. The traversal visits the children of a
+    node before the node itself and
+
+    - evaluates `$eval`, expanding any `$each` in the result
+    - replaces a `$ref` with its target if the target is the same in every
+      version of the config, i.e. the target and the nodes on the path to
+      it contain no directives. Other references are resolved in each
+      version after the traversal.
+    - expands `$each`, `$sample`, `$zip` and the numeric sweeps into
+      `runtool.recurse_config.Versions`
+
+    Subtrees without any directive are skipped using a
+    `runtool.recurse_config.DirectiveIndex`.
+
+    >>> Transformer(
+    ...     {
+    ...         "base": {"n": 2},
+    ...         "a": {"$from": "base", "m": {"$each": [1, {"$eval": "$.base.n * 2"}]}},
+    ...         "b": {"$ref": "base.n"},
+    ...     }
+    ... ).transform()
+    [{'a': {'m': 1, 'n': 2}, 'base': {'n': 2}, 'b': 2}, \
+{'a': {'m': 4, 'n': 2}, 'base': {'n': 2}, 'b': 2}]
+    """
+
+    def __init__(self, config: dict):
+        self.context = profiled("$from", resolve_from, config)
+        self.index = DirectiveIndex(DIRECTIVES)
+        # `$eval` expressions using `$trial` remain after the traversal,
+        # thus references are resolved using an index of `$ref` only
+        self.references = DirectiveIndex(["$ref"])
+        self.deferred_references = False
+        # whether the target of a reference is the same in every version
+        self.invariant = {}
+        # the top level keys which are transformed and the keys outside
+        # of these which the results of `$eval` expressions refer to
+        self.keys = None
+        self.outside = set()
+
+    def transform(
+        self, lazy: bool = False, keys: List[str] = None
+    ) -> Sequence:
+        """
+        Returns the versions of the config, if `keys` are given only these
+        top level keys are transformed.
+
+        The references which the results of `$eval` expressions contain are
+        not known before the expressions are evaluated. If any of them
+        refer to a top level key which is not in `keys`, the key is added
+        to `outside` and no versions are returned, the keys have to be
+        transformed together with the keys in `outside` instead.
+        """
+        data = self.context
+        self.keys = keys
+        self.outside = set()
+        self.deferred_references = False
+        if keys is not None:
+            data = {key: data[key] for key in keys}
+
+        data = recursive_apply(
+            data,
+            self.apply,
+            lazy=lazy,
+            size=count_each,
+            index=self.index,
+        )
+
+        if self.outside:
+            return []
+
+        if not self.deferred_references:
+            # all references have been resolved during the traversal
+            if not isinstance(data, Versions):
+                return [data]
+            return data.__root__ if data.is_lazy else list(data)
+
+        resolve = partial(
+            profiled,
+            "$ref",
+            partial(resolve_references, index=self.references),
+        )
+        if not isinstance(data, Versions):
+            return [resolve(data)]
+        if data.is_lazy:
+            return LazyMap(resolve, data)
+        return list(map(resolve, data))
+
+    def apply(self, node: dict) -> Any:
+        if "$eval" in node:
+            return profiled("$eval", self.evaluate, node)
+
+        if "$ref" in node:
+            assert len(node) == 1, "$ref needs to be the only value"
+            if self.is_invariant(node["$ref"]):
+                return profiled(
+                    "$ref", get_item_from_path, self.context, node["$ref"]
+                )
+            self.deferred_references = True
+            return node
+
+        # the time is recorded for the directive generating the versions
+        directive = next((key for key in EXPANSIONS if key in node), None)
+        if directive is None:
+            return node
+        return profiled(directive, expand, node)
+
+    def evaluate(self, node: dict) -> Any:
+        """
+        Evaluates the `$eval` in `node`, expanding the directives in the
+        result of the expression.
+        """
+        node = apply_eval(node, locals=self.context)
+        if not isinstance(node, (dict, list)):
+            return node
+
+        # the result of an $eval is not visited by the traversal
+        if self.index.contains(node):
+            self.deferred_references = True
+            if self.keys is not None:
+                self.outside.update(
+                    key
+                    for key in find_dependencies(node)
+                    if key in self.context and key not in self.keys
+                )
+        return recursive_apply(node, expand, size=count_each, index=self.index)
+
+    def is_invariant(self, path: str) -> bool:
+        """
+        Checks if the node at `path` is the same in all versions.
+        """
+        if path not in self.invariant:
+            self.invariant[path] = self.find_invariant(path)
+        return self.invariant[path]
 
-    data = list(data) if isinstance(data, Versions) else [data]
-    data = [
-        recursive_apply(item, partial(apply_ref, context=item))
-        for item in data
-    ]
-    return data
+    def find_invariant(self, path: str) -> bool:
+        node = self.context
+        for key in path.split("."):
+            if isinstance(node, dict) and any(
+                directive in node for directive in DIRECTIVES
+            ):
+                return False
+            try:
+                node = node[key]
+            except TypeError:
+                try:
+                    node = node[int(key)]
+                except (ValueError, TypeError, IndexError):
+                    return False
+            except (KeyError, IndexError):
+                return False
+        return not self.index.contains(node)
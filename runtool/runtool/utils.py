@@ -11,7 +11,7 @@
 # express or implied. See the License for the specific language governing
 # permissions and limitations under the License.
 
-from typing import Any, Union
+from typing import Any, Callable, Iterable, List, Optional, Union
 
 
 def get_item_from_path(data: Union[dict, list], path: str) -> Any:
@@ -40,6 +40,132 @@ def get_item_from_path(data: Union[dict, list], path: str) -> Any:
     return data
 
 
+def fold_tree(
+    root: Any,
+    children: Callable[[Any], Optional[Iterable]],
+    combine: Callable[[Any, List[Any]], Any],
+) -> Any:
+    """
+    Folds a tree bottom up, i.e. the children of a node are folded before
+    the node itself. `children` returns the children of a node or None if
+    the node is a leaf, the result of a leaf is the leaf itself. The result
+    of any other node is what `combine` returns when it is called with the
+    node and the results of its children.
+
+    The tree is traversed using an explicit stack instead of recursion,
+    thus the depth of the tree is not limited by the recursion limit.
+
+    >>> fold_tree(
+    ...     {"a": 1, "b": [2, {"c": 3}]},
+    ...     children=lambda node: (
+    ...         node.values() if isinstance(node, dict) else
+    ...         node if isinstance(node, list) else None
+    ...     ),
+    ...     combine=lambda node, results: sum(results),
+    ... )
+    6
+    >>> deep = 1
+    >>> for _ in range(10 ** 5):
+    ...     deep = [deep]
+    >>> fold_tree(deep, lambda node: node if isinstance(node, list) else None,
+    ...     lambda node, results: results[0])
+    1
+
+    Parameters
+    ----------
+    root
+        The root of the tree.
+    children
+        Returns the children of a node or None if it is a leaf.
+    combine
+        Calculates the result of a node from the results of its children.
+    Returns
+    -------
+    Any
+        The result of the root.
+    """
+    nodes = children(root)
+    if nodes is None:
+        return root
+
+    # each frame holds a node, its children which remain to be visited and
+    # the results of the children which have already been visited.
+    stack = [(root, iter(nodes), [])]
+    while True:
+        node, pending, results = stack[-1]
+        for child in pending:
+            nodes = children(child)
+            if nodes is None:
+                results.append(child)
+            else:
+                stack.append((child, iter(nodes), []))
+                break
+        else:
+            stack.pop()
+            result = combine(node, results)
+            if not stack:
+                return result
+            stack[-1][2].append(result)
+
+
+class Located:
+    """
+    A node of a config together with its `path`, these are the nodes of
+    the trees which are folded when the path of each node is needed.
+
+    >>> [child.path for child in Located({"a": [1, 2]}, "").children()]
+    ['a']
+    >>> [child.path for child in Located([1, 2], "a").children()]
+    ['a.0', 'a.1']
+    """
+
+    __slots__ = ("node", "path")
+
+    def __init__(self, node: Any, path: str):
+        self.node = node
+        self.path = path
+
+    def children(self, keep: Callable[[Any], bool] = None) -> list:
+        """
+        Returns the children of the node, or only the children for which
+        `keep` is True if it is given.
+        """
+        items = (
+            self.node.items()
+            if isinstance(self.node, dict)
+            else enumerate(self.node)
+        )
+        return [
+            Located(value, join_path(self.path, key))
+            for key, value in items
+            if keep is None or keep(value)
+        ]
+
+
+class NestedUpdate:
+    """
+    A dictionary `data` which should be updated with `to_update`, these are
+    the nodes of the tree which `update_nested_dict` folds.
+    """
+
+    __slots__ = ("data", "to_update")
+
+    def __init__(self, data: Any, to_update: dict):
+        self.data = data
+        self.to_update = to_update
+
+    def children(self) -> list:
+        data = self.data if isinstance(self.data, dict) else {}
+        return [
+            (
+                NestedUpdate(data.get(key, {}), value)
+                if isinstance(value, dict)
+                else value
+            )
+            for key, value in self.to_update.items()
+        ]
+
+
 def update_nested_dict(data: dict, to_update: dict) -> dict:
     """
     Returns an updated version of the `data` dict updated with any changes from the `to_update` dict.
@@ -68,12 +194,87 @@ def update_nested_dict(data: dict, to_update: dict) -> dict:
     dict
         The updated dictionary.
     """
-    for key, value in to_update.items():
-        if isinstance(data, dict):
-            if isinstance(value, dict):
-                data[key] = update_nested_dict(data.get(key, {}), value)
-            else:
-                data[key] = to_update[key]
-        else:
-            data = {key: to_update[key]}
-    return data
+
+    def combine(node: NestedUpdate, values: list) -> Any:
+        data = node.data
+        if not isinstance(data, dict):
+            if not values:
+                return data
+            data = {}
+        data.update(zip(node.to_update, values))
+        return data
+
+    return fold_tree(
+        NestedUpdate(data, to_update),
+        children=lambda node: (
+            node.children() if isinstance(node, NestedUpdate) else None
+        ),
+        combine=combine,
+    )
+
+
+def merge_nested_dict(data: dict, to_update: dict) -> dict:
+    """
+    Returns the same result as `update_nested_dict` without modifying `data`.
+    Only the dictionaries along the paths which `to_update` changes are
+    copied, any other values are shared with `data`.
+
+    >>> data = {"root": {"smth": 10, "smth_else": 20}, "other": {"a": 1}}
+    >>> merged = merge_nested_dict(data, {"root": {"smth": 30}})
+    >>> merged
+    {'root': {'smth': 30, 'smth_else': 20}, 'other': {'a': 1}}
+    >>> data["root"]
+    {'smth': 10, 'smth_else': 20}
+    >>> merged["other"] is data["other"]
+    True
+
+    Parameters
+    ----------
+    data
+        The base dictionary which should be updated.
+    to_update
+        The changes which should be added to the data.
+    Returns
+    -------
+    dict
+        The updated dictionary.
+    """
+
+    def combine(node: NestedUpdate, values: list) -> Any:
+        data = node.data
+        if not isinstance(data, dict):
+            if not values:
+                return data
+            data = {}
+        result = dict(data)
+        result.update(zip(node.to_update, values))
+        return result
+
+    return fold_tree(
+        NestedUpdate(data, to_update),
+        children=lambda node: (
+            node.children() if isinstance(node, NestedUpdate) else None
+        ),
+        combine=combine,
+    )
+
+
+def is_container(node: Any) -> bool:
+    """
+    Checks if `node` is a dict or a list, i.e. a node of a config which
+    has children.
+
+    >>> is_container({"a": 1}), is_container([1]), is_container("a")
+    (True, True, False)
+    """
+    return isinstance(node, (dict, list))
+
+
+def join_path(path: str, key: Any) -> str:
+    """
+    Appends `key` to a path split by '.' as used by `get_item_from_path`.
+
+    >>> join_path("", "a"), join_path("a", 0)
+    ('a', 'a.0')
+    """
+    return f"{path}.{key}" if path else str(key)
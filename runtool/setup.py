@@ -21,9 +21,16 @@ setup(
     description="Gluonts run tool package",
     include_package_data=True,
     install_requires=[
+        "numpy",
         "PyYAML",
         "pydantic>=1.6.2",
         "toolz",
     ],
+    extras_require={
+        # faster parsing and writing of JSON configs and job files
+        "orjson": ["orjson"],
+        # zstd compressed job files, reading across frames requires 0.16
+        "zstd": ["zstandard>=0.16"],
+    },
     entry_points={},
 )
@@ -14,22 +14,44 @@
 from doctest import testmod
 
 from runtool import (
+    cache,
     datatypes,
+    dependencies,
     dispatcher,
+    dry_run,
     experiments_converter,
+    expressions,
+    hashing,
+    ingestion,
+    jobfile,
+    parallel,
+    plan,
+    profiler,
     recurse_config,
     runtool,
+    sampling,
     transformations,
     transformer,
     utils,
 )
 
 for module in (
+    cache,
     datatypes,
+    dependencies,
     dispatcher,
+    dry_run,
     experiments_converter,
+    expressions,
+    hashing,
+    ingestion,
+    jobfile,
+    parallel,
+    plan,
+    profiler,
     recurse_config,
     runtool,
+    sampling,
     transformations,
     transformer,
     utils,
@@ -124,17 +124,24 @@ def test_datasets_plus_algorithms():
         ALGORITHMS(1) + DATASETS(1)
 
 
+# equal experiments are only kept once when they are added
+
+
 def test_experiment_plus_experiment():
-    assert EXPERIMENT + EXPERIMENT == EXPERIMENTS(2)
+    assert EXPERIMENT + EXPERIMENT == EXPERIMENTS(1)
 
 
 def test_experiment_plus_experiments():
-    assert EXPERIMENT + EXPERIMENTS(2) == EXPERIMENTS(3)
-    assert EXPERIMENTS(2) + EXPERIMENT == EXPERIMENTS(3)
+    assert EXPERIMENT + EXPERIMENTS(2) == EXPERIMENTS(1)
+    assert EXPERIMENTS(2) + EXPERIMENT == EXPERIMENTS(1)
 
 
 def test_experiments_plus_experiments():
-    assert EXPERIMENTS(2) + EXPERIMENTS(2) == EXPERIMENTS(4)
+    assert EXPERIMENTS(2) + EXPERIMENTS(2) == EXPERIMENTS(1)
+    other = Experiment.from_nodes(ALGORITHM, Dataset({"path": {"a": "b"}}))
+    assert EXPERIMENTS(2) + Experiments([other]) == Experiments(
+        [EXPERIMENT, other]
+    )
 
 
 def test_experiment_mul():
@@ -0,0 +1,94 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import os
+from pathlib import Path
+
+import pytest
+
+from runtool import runtool
+from runtool.cache import ConfigCache
+from runtool.runtool import load_config
+
+EXAMPLES = Path(__file__).parents[2] / "examples" / "runnable_examples"
+
+
+@pytest.fixture
+def count_transformations(monkeypatch):
+    calls = []
+    transform_config = runtool.transform_config
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return transform_config(*args, **kwargs)
+
+    monkeypatch.setattr(runtool, "transform_config", counting)
+    return calls
+
+
+def test_cached_config_is_reused(tmp_path, count_transformations):
+    cache = ConfigCache(tmp_path)
+    first = load_config(EXAMPLES / "large.yml", cache=cache)
+    second = load_config(EXAMPLES / "large.yml", cache=cache)
+    assert first == second == load_config(EXAMPLES / "large.yml")
+    assert len(count_transformations) == 2
+
+
+def test_changed_config_is_not_reused(tmp_path, count_transformations):
+    cache = ConfigCache(tmp_path)
+    path = tmp_path / "config.yml"
+    path.write_text("a: {$each: [1, 2]}")
+    assert list(load_config(path, cache=cache).a) == [1, 2]
+    path.write_text("a: {$each: [1, 3]}")
+    assert list(load_config(path, cache=cache).a) == [1, 3]
+    assert len(count_transformations) == 2
+
+
+def test_config_using_uid_is_not_cached(tmp_path, count_transformations):
+    cache = ConfigCache(tmp_path / "cache")
+    path = tmp_path / "config.yml"
+    path.write_text("a: {$eval: uid}")
+    assert load_config(path, cache=cache).a != load_config(path, cache=cache).a
+    assert len(count_transformations) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ConfigCache(tmp_path)
+    cache.put("first", list(range(100)))
+    cache.max_size = 2 * cache.path("first").stat().st_size
+    cache.put("second", list(range(100)))
+    # make the access times distinguishable on coarse grained filesystems
+    os.utime(cache.path("second"), (0, 0))
+    cache.get("first")
+    cache.put("third", list(range(100)))
+    assert cache.get("first") == list(range(100))
+    assert cache.get("second") is None
+    assert cache.get("third") == list(range(100))
+
+
+def test_transformed_config_round_trip(tmp_path):
+    config = load_config(EXAMPLES / "complex.yml")
+    cache = ConfigCache(tmp_path)
+    cache.put("config", config)
+    cached = cache.get("config")
+    assert cached == config
+    assert type(cached) is type(config)
+    assert cached.keys() == config.keys()
+
+
+def test_evicting_removed_entries(tmp_path):
+    cache = ConfigCache(tmp_path, max_size=0)
+    cache.put("first", [1])
+    cache.clear()
+    cache.evict()
+    assert cache.get("first") is None
@@ -0,0 +1,172 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+from pathlib import Path
+
+import pytest
+import yaml
+from runtool.plan import compile_plan
+from runtool.runtool import transform_config
+
+EXAMPLES = Path(__file__).parents[2] / "examples" / "runnable_examples"
+
+ALGORITHM = {
+    "image": {"$each": ["image_1", "image_2"]},
+    "instance": "ml.m5.xlarge",
+    "hyperparameters": {
+        "epochs": {"$each": [1, 10, 100]},
+        "$each": ["$None", {"learning_rate": 0.1}],
+    },
+}
+
+DATASET = {
+    "path": {"train": {"$each": ["s3://a", "s3://b"]}},
+}
+
+
+def compare(config: dict, *keys: str):
+    plan = compile_plan(config)
+    transformed = transform_config(config)
+    for key in keys:
+        assert plan.count(key) == len(transformed[key])
+    assert plan.jobs(*keys) == len(transformed[keys[0]] * transformed[keys[1]])
+
+
+def test_plan_single_nodes():
+    compare(
+        {"algorithm": ALGORITHM, "dataset": DATASET}, "algorithm", "dataset"
+    )
+
+
+def test_plan_lists():
+    compare(
+        {
+            "algorithm": ALGORITHM,
+            "datasets": [DATASET, {"path": {"train": "s3://c"}}],
+        },
+        "algorithm",
+        "datasets",
+    )
+
+
+def test_plan_references():
+    compare(
+        {
+            "base": dict(ALGORITHM, hyperparameters={}),
+            "inherited": {"$from": "base", "instance": "ml.c5.xlarge"},
+            "algorithms": [{"$ref": "base"}, {"$ref": "inherited"}],
+            "datasets": [{"$ref": "dataset"}],
+            "dataset": DATASET,
+        },
+        "algorithms",
+        "datasets",
+    )
+
+
+@pytest.mark.parametrize("name", ["minimum", "large", "complex"])
+def test_plan_examples(name):
+    with open(EXAMPLES / f"{name}.yml") as config:
+        compare(yaml.safe_load(config), "algorithms", "datasets")
+
+
+def test_plan_choice_points():
+    plan = compile_plan({"algorithm": ALGORITHM})
+    assert plan.count() == 12
+    assert sorted(point.path for point in plan.choice_points) == [
+        "algorithm.hyperparameters",
+        "algorithm.hyperparameters.epochs",
+        "algorithm.image",
+    ]
+
+
+def test_plan_invalid_each():
+    with pytest.raises(TypeError):
+        compile_plan({"a": {"$each": 1}})
+
+
+def test_plan_empty_each():
+    config = {
+        "algorithm": {"image": "image", "instance": {"$each": []}},
+        "dataset": DATASET,
+        "reference": {"$ref": "algorithm"},
+    }
+    plan = compile_plan(config)
+    transformed = transform_config(config)
+    for key in config:
+        assert plan.count(key) == len(transformed[key])
+    assert plan.count("algorithm") == 0
+    assert plan.count("reference") == 0
+    assert plan.items("reference") == 0
+    assert plan.jobs("algorithm", "dataset") == 0
+    assert "algorithm: 0 versions, 0 items" in plan.explain()
+
+
+def test_plan_sample():
+    algorithm = {
+        "image": {"$each": ["image_1", "image_2"]},
+        "instance": "ml.m5.xlarge",
+        "hyperparameters": {
+            "$sample": {
+                "n": 5,
+                "method": "lhs",
+                "space": {"epochs": {"int": [1, 100]}, "act": ["a", "b"]},
+            },
+        },
+    }
+    compare(
+        {"algorithm": algorithm, "dataset": DATASET}, "algorithm", "dataset"
+    )
+    plan = compile_plan({"algorithm": algorithm})
+    assert plan.count() == 10
+    assert [point.width for point in plan.choice_points] == [2, 5]
+
+
+def test_plan_zip():
+    algorithm = {
+        "image": "image",
+        "instance": "ml.m5.xlarge",
+        "hyperparameters": {
+            "$zip": {
+                "prediction_length": [6, {"$each": [12, 24]}],
+                "context_length": [12, 48],
+            },
+        },
+    }
+    compare(
+        {"algorithm": algorithm, "dataset": DATASET}, "algorithm", "dataset"
+    )
+    plan = compile_plan({"algorithm": algorithm})
+    assert [point.directive for point in plan.choice_points] == [
+        "$each",
+        "$zip",
+    ]
+
+
+def test_plan_sweeps():
+    algorithm = {
+        "image": "image",
+        "instance": "ml.m5.xlarge",
+        "hyperparameters": {
+            "epochs": {"$range": [10, 100, 10]},
+            "learning_rate": {"$logspace": [-4, -1, 4]},
+        },
+    }
+    compare(
+        {"algorithm": algorithm, "dataset": DATASET}, "algorithm", "dataset"
+    )
+    plan = compile_plan({"algorithm": algorithm})
+    assert plan.count() == 36
+    assert sorted(point.directive for point in plan.choice_points) == [
+        "$logspace",
+        "$range",
+    ]
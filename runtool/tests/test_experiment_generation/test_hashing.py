@@ -0,0 +1,210 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import pytest
+from runtool.datatypes import (
+    Algorithm,
+    Algorithms,
+    Dataset,
+    Datasets,
+    Experiment,
+    Experiments,
+)
+from runtool.experiments_converter import Fragments, Job
+from runtool.hashing import (
+    Digest,
+    Hasher,
+    canonical_hash,
+    digest,
+    encode,
+    unique,
+)
+from runtool.runtool import generate_sagemaker_json, transform_config
+
+ALGORITHMS = Algorithms(
+    [
+        Algorithm({"image": "image", "instance": f"ml.m5.{size}"})
+        for size in ("large", "xlarge")
+    ]
+)
+DATASETS = Datasets(
+    [Dataset({"path": {"train": f"s3://bucket/{name}"}}) for name in "abc"]
+)
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ({"a": 1, "b": {"c": 2, "d": 3}}, {"b": {"d": 3, "c": 2}, "a": 1}),
+        ([{"a": 1, "b": 2}], [{"b": 2, "a": 1}]),
+        (
+            Algorithm({"image": "1", "instance": "2"}),
+            {"instance": "2", "image": "1"},
+        ),
+    ],
+)
+def test_equal_hashes(first, second):
+    assert canonical_hash(first) == canonical_hash(second)
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ({"a": 1}, {"a": "1"}),
+        ({"a": 1}, {"a": 1.0}),
+        ({"a": 1}, {"a": True}),
+        ({"a": None}, {"a": "None"}),
+        ([1, 2], [2, 1]),
+        ([[1], 2], [1, [2]]),
+        ({"a": [1]}, {"a": 1}),
+        ({"ab": "c"}, {"a": "bc"}),
+        ([], {}),
+    ],
+)
+def test_different_hashes(first, second):
+    assert canonical_hash(first) != canonical_hash(second)
+
+
+def test_hash_is_stable():
+    # the hash must not depend on the python process, i.e. on PYTHONHASHSEED
+    assert canonical_hash({"a": [1, 2.5, None, True, "x"]}) == (
+        "8999b8103c6d3c1ca79283cce970d3d1"
+    )
+
+
+def test_digests_are_tagged():
+    # a digest cannot be read as the encodings of leaves
+    child = Digest(encode(12) + encode("abcdefghi"))
+    assert len(child) == 16
+    assert encode(child) != encode(12) + encode("abcdefghi")
+    assert encode(child) == b"h" + child
+
+
+def test_memo_reuses_digests():
+    shared = {"image": "image"}
+    memo = {}
+    first = digest([shared, 1], memo)
+    shared["image"] = "changed"  # the memo is not invalidated
+    assert digest([shared, 1], memo) == first
+    assert digest([shared, 1]) != first
+
+
+def test_hasher_memoizes_shared_nodes():
+    hasher = Hasher(max_size=4)
+    shared = {"path": {"train": "a"}}
+    first = hasher.digest({"dataset": shared, "run": 0})
+    assert id(shared) in hasher.memo
+    assert hasher.digest({"run": 0, "dataset": shared}) == first
+    assert first == digest({"dataset": shared, "run": 0})
+    for run in range(4):
+        hasher.digest([{"run": run}])
+    assert len(hasher.memo) <= 4
+
+
+def test_run_configuration_ignores_key_order():
+    def run_configuration(hyperparameters):
+        algorithm = {"image": "1", "instance": "2"}
+        algorithm["hyperparameters"] = hyperparameters
+        return Job.generate_run_configuration(
+            dict(
+                experiment=dict(algorithm=algorithm, dataset={"path": {}}),
+                experiment_name="name",
+            ),
+            Fragments(),
+        )
+
+    assert run_configuration({"a": 1, "b": 2}) == run_configuration(
+        {"b": 2, "a": 1}
+    )
+    assert run_configuration({}) == run_configuration(None)
+    assert run_configuration({"a": 1}) != run_configuration({"a": "1"})
+
+
+def test_unique():
+    items = [{"a": 1}, {"b": 2}, {"a": 1}, [1], [1]]
+    assert unique(items) == [{"a": 1}, {"b": 2}, [1]]
+
+
+def test_experiment_hash_ignores_key_order():
+    algorithm = Algorithm({"image": "1", "instance": "2"})
+    reordered = Algorithm({"instance": "2", "image": "1"})
+    dataset = Dataset({"path": {"train": "a"}})
+    first = Experiment.from_nodes(algorithm, dataset)
+    second = Experiment.from_nodes(reordered, dataset)
+    assert first.canonical_hash() == second.canonical_hash()
+
+
+def test_experiments_hash_is_a_set_hash():
+    experiments = ALGORITHMS * DATASETS
+    reversed_ = Experiments(list(reversed(experiments)))
+    assert experiments.canonical_hash() == reversed_.canonical_hash()
+    assert (
+        Experiments(list(experiments) * 2).canonical_hash()
+        == experiments.canonical_hash()
+    )
+    assert (
+        Experiments(list(experiments)[1:]).canonical_hash()
+        != experiments.canonical_hash()
+    )
+
+
+def test_unique_experiments(caplog):
+    experiments = Experiments(list(ALGORITHMS * DATASETS) * 2)
+    assert len(experiments) == 12
+    assert experiments.unique() == ALGORITHMS * DATASETS
+    assert "dropped 6 duplicate experiments" in caplog.text
+
+
+def test_set_operations():
+    grid = ALGORITHMS * DATASETS
+    done = Experiments(list(grid)[:2] + list(grid)[4:5])
+    remaining = grid - done
+    assert len(remaining) == 3
+    assert remaining == grid.difference(done)
+    assert list(remaining) == [grid[2], grid[3], grid[5]]
+    assert grid & done == done
+    assert grid.intersection(remaining) == remaining
+    assert (done | remaining).canonical_hash() == grid.canonical_hash()
+    assert done.union(remaining) == done + remaining
+
+
+def test_set_operations_on_lazy_experiments():
+    config = transform_config(
+        {
+            "algorithm": {"image": "image", "instance": {"$each": ["a", "b"]}},
+            "dataset": {"path": {"train": {"$each": ["c", "d", "e"]}}},
+        },
+        lazy=True,
+    )
+    grid = config.algorithm * config.dataset
+    done = Experiments([grid[0], grid[4]])
+    assert list(grid - done) == [grid[1], grid[2], grid[3], grid[5]]
+    assert len(grid + grid) == 6
+
+
+def test_sagemaker_json_skips_duplicates(caplog):
+    experiments = Experiments(list(ALGORITHMS * DATASETS) * 2)
+    jobs = list(
+        generate_sagemaker_json(
+            experiments,
+            runs=1,
+            experiment_name="name",
+            job_name_expression="'name'",
+            tags={},
+            creation_time="2021-02-23-14-36-39",
+            bucket="bucket",
+            role="role",
+        )
+    )
+    assert len(jobs) == 6
+    assert "dropped 6 duplicate experiments" in caplog.text
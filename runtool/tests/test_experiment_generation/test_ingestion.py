@@ -0,0 +1,107 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import json
+import pickle
+from datetime import date
+from pathlib import Path
+
+import pytest
+import yaml
+
+from runtool import ingestion
+from runtool.ingestion import parse_yaml, read_config, snapshot_path
+from runtool.runtool import load_config
+
+EXAMPLES = Path(__file__).parents[2] / "examples" / "runnable_examples"
+
+
+@pytest.fixture
+def count_parses(monkeypatch):
+    calls = []
+    parse_config = ingestion.parse_config
+
+    def counting(data, path):
+        calls.append(path)
+        return parse_config(data, path)
+
+    monkeypatch.setattr(ingestion, "parse_config", counting)
+    return calls
+
+
+@pytest.mark.parametrize("name", ["minimum.yml", "large.yml", "complex.yml"])
+def test_fast_loader_matches_safe_load(name):
+    data = (EXAMPLES / name).read_text()
+    assert parse_yaml(data) == yaml.safe_load(data)
+
+
+def test_json_config_matches_yaml_config(tmp_path):
+    path = tmp_path / "large.json"
+    path.write_text(
+        json.dumps(yaml.safe_load((EXAMPLES / "large.yml").read_text()))
+    )
+    assert load_config(path) == load_config(EXAMPLES / "large.yml")
+
+
+def test_snapshot_is_reused(tmp_path, count_parses):
+    path = tmp_path / "config.yml"
+    path.write_text("a: {$each: [1, 2]}")
+    assert read_config(path, snapshot=True) == {"a": {"$each": [1, 2]}}
+    assert snapshot_path(path).exists()
+    assert read_config(path, snapshot=True) == {"a": {"$each": [1, 2]}}
+    assert len(count_parses) == 1
+
+
+def test_snapshot_is_invalidated_by_changes(tmp_path, count_parses):
+    path = tmp_path / "config.yml"
+    path.write_text("a: 1")
+    assert read_config(path, snapshot=True) == {"a": 1}
+    path.write_text("a: 2")
+    assert read_config(path, snapshot=True) == {"a": 2}
+    assert len(count_parses) == 2
+
+
+def test_corrupt_snapshot_is_ignored(tmp_path):
+    path = tmp_path / "config.yml"
+    path.write_text("a: 1")
+    snapshot_path(path).write_bytes(b"not a snapshot")
+    assert read_config(path, snapshot=True) == {"a": 1}
+    assert read_config(path, snapshot=True) == {"a": 1}
+
+
+def test_snapshot_is_not_unpickled(tmp_path):
+    class Exploit:
+        def __reduce__(self):
+            return (exec, ("raise RuntimeError('executed')",))
+
+    path = tmp_path / "config.yml"
+    path.write_text("a: 1")
+    snapshot_path(path).write_bytes(pickle.dumps({"config": Exploit()}))
+    assert read_config(path, snapshot=True) == {"a": 1}
+
+
+@pytest.mark.parametrize(
+    "header", [b"{}", b"[1, 2]", b'{"mtime": 1}', b"not json"]
+)
+def test_malformed_snapshot_header_is_ignored(tmp_path, header):
+    path = tmp_path / "config.yml"
+    path.write_text("a: 1")
+    snapshot_path(path).write_bytes(header + b"\n")
+    assert read_config(path, snapshot=True) == {"a": 1}
+
+
+def test_config_with_dates_is_not_snapshotted(tmp_path):
+    path = tmp_path / "config.yml"
+    path.write_text("a: 2021-02-19")
+    assert read_config(path, snapshot=True) == {"a": date(2021, 2, 19)}
+    assert not snapshot_path(path).exists()
@@ -11,8 +11,11 @@
 # express or implied. See the License for the specific language governing
 # permissions and limitations under the License.
 
+from functools import partial
 from typing import Any
 
+import pytest
+from runtool.cache import is_deterministic
 from runtool.datatypes import (
     Algorithm,
     Algorithms,
@@ -22,7 +25,9 @@ from runtool.datatypes import (
     Experiments,
 )
 from runtool.recurse_config import Versions
-from runtool.runtool import transform_config
+from runtool.plan import compile_plan
+from runtool.runtool import LazyConfig, open_config, transform_config
+from runtool.utils import get_item_from_path
 
 DATASET = {
     "path": {
@@ -108,3 +113,207 @@ def test_all_in_one():
             "experiments": Versions([Experiments([EXPERIMENT])]),
         },
     )
+
+
+def test_lazy_matches_eager():
+    config = {
+        "algorithm": dict(ALGORITHM, instance={"$each": ["a", "b"]}),
+        "dataset": {"path": {"train": {"$each": ["c", "d", "e"]}}},
+    }
+    eager = transform_config(config)
+    lazy = transform_config(config, lazy=True)
+    assert lazy.algorithm.is_lazy
+    assert lazy == eager
+    assert list(lazy.algorithm * lazy.dataset) == list(
+        eager.algorithm * eager.dataset
+    )
+
+
+def test_lazy_experiments_random_access():
+    config = {
+        "algorithm": dict(ALGORITHM, instance={"$each": ["a", "b", "c"]}),
+        "datasets": [
+            {"path": {"train": {"$each": ["d", "e"]}}},
+            {"path": {"train": "f"}},
+        ],
+    }
+    eager = transform_config(config)
+    lazy = transform_config(config, lazy=True)
+    expected = list(eager.algorithm * eager.datasets)
+    experiments = lazy.algorithm * lazy.datasets
+    assert len(experiments) == len(expected)
+    assert [experiments[index] for index in range(len(expected))] == expected
+    assert list(experiments[5:20:3]) == expected[5:20:3]
+    assert isinstance(experiments[5:20], Experiments)
+    assert [
+        experiment
+        for index in range(4)
+        for experiment in experiments.partition(4, index)
+    ] == expected
+
+
+def test_workers_match_single_process():
+    config = {
+        "algorithm": dict(ALGORITHM, instance={"$each": ["a", "b", "c"]}),
+        "datasets": [
+            {"path": {"train": {"$each": ["d", "e"]}}},
+            {"path": {"train": "f"}},
+        ],
+        "reference": {"$ref": "algorithm.instance"},
+    }
+    assert transform_config(config, workers=2) == transform_config(config)
+
+
+def test_versioned_each_list():
+    config = {"a": {"$each": {"$each": [[1, 2], [3]]}}}
+    eager = transform_config(config)
+    assert list(eager.a) == [1, 2, 3]
+    assert list(transform_config(config, lazy=True).a) == [1, 2, 3]
+    assert transform_config(config, workers=2) == eager
+
+
+def test_independent_keys_are_not_multiplied():
+    config = transform_config(
+        {
+            "algorithm": dict(ALGORITHM, instance={"$each": ["a", "b"]}),
+            "dataset": {"path": {"train": {"$each": ["c", "d", "e"]}}},
+        }
+    )
+    assert len(config.algorithm) == 2
+    assert len(config.dataset) == 3
+    assert len(config.algorithm * config.dataset) == 6
+
+
+def test_dependent_keys_are_expanded_together():
+    config = transform_config(
+        {
+            "algorithm": dict(ALGORITHM, instance={"$each": ["a", "b"]}),
+            "instance": {"$ref": "algorithm.instance"},
+            "name": {"$eval": "$.algorithm.image + '-x'"},
+            "dataset": {"path": {"train": {"$each": ["c", "d", "e"]}}},
+        }
+    )
+    assert [algorithm["instance"] for algorithm in config.algorithm] == list(
+        config.instance
+    )
+    assert len(config.name) == 2
+    assert len(config.dataset) == 3
+
+
+def test_lazy_config_only_expands_used_keys():
+    source = {
+        "algorithm": dict(ALGORITHM, instance={"$each": ["a", "b"]}),
+        "instance": {"$ref": "algorithm.instance"},
+        "dataset": {"path": {"train": {"$each": ["c", "d", "e"]}}},
+        "broken": {"$eval": "1 / 0"},
+    }
+    config = LazyConfig(source)
+    assert list(config) == list(source)
+    assert config.expanded == []
+
+    assert len(config.algorithm) == 2
+    # keys which depend on each other are expanded together
+    assert config.expanded == ["algorithm", "instance"]
+    assert config.algorithm is config["algorithm"]
+
+    config.invalidate("instance")
+    assert config.expanded == []
+    assert (
+        config.dataset
+        == transform_config({"dataset": source["dataset"]}).dataset
+    )
+
+
+def test_lazy_config_matches_eager():
+    source = {
+        "algorithm": dict(ALGORITHM, instance={"$each": ["a", "b"]}),
+        "datasets": [{"path": {"train": {"$each": ["c", "d"]}}}],
+    }
+    config = LazyConfig(source)
+    assert config == transform_config(source)
+    config.invalidate()
+    assert config.expanded == []
+
+
+def test_lazy_config_checks_max_versions_of_accessed_keys():
+    config = LazyConfig(
+        {
+            "algorithm": {"instance": {"$each": ["a", "b"]}},
+            "sweep": {"$each": [1, 2, 3]},
+            "broken": {"$eval": "1 / 0"},
+        },
+        max_versions=2,
+    )
+    assert len(config.algorithm) == 2
+    with pytest.raises(ValueError):
+        config.sweep
+
+
+def test_open_config(tmp_path):
+    path = tmp_path / "config.yml"
+    path.write_text("a: {$each: [1, 2]}\nbroken: {$eval: 1 / 0}")
+    config = open_config(path)
+    assert list(config.a) == [1, 2]
+    assert config.expanded == ["a"]
+
+
+TRANSFORMS = [
+    transform_config,
+    partial(transform_config, lazy=True),
+    partial(transform_config, workers=2),
+    LazyConfig,
+]
+
+
+@pytest.mark.parametrize("transform", TRANSFORMS)
+def test_reference_created_by_eval(transform):
+    config = transform(
+        {
+            "a": {"$eval": "{'$ref': 'b'}"},
+            "b": {"$each": [1, 2]},
+            "c": {"$each": [3, 4]},
+        }
+    )
+    assert list(config["a"]) == list(config["b"]) == [1, 2]
+    assert list(config["c"]) == [3, 4]
+
+
+def test_reference_created_by_eval_after_target_is_expanded():
+    config = LazyConfig(
+        {"a": {"$eval": "{'$ref': 'b'}"}, "b": {"$each": [1, 2]}}
+    )
+    assert list(config.b) == [1, 2]
+    assert list(config.a) == [1, 2]
+    assert config.expanded == ["a", "b"]
+
+
+@pytest.mark.parametrize(
+    "transform",
+    [transform_config, partial(transform_config, lazy=True), LazyConfig],
+)
+def test_deeply_nested_config(transform):
+    depth = 3000
+    node = {
+        "value": {"$each": [1, 2]},
+        "copy": {"$ref": "base.x"},
+        "inherited": {"$from": "base"},
+    }
+    for _ in range(depth):
+        node = {"child": node}
+    path = ".".join(["child"] * depth)
+    config = {
+        "base": {"x": 1},
+        "deep": node,
+        "value": {"$ref": f"deep.{path}.value"},
+    }
+    assert is_deterministic(config)
+    assert compile_plan(config).count() == 2
+
+    transformed = transform(config)
+    assert [
+        get_item_from_path(version, path) for version in transformed["deep"]
+    ] == [
+        {"value": 1, "copy": 1, "inherited": {"x": 1}},
+        {"value": 2, "copy": 1, "inherited": {"x": 1}},
+    ]
+    assert list(transformed["value"]) == [1, 2]
@@ -0,0 +1,115 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import json
+
+from runtool import profiler as profiler_module
+from runtool import runtool as runtool_module
+from runtool.experiments_converter import generate_sagemaker_json
+from runtool.profiler import Profiler
+from runtool.runtool import transform_config
+
+CONFIG = {
+    "base": {"image": "image", "instance": "ml.m5.large"},
+    "algorithm": {
+        "$from": "base",
+        "hyperparameters": {
+            "epochs": {"$each": [1, 10, 100]},
+            "context_length": {"$eval": "2 * 12"},
+            "learning_rate": {"$linspace": [0.1, 0.5, 5]},
+            "model": {"$eval": "$trial.dataset.meta.name"},
+        },
+    },
+    "dataset": {
+        "path": {"train": {"$each": ["s3://a", "s3://b"]}},
+        "meta": {"name": {"$ref": "names.first"}},
+    },
+    "names": {"first": "a"},
+}
+
+
+def test_profile_transform_config():
+    profiler = Profiler()
+    config = transform_config(CONFIG, profiler=profiler)
+    assert profiler_module.ACTIVE is None
+
+    assert profiler.keys == {
+        "base": 1,
+        "algorithm": 15,
+        "dataset": 2,
+        "names": 2,
+    }
+    report = profiler.report()
+    assert [(node["path"], node["versions"]) for node in report["nodes"]] == [
+        ("algorithm.hyperparameters.learning_rate", 5),
+        ("algorithm.hyperparameters.epochs", 3),
+        ("dataset.path.train", 2),
+    ]
+    assert {row["directive"] for row in report["directives"]} == {
+        "$from",
+        "$eval",
+        "$each",
+        "$linspace",
+        "$ref",
+    }
+    assert profiler.calls["$each"] == 2
+    assert profiler.peak_memory > 0
+
+    assert json.loads(profiler.to_json()) == report
+    table = profiler.table()
+    assert "algorithm.hyperparameters.learning_rate" in table
+    assert "$linspace" in table
+
+    assert len(config.algorithm * config.dataset) == 30
+
+
+def test_profile_compiles_plan_once(monkeypatch):
+    plans = []
+    original = runtool_module.compile_plan
+
+    def compile_plan(config):
+        plans.append(config)
+        return original(config)
+
+    monkeypatch.setattr(runtool_module, "compile_plan", compile_plan)
+
+    profiler = Profiler(memory=False)
+    transform_config(CONFIG, max_versions=100, profiler=profiler)
+    assert len(plans) == 1
+    assert profiler.calls["$eval"] == 2
+
+
+def test_profile_generate_sagemaker_json():
+    config = transform_config(CONFIG)
+    experiments = config.algorithm * config.dataset
+    arguments = dict(
+        runs=1,
+        experiment_name="name",
+        job_name_expression=None,
+        tags={},
+        creation_time="2021-02-19-17-11-33",
+        bucket="bucket",
+        role="role",
+    )
+
+    profiler = Profiler(memory=False)
+    jobs = generate_sagemaker_json(experiments, profiler=profiler, **arguments)
+    assert profiler.calls["$trial"] == 0
+
+    profiled = list(jobs)
+    assert profiler_module.ACTIVE is None
+    assert profiler.calls["$trial"] == 30
+    assert profiler.peak_memory == 0
+    assert len(profiled) == len(
+        list(generate_sagemaker_json(experiments, **arguments))
+    )
@@ -146,3 +146,45 @@ def test_dispatch_retry_limit_reached(
     with pytest.raises(botocore.exceptions.ClientError):
         # default of 10 retries, thus 11 retries should cause exception
         run_dispatch(["throttle"] * 11, "two_trainingjobs")
+
+
+@patch.object(JobDispatcher, "timeout_with_printer")
+@patch("time.sleep", return_value=None)
+def test_dispatch_reads_jobs_lazily(patched_sleep, mock_timeout_with_printer):
+    jobs = [
+        {"ResourceConfig": {"InstanceType": instance}, "TrainingJobName": name}
+        for name, instance in enumerate("aabab")
+    ]
+    read = []
+
+    def stream():
+        for job in jobs:
+            read.append(job["TrainingJobName"])
+            yield job
+
+    client = Mock()
+    client.create_training_job.side_effect = client_side_effects(
+        [RESPONSE, RESPONSE, "busy", RESPONSE, RESPONSE, RESPONSE]
+    )
+    submitted = []
+
+    def create_training_job(**job):
+        # at most two jobs are read before they are submitted
+        assert len(read) - len(submitted) <= 2
+        submitted.append(job["TrainingJobName"])
+        return client.create_training_job(**job)
+
+    dispatcher = JobDispatcher(Mock(create_training_job=create_training_job))
+    responses = dispatcher.dispatch(stream(), buffer_size=2)
+    assert sorted(responses) == [0, 1, 2, 3, 4]
+    assert read == [0, 1, 2, 3, 4]
+    assert mock_timeout_with_printer.call_count == 1
+
+
+@pytest.mark.parametrize("buffer_size", [0, -1])
+def test_dispatch_rejects_empty_buffer(buffer_size):
+    with pytest.raises(ValueError):
+        JobDispatcher(Mock()).dispatch(
+            [{"ResourceConfig": {"InstanceType": "a"}}],
+            buffer_size=buffer_size,
+        )
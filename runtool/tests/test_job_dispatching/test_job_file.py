@@ -0,0 +1,91 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import pytest
+from runtool import jobfile
+from runtool.datatypes import Algorithms, Datasets
+from runtool.dry_run import generate_dry_run_summary
+from runtool.experiments_converter import generate_sagemaker_json
+from runtool.jobfile import JobWriter, read_jobs, write_jobs
+
+EXPERIMENTS = Algorithms(
+    [
+        {"image": "image", "instance": instance, "hyperparameters": {"a": 1}}
+        for instance in ("ml.m5.large", "ml.c5.xlarge")
+    ]
+) * Datasets([{"path": {"train": f"s3://bucket/{name}"}} for name in "ab"])
+
+
+def generate_jobs():
+    return generate_sagemaker_json(
+        EXPERIMENTS,
+        runs=2,
+        experiment_name="name",
+        job_name_expression=None,
+        tags={"repeated_runs_group_id": "mocked"},
+        creation_time="2021-02-23-14-36-39",
+        bucket="bucket",
+        role="role",
+    )
+
+
+@pytest.mark.parametrize("name", ["jobs.jsonl", "jobs.jsonl.gz"])
+def test_jobs_round_trip(tmp_path, name):
+    path = tmp_path / name
+    assert write_jobs(path, generate_jobs()) == 8
+    assert list(read_jobs(path)) == list(generate_jobs())
+
+
+@pytest.mark.parametrize("name", ["jobs.jsonl", "jobs.jsonl.gz"])
+def test_jobs_are_appended(tmp_path, name):
+    path = tmp_path / name
+    with JobWriter(path) as writer:
+        writer.write({"TrainingJobName": "first"})
+    write_jobs(path, iter([{"TrainingJobName": "second"}]))
+    assert [job["TrainingJobName"] for job in read_jobs(path)] == [
+        "first",
+        "second",
+    ]
+
+
+def test_jobs_are_read_lazily(tmp_path):
+    path = tmp_path / "jobs.jsonl"
+    jobs = read_jobs(path)  # the file is opened when the first job is read
+    write_jobs(path, generate_jobs())
+    assert next(jobs)["ResourceConfig"]["InstanceType"] == "ml.m5.large"
+    assert len(list(jobs)) == 7
+
+
+def test_dry_run_summary(tmp_path):
+    path = tmp_path / "jobs.jsonl.gz"
+    write_jobs(path, generate_jobs())
+    assert generate_dry_run_summary(read_jobs(path), print_data=False) == {
+        "ml.m5.large": 4,
+        "ml.c5.xlarge": 4,
+    }
+
+
+def test_zstd_requires_zstandard(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobfile, "zstandard", None)
+    with pytest.raises(ImportError):
+        write_jobs(tmp_path / "jobs.jsonl.zst", [])
+
+
+def test_zstd_jobs_are_appended(tmp_path):
+    pytest.importorskip("zstandard")
+    path = tmp_path / "jobs.jsonl.zst"
+    assert write_jobs(path, generate_jobs()) == 8
+    assert write_jobs(path, [{"TrainingJobName": "appended"}]) == 1
+    jobs = list(read_jobs(path))
+    assert jobs[:8] == list(generate_jobs())
+    assert jobs[8] == {"TrainingJobName": "appended"}
@@ -58,7 +58,8 @@ def test_minimum():
 
 def test_large():
     """
-    Tests a large config file containing 6 algorithms and 5 datasets
-    thus generating a total of 30 training jobs.
+    Tests a large config file containing 6 algorithms and 5 datasets.
+    Since two of the datasets are equal, only 24 of the 30 training jobs
+    are unique and generated.
     """
     compare("large")
@@ -12,8 +12,19 @@
 # permissions and limitations under the License.
 
 import yaml
-from runtool.datatypes import Algorithm, Dataset, Experiment
-from runtool.experiments_converter import generate_sagemaker_json
+from runtool.datatypes import (
+    Algorithm,
+    Algorithms,
+    Dataset,
+    Datasets,
+    Experiment,
+)
+from runtool.experiments_converter import (
+    Fragments,
+    Templates,
+    generate_sagemaker_json,
+    string_values,
+)
 
 ALGORITHM = Algorithm(
     {
@@ -127,7 +138,165 @@ def test_simple():
                 - 
                     Key: run_number
                     Value: '0'
-            TrainingJobName: config-66684a57-date-2021-02-19-17-11-33-runid-50086f67-run-0
+            TrainingJobName: config-4cdc2f8c-date-2021-02-19-17-11-33-runid-796e3248-run-0
         """,
         print_result=True,
     )
+
+
+def mock_group_ids(jsons):
+    for item in jsons:
+        for tag in item["Tags"]:
+            if tag["Key"] == "repeated_runs_group_id":
+                tag["Value"] = "Mocked value"
+    return jsons
+
+
+def test_workers_generate_same_jobs():
+    experiments = Algorithms(
+        [
+            dict(ALGORITHM, instance=instance)
+            for instance in ("ml.m5.xlarge", "ml.c5.xlarge", "ml.p3.2xlarge")
+        ]
+    ) * Datasets([DATASET, dict(DATASET, tags={"name": "other"})])
+    kwargs = dict(
+        runs=2,
+        experiment_name="test name",
+        job_name_expression="__trial__.algorithm.instance + str(run)",
+        tags={},
+        bucket="test bucket",
+        creation_time="2021-02-19-17-11-33",
+        role="test role",
+    )
+    assert mock_group_ids(
+        list(generate_sagemaker_json(experiments, workers=2, **kwargs))
+    ) == mock_group_ids(list(generate_sagemaker_json(experiments, **kwargs)))
+
+
+def test_where_with_trial_skips_experiments():
+    algorithm = dict(
+        ALGORITHM,
+        instance="ml.p3.2xlarge",
+        **{"$where": "'gpu' in $trial.dataset.tags.name"},
+    )
+    experiments = Algorithms([algorithm]) * Datasets(
+        [
+            dict(DATASET, tags={"name": "cpu"}),
+            dict(DATASET, tags={"name": "gpu"}),
+        ]
+    )
+    jobs = list(
+        generate_sagemaker_json(
+            experiments,
+            runs=1,
+            experiment_name="test name",
+            job_name_expression=None,
+            tags={},
+            bucket="test bucket",
+            creation_time="2021-02-19-17-11-33",
+            role="test role",
+        )
+    )
+    assert len(jobs) == 1
+    assert {"Key": "name", "Value": "gpu"} in jobs[0]["Tags"]
+
+
+def test_trial_holes_are_filled_for_each_experiment():
+    algorithm = dict(
+        ALGORITHM,
+        hyperparameters={
+            "freq": {"$eval": "$trial.dataset.meta.freq"},
+            "lags": [1, {"$eval": "2 * $trial.dataset.meta.lag"}],
+            "epochs": 10,
+        },
+    )
+    experiments = Algorithms([algorithm]) * Datasets(
+        [
+            dict(DATASET, meta={"freq": "H", "lag": 24}),
+            dict(DATASET, meta={"freq": "D", "lag": 7}),
+        ]
+    )
+    jobs = list(
+        generate_sagemaker_json(
+            experiments,
+            runs=1,
+            experiment_name="test name",
+            job_name_expression=None,
+            tags={},
+            bucket="test bucket",
+            creation_time="2021-02-19-17-11-33",
+            role="test role",
+        )
+    )
+    assert [job["HyperParameters"] for job in jobs] == [
+        {"freq": "H", "lags": "[1, 48]", "epochs": "10"},
+        {"freq": "D", "lags": "[1, 14]", "epochs": "10"},
+    ]
+
+
+def test_templates_share_nodes_without_holes():
+    algorithm = dict(
+        ALGORITHM,
+        metrics={"loss": "loss: (.*)"},
+        hyperparameters={"freq": {"$eval": "$trial.dataset.meta.freq"}},
+    )
+    dataset = dict(
+        DATASET,
+        meta={"freq": "H"},
+        tags={"size": {"$eval": "len($trial.dataset.path)"}},
+    )
+    experiments = Algorithms([algorithm]) * Datasets(
+        [dataset, dict(dataset, meta={"freq": "D"})]
+    )
+    templates = Templates()
+    first, second = map(templates.fill, experiments)
+    assert first.algorithm.metrics is second.algorithm.metrics
+    assert first.algorithm.hyperparameters.freq == "H"
+    assert second.algorithm.hyperparameters.freq == "D"
+    assert first.dataset.tags.size == 2
+
+    # holes only reading the dataset itself are resolved once per dataset
+    template = templates.get(experiments[0]["dataset"], "dataset")
+    assert template.shared
+    assert template.fill(experiments[0]) is first.dataset
+
+
+def test_jobs_share_fragments():
+    algorithm = dict(
+        ALGORITHM,
+        metrics={"loss": "loss: (.*)"},
+        **{"$sagemaker.HyperParameters.extra": 1},
+    )
+    experiments = Algorithms([algorithm]) * Datasets(
+        [DATASET, dict(DATASET, tags={"name": "other"})]
+    )
+    fragments = Fragments()
+    first, second = generate_sagemaker_json(
+        experiments,
+        runs=1,
+        experiment_name="test name",
+        job_name_expression=None,
+        tags={},
+        bucket="test bucket",
+        creation_time="2021-02-19-17-11-33",
+        role="test role",
+        fragments=fragments,
+    )
+    metrics = [
+        job["AlgorithmSpecification"]["MetricDefinitions"]
+        for job in (first, second)
+    ]
+    assert metrics[0] == [{"Name": "loss", "Regex": "loss: (.*)"}]
+    assert metrics[0][0] is metrics[1][0]
+    assert first["HyperParameters"] == {
+        "prediction_length": "7",
+        "freq": "D",
+        "extra": 1,
+    }
+
+    # the overrides do not modify the shared fragments
+    assert [
+        fragment
+        for (fn, _), (_, fragment) in fragments.entries.items()
+        if fn is string_values
+    ] == [{"prediction_length": "7", "freq": "D"}]
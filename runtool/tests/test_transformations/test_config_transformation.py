@@ -15,7 +15,12 @@ from pathlib import Path
 
 import pytest
 import yaml
-from runtool.transformer import apply_transformations
+from runtool.transformer import (
+    Transformer,
+    apply_expansions,
+    apply_substitutions,
+    apply_transformations,
+)
 
 
 def assert_config_equal(source, expected):
@@ -634,6 +639,231 @@ def test_eval_indexing_recursive():
     )
 
 
+def test_where():
+    assert_config_equal(
+        source="""
+        my_algorithm:
+            hyperparameters:
+                context_length:
+                    $each: [12, 48]
+                prediction_length:
+                    $each: [6, 24]
+                $where: context_length >= 2 * prediction_length
+        """,
+        expected="""
+        -   my_algorithm:
+                hyperparameters:
+                    context_length: 12
+                    prediction_length: 6
+        -   my_algorithm:
+                hyperparameters:
+                    context_length: 48
+                    prediction_length: 6
+        -   my_algorithm:
+                hyperparameters:
+                    context_length: 48
+                    prediction_length: 24
+        """,
+    )
+
+
+def test_where_with_each():
+    assert_config_equal(
+        source="""
+        my_algorithm:
+            instance: ml.p3.2xlarge
+            $each:
+                - image: cpu
+                - image: gpu
+            $where: "'p3' not in instance or image == 'gpu'"
+        """,
+        expected="""
+        -   my_algorithm:
+                instance: ml.p3.2xlarge
+                image: gpu
+        """,
+    )
+
+
+def test_where_removes_all_versions():
+    assert apply_transformations({"a": {"b": 1, "$where": "b > 1"}}) == []
+
+
+def test_sweeps():
+    versions = apply_transformations(
+        yaml.safe_load(
+            """
+            my_algorithm:
+                hyperparameters:
+                    epochs:
+                        $range: [10, 31, 10]
+                    dropout_rate:
+                        $linspace: [0.0, 0.5, 3]
+                    learning_rate:
+                        $logspace: [-4, -2, 3]
+            """
+        )
+    )
+    hyperparameters = [
+        version["my_algorithm"]["hyperparameters"] for version in versions
+    ]
+    assert len(hyperparameters) == 27
+    assert hyperparameters[0] == {
+        "epochs": 10,
+        "dropout_rate": 0.0,
+        "learning_rate": 0.0001,
+    }
+    assert hyperparameters[-1] == {
+        "epochs": 30,
+        "dropout_rate": 0.5,
+        "learning_rate": 0.01,
+    }
+    # the values are python numbers, thus they can be serialized
+    assert {type(item["epochs"]) for item in hyperparameters} == {int}
+    assert {type(item["dropout_rate"]) for item in hyperparameters} == {float}
+
+
+def test_sweeps_are_lazy():
+    versions = apply_transformations(
+        {
+            "learning_rate": {"$linspace": [0.0, 1.0, 10001]},
+            "epochs": {"$range": [1000]},
+        },
+        lazy=True,
+    )
+    assert len(versions) == 10001 * 1000
+    assert versions[5000 * 1000 + 7] == {"learning_rate": 0.5, "epochs": 7}
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        {"$range": 10},
+        {"$range": ["a"]},
+        {"$linspace": [0, 1, 2], "a": 1},
+        {"$linspace": [0, 1, 2], "$range": [2]},
+    ],
+)
+def test_sweeps_invalid(node):
+    with pytest.raises(TypeError):
+        apply_transformations({"a": node})
+
+
+def test_zip():
+    assert_config_equal(
+        source="""
+        my_algorithm:
+            hyperparameters:
+                epochs: 10
+                $zip:
+                    prediction_length: [6, 24]
+                    context_length: [12, {$eval: 2 * 24}]
+        my_dataset:
+            path:
+                $each: [a, b]
+        """,
+        expected="""
+        -   my_algorithm:
+                hyperparameters:
+                    epochs: 10
+                    prediction_length: 6
+                    context_length: 12
+            my_dataset:
+                path: a
+        -   my_algorithm:
+                hyperparameters:
+                    epochs: 10
+                    prediction_length: 6
+                    context_length: 12
+            my_dataset:
+                path: b
+        -   my_algorithm:
+                hyperparameters:
+                    epochs: 10
+                    prediction_length: 24
+                    context_length: 48
+            my_dataset:
+                path: a
+        -   my_algorithm:
+                hyperparameters:
+                    epochs: 10
+                    prediction_length: 24
+                    context_length: 48
+            my_dataset:
+                path: b
+        """,
+    )
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        {"$zip": {"a": [1, 2], "b": [3]}},
+        {"$zip": {"a": 1}},
+        {"$zip": [[1, 2], [3, 4]]},
+        {"$zip": {"a": [1]}, "$each": [{"b": 1}]},
+    ],
+)
+def test_zip_invalid(node):
+    with pytest.raises((TypeError, ValueError)):
+        apply_transformations({"a": node})
+
+
+def test_sample():
+    versions = apply_transformations(
+        yaml.safe_load(
+            """
+            my_algorithm:
+                hyperparameters:
+                    epochs: 10
+                    $sample:
+                        n: 16
+                        method: sobol
+                        space:
+                            learning_rate: {loguniform: [1.0e-4, 1.0e-1]}
+                            num_layers: {int: [1, 4]}
+                            cell_type: [lstm, gru]
+            """
+        )
+    )
+    hyperparameters = [
+        version["my_algorithm"]["hyperparameters"] for version in versions
+    ]
+    assert len(hyperparameters) == 16
+    assert {item["epochs"] for item in hyperparameters} == {10}
+    assert all(1e-4 <= item["learning_rate"] < 1e-1 for item in hyperparameters)
+    assert sorted(item["num_layers"] for item in hyperparameters) == sorted(
+        [1, 2, 3, 4] * 4
+    )
+    assert sorted(item["cell_type"] for item in hyperparameters) == sorted(
+        ["lstm", "gru"] * 8
+    )
+
+
+def test_sample_with_where():
+    versions = apply_transformations(
+        {
+            "a": {
+                "$sample": {
+                    "n": 100,
+                    "method": "random",
+                    "space": {"x": {"uniform": [0, 1]}},
+                },
+                "$where": "x < 0.5",
+            }
+        }
+    )
+    assert 0 < len(versions) < 100
+    assert all(version["a"]["x"] < 0.5 for version in versions)
+
+
+def test_sample_with_each():
+    with pytest.raises(TypeError):
+        apply_transformations(
+            {"a": {"$each": [{"b": 1}], "$sample": {"n": 1, "space": {"c": [1]}}}}
+        )
+
+
 def test_simple_example():
     assert_config_equal(**load("simple_example"))
 
@@ -644,3 +874,108 @@ def test_large_example():
 
 def test_complex_example():
     assert_config_equal(**load("complex_example"))
+
+
+def test_versions_share_unchanged_subtrees():
+    config = {
+        "algorithm": {
+            "metrics": {"loss": "loss: ([0-9.]+)"},
+            "hyperparameters": {
+                "epochs": {"$each": [1, 2, 3]},
+                "name": {"$ref": "name"},
+            },
+        },
+        "name": "model",
+    }
+    first, *rest = apply_transformations(config)
+    for version in rest:
+        assert (
+            version["algorithm"]["metrics"]
+            is first["algorithm"]["metrics"]
+            is config["algorithm"]["metrics"]
+        )
+        assert version["algorithm"]["hyperparameters"] is not (
+            first["algorithm"]["hyperparameters"]
+        )
+
+
+def test_config_is_not_modified():
+    source = {
+        "base": {"a": {"$each": [1, 2]}},
+        "child": {"$from": "base", "b": {"$eval": "$.base.a"}},
+        "trial": {"$eval": "$trial.algorithm.image"},
+        "reference": {"$ref": "child.b"},
+    }
+    config = yaml.safe_load(yaml.safe_dump(source))
+    apply_transformations(config)
+    assert config == source
+
+
+def test_deferred_references_are_reset():
+    transformer = Transformer(
+        {
+            "a": {"x": {"$each": [1, 2]}, "y": {"$ref": "a.x"}},
+            "b": {"c": 1},
+        }
+    )
+    assert transformer.transform(keys=["a"]) == [
+        {"a": {"x": 1, "y": 1}},
+        {"a": {"x": 2, "y": 2}},
+    ]
+    assert transformer.deferred_references
+    assert transformer.transform(keys=["b"]) == [{"b": {"c": 1}}]
+    assert not transformer.deferred_references
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        yaml.safe_load(load(name)["source"])
+        for name in ("simple_example", "large_example", "complex_example")
+    ]
+    + [
+        {
+            "base": {"a": {"$each": [1, 2]}, "b": 3},
+            "child": {"$from": "base", "c": {"$eval": "$.base.b * 2"}},
+            "fixed": {"$ref": "base.b"},
+            "varying": {"$ref": "base.a"},
+        },
+        {
+            "a": {"$eval": "{'x': 1, 'y': {'$each': [2, 3]}}"},
+            "b": {"$ref": "a.x"},
+            "c": {"$each": [{"$ref": "b"}, {"$eval": "[4, 5]"}]},
+        },
+        {
+            "a": {
+                "x": {"$each": [1, 2, 3]},
+                "y": {"$each": [1, 2]},
+                "$where": "x > y",
+            },
+            "b": {"$ref": "a.x"},
+            "c": {"$each": [7, 8]},
+        },
+        {"a": {"$each": {"$each": [[1, 2], [3]]}}, "b": {"$each": [4, 5]}},
+        {
+            "a": {
+                "$sample": {"n": 3, "space": {"x": {"uniform": [0, 1]}}},
+                "y": {"$each": [1, 2]},
+            },
+            "b": {"$ref": "a.x"},
+        },
+        {
+            "a": {
+                "$zip": {"x": [1, {"$each": [2, 3]}], "y": [4, 5]},
+                "$where": "x < 3",
+            },
+            "b": {"$ref": "a.y"},
+        },
+        {
+            "a": {"x": {"$range": [1, 4]}, "y": {"$logspace": [0, 1, 2]}},
+            "b": [{"$linspace": [0, 1, 3]}, {"$ref": "a.x"}],
+        },
+    ],
+)
+def test_single_pass_matches_separate_passes(config):
+    separate = apply_expansions(apply_substitutions(config))
+    assert apply_transformations(config) == separate
+    assert list(apply_transformations(config, lazy=True)) == separate
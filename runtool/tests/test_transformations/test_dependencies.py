@@ -0,0 +1,98 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import pytest
+
+from runtool.dependencies import (
+    CircularReferenceError,
+    FromResolver,
+    resolve_from,
+    resolve_references,
+)
+from runtool.plan import compile_plan
+from runtool.transformer import apply_transformations
+
+
+def test_from_chain():
+    config = {
+        "base": {"image": "a", "hyperparameters": {"epochs": 1}},
+        "first": {"$from": "base", "hyperparameters": {"lr": 0.1}},
+        "second": {"$from": "first", "image": "b"},
+    }
+    assert resolve_from(config)["second"] == {
+        "image": "b",
+        "hyperparameters": {"epochs": 1, "lr": 0.1},
+    }
+
+
+def test_from_does_not_modify_config():
+    config = {
+        "base": {"hyperparameters": {"epochs": 1}},
+        "child": {"$from": "base", "hyperparameters": {"lr": 0.1}},
+    }
+    resolve_from(config)
+    assert config == {
+        "base": {"hyperparameters": {"epochs": 1}},
+        "child": {"$from": "base", "hyperparameters": {"lr": 0.1}},
+    }
+
+
+def test_from_targets_are_resolved_once(monkeypatch):
+    resolved = []
+    resolve_node = FromResolver.resolve_node
+
+    def counting(self, node, path):
+        resolved.append(path)
+        return resolve_node(self, node, path)
+
+    monkeypatch.setattr(FromResolver, "resolve_node", counting)
+    config = {"base": {"a": 1}}
+    for index in range(100):
+        config[f"chain_{index}"] = {
+            "$from": f"chain_{index - 1}" if index else "base",
+            "b": index,
+        }
+    result = resolve_from(config)
+    assert result["chain_99"] == {"a": 1, "b": 99}
+    # every node is resolved when walking the config and at most once
+    # more when it is inherited from
+    assert max(map(resolved.count, set(resolved))) <= 2
+
+
+@pytest.mark.parametrize(
+    "config, cycle",
+    [
+        ({"a": {"$from": "a"}}, ["a", "a"]),
+        (
+            {"a": {"$from": "b"}, "b": {"$from": "c"}, "c": {"$from": "a"}},
+            None,
+        ),
+        ({"a": {"b": {"$from": "a"}}}, ["a", "a.b", "a"]),
+    ],
+)
+def test_from_cycle(config, cycle):
+    with pytest.raises(CircularReferenceError) as error:
+        resolve_from(config)
+    assert error.value.cycle[0] == error.value.cycle[-1]
+    if cycle:
+        assert error.value.cycle == cycle
+
+
+def test_ref_cycle():
+    config = {"a": {"$ref": "b"}, "b": [{"$ref": "a"}]}
+    with pytest.raises(CircularReferenceError, match=r"a -> b -> b\.0 -> a"):
+        resolve_references(config)
+    with pytest.raises(CircularReferenceError):
+        apply_transformations(config)
+    with pytest.raises(CircularReferenceError):
+        compile_plan(config)
@@ -11,7 +11,9 @@
 # express or implied. See the License for the specific language governing
 # permissions and limitations under the License.
 
-from runtool.recurse_config import Versions, recursive_apply
+import sys
+
+from runtool.recurse_config import DirectiveIndex, Versions, recursive_apply
 
 
 def transform(node: dict):
@@ -192,3 +194,86 @@ def test_recursive_apply_merging_versions_with_function():
             ]
         ),
     )
+
+
+def test_recursive_apply_lazy_matches_eager():
+    node = {
+        "a": [Versions([1, 2]), Versions([3, 4])],
+        "b": {"c": Versions([5, 6]), "d": "static"},
+    }
+    lazy = recursive_apply(node, lambda x: x, lazy=True)
+    assert lazy.is_lazy
+    assert lazy == recursive_apply(node, lambda x: x)
+
+
+def test_recursive_apply_lazy_does_not_materialize():
+    # 10 ** 12 versions, only the first ones are ever generated
+    node = {str(key): Versions(list(range(10))) for key in range(12)}
+    result = recursive_apply(node, lambda x: x, lazy=True)
+    assert next(iter(result)) == {str(key): 0 for key in range(12)}
+
+
+def test_recursive_apply_flattens_versions_from_fn():
+    compare_recursive_apply(
+        node={"a": Versions([1, 2]), "version": [3, 4]},
+        expected=Versions([3, 4, 3, 4]),
+    )
+
+
+def test_recursive_apply_lazy_random_access():
+    node = {
+        "a": [{"version": [1, 2, 3]}, {"b": {"version": [4, 5]}}],
+        "c": {"version": [{"d": {"version": [6, 7]}}, 8]},
+    }
+    size = lambda node: len(node.get("version", [None]))
+    eager = list(recursive_apply(node, transform))
+    for lazy in (
+        recursive_apply(node, transform, lazy=True),
+        recursive_apply(node, transform, lazy=True, size=size),
+    ):
+        assert len(lazy) == len(eager)
+        assert [lazy[index] for index in range(len(eager))] == eager
+        assert lazy[-1] == eager[-1]
+        assert list(lazy[3:9:2]) == eager[3:9:2]
+
+
+def test_recursive_apply_lazy_random_access_does_not_materialize():
+    node = {str(key): Versions(list(range(10))) for key in range(12)}
+    result = recursive_apply(node, lambda x: x, lazy=True, size=lambda x: 1)
+    assert len(result) == 10**12
+    assert result[123_456_789_012] == {
+        str(key): int(digit) for key, digit in enumerate("123456789012")
+    }
+
+
+def test_recursive_apply_index_skips_inert_subtrees():
+    visited = []
+
+    def record(node):
+        visited.append(node)
+        return transform(node)
+
+    data = {"metrics": {"a": {"b": 1}}, "sweep": [{"version": [1, 2]}]}
+    result = recursive_apply(data, record, index=DirectiveIndex(["version"]))
+    assert list(result) == list(recursive_apply(data, transform))
+    assert all(version["metrics"] is data["metrics"] for version in result)
+    assert data["metrics"] not in visited
+    assert data["metrics"]["a"] not in visited
+
+
+def test_directive_index_reuses_entries_of_shared_subtrees():
+    index = DirectiveIndex(["$each"])
+    shared = {"a": {"b": [1, 2]}}
+    assert not index.contains({"x": shared})
+    entries = len(index.entries)
+
+    # only the new nodes have to be indexed, not the shared child
+    assert index.contains({"y": shared, "z": {"$each": [1]}})
+    assert len(index.entries) == entries + 3
+
+
+def test_recursive_apply_deeper_than_recursion_limit():
+    node = {"version": [1, 2]}
+    for _ in range(sys.getrecursionlimit() * 2):
+        node = {"a": node}
+    assert len(recursive_apply(node, transform)) == 2
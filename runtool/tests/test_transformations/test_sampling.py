@@ -0,0 +1,89 @@
+# Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+
+import numpy as np
+import pytest
+from runtool.sampling import METHODS, draw_sobol, sample
+
+SPACE = {
+    "learning_rate": {"loguniform": [1e-4, 1e-1]},
+    "dropout_rate": {"uniform": [0.0, 0.5]},
+    "num_layers": {"int": [1, 8]},
+    "cell_type": {"choice": ["lstm", "gru", "rnn"]},
+}
+
+
+@pytest.mark.parametrize("method", list(METHODS))
+def test_sample_space(method):
+    points = sample({"n": 64, "method": method, "space": SPACE})
+    assert len(points) == 64
+    for point in points:
+        assert list(point) == list(SPACE)
+        assert 1e-4 <= point["learning_rate"] < 1e-1
+        assert 0.0 <= point["dropout_rate"] < 0.5
+        assert point["num_layers"] in range(1, 9)
+        assert type(point["num_layers"]) is int
+        assert point["cell_type"] in ("lstm", "gru", "rnn")
+
+
+@pytest.mark.parametrize("method", list(METHODS))
+def test_sample_is_seeded(method):
+    spec = {"n": 10, "method": method, "space": SPACE}
+    assert sample(spec) == sample(spec)
+    assert sample(spec) == sample(dict(spec, seed=0))
+    assert sample(spec) != sample(dict(spec, seed=1))
+
+
+def test_sobol_sequence():
+    # the unshifted points are those of the Joe and Kuo direction numbers
+    class Unshifted:
+        def integers(self, low, high, size, dtype):
+            return np.zeros(size, dtype=dtype)
+
+    assert draw_sobol(8, 3, Unshifted()).tolist() == [
+        [0.0, 0.0, 0.0],
+        [0.5, 0.5, 0.5],
+        [0.75, 0.25, 0.25],
+        [0.25, 0.75, 0.75],
+        [0.375, 0.375, 0.625],
+        [0.875, 0.875, 0.125],
+        [0.625, 0.125, 0.875],
+        [0.125, 0.625, 0.375],
+    ]
+
+
+def test_sobol_two_dimensional_projections():
+    points = draw_sobol(1024, 21, np.random.default_rng(0))
+    cells = (points * 4).astype(int)
+    for first in range(21):
+        assert len(set((points[:, first] * 1024).astype(int))) == 1024
+        for second in range(first + 1, 21):
+            assert len(set(zip(cells[:, first], cells[:, second]))) == 16
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        [1, 2],
+        {"n": 2},
+        {"n": -1, "space": SPACE},
+        {"n": 2.5, "space": SPACE},
+        {"n": 2, "space": {"a": {"normal": [0, 1]}}},
+        {"n": 2, "space": {"a": {"uniform": 1}}},
+        {"n": 2, "method": "grid", "space": SPACE},
+        {"n": 2, "method": "sobol", "space": {str(i): [i] for i in range(22)}},
+    ],
+)
+def test_sample_invalid(spec):
+    with pytest.raises((TypeError, ValueError)):
+        sample(spec)
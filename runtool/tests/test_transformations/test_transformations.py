@@ -11,6 +11,7 @@
 # express or implied. See the License for the specific language governing
 # permissions and limitations under the License.
 
+import pytest
 from runtool.recurse_config import Versions
 from runtool.transformations import (
     apply_each,
@@ -19,7 +20,6 @@ from runtool.transformations import (
     apply_ref,
     apply_trial,
     evaluate,
-    recurse_eval,
 )
 
 
@@ -129,20 +129,6 @@ def test_evaluate_with_mathlib_and_locals():
     )
 
 
-def test_recurse_eval():
-    def simple_eval(node, context):
-        return eval(node["$eval"]) if "$eval" in node else node
-
-    assert (
-        recurse_eval(
-            path="a.b.0.split(' ')",
-            data={"a": {"b": [{"$eval": "'hey ' * 2"}]}},
-            fn=simple_eval,
-        )
-        == ("a.b.0", "hey hey ")
-    )
-
-
 def compare_apply_eval(text, locals, expected):
     assert apply_eval(text, locals) == expected
 
@@ -210,3 +196,73 @@ def test_apply_each_with_none():
             ]
         ),
     )
+
+
+def test_evaluate_does_not_reuse_uid():
+    assert evaluate("uid", {}) != evaluate("uid", {})
+
+
+def test_evaluate_does_not_reuse_mutable_results():
+    first = evaluate("[1, 2]", {})
+    first.append(3)
+    assert evaluate("[1, 2]", {}) == [1, 2]
+
+
+def test_evaluate_uses_current_locals():
+    assert evaluate("a.b * 2", {"a": {"b": 1}}) == 2
+    assert evaluate("a.b * 2", {"a": {"b": 2}}) == 4
+
+
+def test_evaluate_does_not_modify_locals():
+    locals = {"a": {"b": {"c": 1}}}
+    assert evaluate("a.b.c", locals) == 1
+    assert type(locals["a"]) is dict and type(locals["a"]["b"]) is dict
+
+
+def test_apply_eval_reference_prefix_of_another():
+    assert apply_eval({"$eval": "$.a + $.ab + $.a"}, {"a": 1, "ab": 10}) == 12
+
+
+def test_apply_eval_reference_with_quotes():
+    assert apply_eval({"$eval": "$.a + '!'"}, {"a": "it's"}) == "it's!"
+
+
+def test_apply_eval_reference_in_string_is_not_replaced():
+    assert apply_eval({"$eval": "'$.a' + $.a"}, {"a": "b"}) == "$.ab"
+
+
+def test_apply_eval_reference_in_comprehension():
+    assert apply_eval(
+        {"$eval": "[x * $.n for x in $.values]"}, {"n": 2, "values": [1, 2]}
+    ) == [2, 4]
+
+
+def test_apply_eval_mixed_references():
+    assert apply_eval(
+        {"$eval": "$.a.b[0]['c'] + $['d']"},
+        {"a": {"b": [{"c": 1}]}, "d": 2},
+    ) == 3
+
+
+def test_apply_eval_defers_f_string_with_trial():
+    deferred = apply_eval(
+        {"$eval": 'f"{$trial.dataset.name}-{$.name}"'}, {"name": "it's"}
+    )
+    trial = {"dataset": {"name": "data"}}
+    assert apply_trial(deferred, {"__trial__": trial}) == "data-it's"
+
+
+def test_apply_trial_method_of_value():
+    assert (
+        apply_trial(
+            {"$eval": "__trial__.algorithm.name.split('.')[-1]"},
+            {"__trial__": {"algorithm": {"name": "a.b.C"}}},
+        )
+        == "C"
+    )
+
+
+def test_evaluate_restricted():
+    for expression in ("__import__('os')", "().__class__", "open('file')"):
+        with pytest.raises((NameError, ValueError)):
+            evaluate(expression, {})
@@ -11,7 +11,14 @@
 # express or implied. See the License for the specific language governing
 # permissions and limitations under the License.
 
-from runtool.utils import get_item_from_path, update_nested_dict
+import sys
+
+from runtool.datatypes import DotDict
+from runtool.utils import (
+    get_item_from_path,
+    merge_nested_dict,
+    update_nested_dict,
+)
 
 
 def compare_updated_nested_dict(data, to_update, expected):
@@ -74,6 +81,40 @@ def test_updated_nested_dict_complex_reversed():
     )
 
 
+def nested(depth, leaf):
+    for _ in range(depth):
+        leaf = {"a": leaf}
+    return leaf
+
+
+def test_updated_nested_dict_deeper_than_recursion_limit():
+    depth = sys.getrecursionlimit() * 2
+    data = nested(depth, {"b": 1, "c": 2})
+    update_nested_dict(data, nested(depth, {"b": 3}))
+    assert get_item_from_path(data, ".".join(["a"] * depth)) == {
+        "b": 3,
+        "c": 2,
+    }
+
+
+def test_merge_nested_dict_deeper_than_recursion_limit():
+    depth = sys.getrecursionlimit() * 2
+    data = nested(depth, {"b": 1, "c": 2})
+    merged = merge_nested_dict(data, nested(depth, {"b": 3}))
+    path = ".".join(["a"] * depth)
+    assert get_item_from_path(merged, path) == {"b": 3, "c": 2}
+    assert get_item_from_path(data, path) == {"b": 1, "c": 2}
+
+
+def test_dotdict_deeper_than_recursion_limit():
+    depth = sys.getrecursionlimit() * 2
+    dotdict = DotDict(nested(depth, {"b": [1]}))
+    assert isinstance(get_item_from_path(dotdict, "a.a.a"), DotDict)
+    as_dict = dotdict.as_dict()
+    assert type(get_item_from_path(as_dict, "a.a.a")) is dict
+    assert get_item_from_path(as_dict, ".".join(["a"] * depth)) == {"b": [1]}
+
+
 def compare_get_item_from_path(data, path, expected):
     assert get_item_from_path(data, path) == expected
 